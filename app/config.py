@@ -51,6 +51,15 @@ class Settings(BaseSettings):
     openai_embedding_dimensions: int = 1536
     openai_max_tokens: int = 2000
     openai_temperature: float = 0.7
+    llm_backend: str = "openai"  # openai, fake
+    fake_embedding_latency_ms: float = 0.0  # per call, fake backend
+    fake_llm_first_token_ms: float = 300.0
+    fake_llm_tokens_per_second: float = 50.0  # 0 = no delay
+    fake_llm_response_tokens: int = 200
+    http_max_connections: int = 100  # shared pool for provider API calls
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_timeout: float = 60.0
 
     # Document Storage
     upload_dir: str = "./uploads"
@@ -59,7 +68,58 @@ class Settings(BaseSettings):
 
     # Vector Storage
     faiss_index_path: str = "./data/faiss"
+    embedding_backend: str = "auto"  # auto (by model name), openai, huggingface, onnx, fake
+    local_embedding_model_dir: str = "./models"  # onnx models live in <dir>/<model name>
+    local_embedding_quantized: bool = False  # load model_quantized.onnx (int8)
+    local_embedding_max_length: int = 256
+    local_embedding_batch_size: int = 32
+    local_embedding_workers: int = 2  # inference threads sharing one session
+    local_embedding_threads: int = 0  # intra-op threads per inference, 0 = cpus / workers
     embedding_batch_size: int = 100
+    embedding_concurrency: int = 4  # batches embedded at once per document
+    embedding_max_attempts: int = 3  # per batch, with exponential backoff
+    embedding_retry_backoff_seconds: float = 1.0
+    embedding_cache_backend: str = "disk"  # disk, redis, none
+    embedding_cache_path: str = "./data/embedding_cache.db"
+    embedding_cache_ttl_seconds: int = 2592000  # 30 days
+    embedding_cache_max_rows: int = 500000  # disk backend, ~3GB at 1536 dims; 0 = unbounded
+    embedding_cache_prune_interval_seconds: int = 3600  # disk backend
+    query_embedding_cache_size: int = 2048  # in-process LRU entries, 0 disables
+    query_embedding_cache_redis: bool = True
+    query_embedding_cache_ttl_seconds: int = 86400  # 1 day
+    query_batch_max_size: int = 32  # concurrent queries per embedding call, 1 disables batching
+    query_batch_max_wait_ms: float = 5.0
+
+    # Vector Index Tuning
+    faiss_index_type: str = "flat"  # flat, sq8, pq, ivf_flat, ivf_sq8, ivf_pq, hnsw
+    faiss_metric: str = "l2"  # l2, ip, cosine
+    faiss_promotion_threshold: int = 50000
+    faiss_ivf_nlist: int = 0  # 0 = derive from vector count
+    faiss_pq_m: int = 64
+    faiss_pq_nbits: int = 8
+    faiss_hnsw_m: int = 32
+    faiss_hnsw_ef_construction: int = 200
+    faiss_nprobe: int = 16
+    faiss_ef_search: int = 64
+    faiss_exact_filter_max: int = 10000  # filtered searches over fewer chunks are exact
+    faiss_rerank_factor: int = 0  # re-rank k * factor compressed hits exactly; 0 = off
+    faiss_reduced_dimension: int = 0  # > 0 = store fewer dimensions (e.g. 256, 512)
+    faiss_reduction: str = "truncate"  # truncate (Matryoshka models), pca
+    faiss_pca_sample_size: int = 100000  # vectors PCA is trained on
+    faiss_tenant_overrides: dict[str, dict] = {}
+    faiss_vector_dtype: str = "float32"  # float32, float16
+    faiss_wal_merge_bytes: int = 16777216  # 16MB
+    faiss_metadata_mmap_bytes: int = 268435456  # 256MB
+    faiss_compaction_min_dead_ratio: float = 0.2  # compact once 20% of stored vectors are deleted
+    faiss_compaction_interval_seconds: int = 3600  # Celery beat schedule; 0 = off
+    vector_store_cache_bytes: int = 2147483648  # 2GB per worker
+    faiss_mmap_search: bool = False  # search through memory-mapped read-only stores
+    faiss_shard_count: int = 0  # > 0 = hash users into this many shared shards (fixed once set)
+    vector_executor_workers: int = 4  # threads for async vector search and ingestion
+    vector_rpc_address: Optional[str] = None  # unix:///x.sock or tcp://127.0.0.1:port
+    vector_rpc_timeout: float = 30.0
+    vector_rpc_max_frame_bytes: int = 268435456  # 256MB, larger frames drop the connection
+    retrieval_score_threshold: Optional[float] = None  # max L2 distance / min similarity
 
     # Celery
     celery_broker_url: str = Field(default="redis://localhost:6379/1")
@@ -0,0 +1,111 @@
+"""Shared HTTP connection pools for provider API clients."""
+
+import asyncio
+import threading
+import weakref
+from typing import Optional
+
+import httpx
+
+from app.config import get_settings
+from app.core.logging import get_logger
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+
+def _limits() -> httpx.Limits:
+    """Connection pool limits from settings."""
+    return httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry,
+    )
+
+
+class LoopLocalTransport(httpx.AsyncBaseTransport):
+    """
+    Async transport with one connection pool per event loop.
+
+    Features:
+    - One shared `httpx.AsyncClient` for the whole process
+    - Pools are dropped with the loop that owns them
+
+    Design decision: Pooled connections belong to the loop that opened
+    them. The API server runs one loop, so it gets a single pool; Celery
+    tasks run `asyncio.run` per task and each get a fresh pool instead of
+    reusing sockets from a closed loop.
+    """
+
+    def __init__(self, limits: httpx.Limits):
+        """
+        Initialize the transport.
+
+        Args:
+            limits: Pool limits applied to every loop's pool
+        """
+        self.limits = limits
+        self._transports: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        """Pool of the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = httpx.AsyncHTTPTransport(limits=self.limits)
+                self._transports[loop] = transport
+            return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        with self._lock:
+            transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """
+    Get the process-wide sync HTTP client.
+
+    Keep-alive connections are reused by every provider client built on it.
+    """
+    global _client
+    with _lock:
+        if _client is None:
+            _client = httpx.Client(limits=_limits(), timeout=settings.http_timeout)
+        return _client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Get the process-wide async HTTP client."""
+    global _async_client
+    with _lock:
+        if _async_client is None:
+            _async_client = httpx.AsyncClient(
+                transport=LoopLocalTransport(_limits()),
+                timeout=settings.http_timeout,
+            )
+        return _async_client
+
+
+async def close_http_clients() -> None:
+    """Close the shared HTTP clients (called on shutdown)."""
+    global _client, _async_client
+    with _lock:
+        client, async_client = _client, _async_client
+        _client = _async_client = None
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.aclose()
+    logger.info("http_clients_closed")
@@ -13,9 +13,11 @@ from starlette.responses import Response
 from app.api.v1.router import api_router
 from app.config import get_settings
 from app.core.exceptions import LexoraException
+from app.core.http_client import close_http_clients
 from app.core.logging import configure_logging, get_logger
 from app.schemas.database import init_db
 from app.services.cache_service import cache_service
+from app.services.vector_service import shutdown_vector_executor
 
 settings = get_settings()
 configure_logging()
@@ -47,6 +49,8 @@ async def lifespan(app: FastAPI):
     yield
     
     await cache_service.disconnect()
+    await close_http_clients()
+    shutdown_vector_executor()
     logger.info("application_shutdown")
 
 
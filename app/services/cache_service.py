@@ -98,6 +98,62 @@ class CacheService:
             logger.warning("cache_set_error", key=key, error=str(e))
             return False
 
+    async def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """
+        Get several values in one round trip.
+        
+        Args:
+            keys: Cache keys
+        
+        Returns:
+            Mapping of found keys to values
+        """
+        if not keys:
+            return {}
+        if not self.redis:
+            await self.connect()
+
+        try:
+            values = await self.redis.mget(keys)
+            return {key: json.loads(value) for key, value in zip(keys, values) if value}
+        except Exception as e:
+            logger.warning("cache_get_many_error", keys=len(keys), error=str(e))
+            return {}
+
+    async def set_many(
+        self,
+        values: dict[str, Any],
+        expire: Optional[int] = None,
+    ) -> bool:
+        """
+        Set several values in one round trip.
+        
+        Args:
+            values: Mapping of cache keys to values
+            expire: TTL in seconds
+        
+        Returns:
+            True if successful
+        """
+        if not values:
+            return True
+        if not self.redis:
+            await self.connect()
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, value in values.items():
+                    serialized = json.dumps(value)
+                    if expire:
+                        pipe.setex(key, expire, serialized)
+                    else:
+                        pipe.set(key, serialized)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            logger.warning("cache_set_many_error", keys=len(values), error=str(e))
+            return False
+
     async def delete(self, key: str) -> bool:
         """
         Delete value from cache.
@@ -10,8 +10,9 @@ from app.core.exceptions import NotFoundError
 from app.core.logging import get_logger
 from app.schemas.database import Conversation, Document, Message, User
 from app.services.llm_service import get_llm_service
-from app.services.retrieval_service import get_retrieval_service
+from app.services.retrieval_service import get_retrieval_service_async
 from app.services.cache_service import get_cache_service
+from app.services.embedding_cache import query_digest
 
 logger = get_logger(__name__)
 
@@ -198,24 +199,20 @@ class ChatService:
         document_ids: Optional[list[str]] = None,
     ) -> tuple[str, list[dict]]:
         """Retrieve context from documents."""
-        cache_service = get_cache_service()
+        cache_service = await get_cache_service()
         
-        cache_key = f"retrieval:{self.user.id}:{hash(query)}"
+        scope = sorted(document_ids or [])
+        cache_key = f"retrieval:{self.user.id}:{query_digest(query, *scope)}"
         cached = await cache_service.get(cache_key)
         
         if cached:
             return cached["context"], cached["sources"]
 
-        retrieval_service = get_retrieval_service(self.user.id)
+        retrieval_service = await get_retrieval_service_async(self.user.id)
         
-        context, sources = retrieval_service.get_context(query, k=4)
-
-        if document_ids:
-            context, sources = retrieval_service.get_context(
-                query,
-                k=4,
-            )
-            context, sources = self._filter_by_documents(context, sources, document_ids)
+        context, sources = await retrieval_service.get_context_async(
+            query, k=4, document_ids=document_ids
+        )
 
         await cache_service.set(
             cache_key,
@@ -225,16 +222,6 @@ class ChatService:
 
         return context, sources
 
-    def _filter_by_documents(
-        self,
-        context: str,
-        sources: list[dict],
-        document_ids: list[str],
-    ) -> tuple[str, list[dict]]:
-        """Filter sources by document IDs."""
-        filtered = [s for s in sources if s["document_id"] in document_ids]
-        return context, filtered
-
     async def _get_or_create_conversation(
         self,
         conversation_id: Optional[str] = None,
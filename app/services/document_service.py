@@ -12,7 +12,8 @@ from app.core.exceptions import NotFoundError, ValidationError
 from app.core.logging import get_logger
 from app.schemas.database import Document, User
 from app.services.embedding_service import get_embedding_service
-from app.services.vector_service import get_vector_store
+from app.services.ingestion import embed_and_store
+from app.services.vector_service import get_vector_store_async
 from app.utils.document_parser import DocumentParser, get_file_type, save_uploaded_file
 from app.utils.text_chunker import TextChunker
 
@@ -28,7 +29,7 @@ class DocumentService:
     - File upload and storage
     - Text extraction
     - Chunking
-    - Embedding generation
+    - Embedding generation in concurrent, retried batches
     - Vector storage
     
     Design decision: This is the main orchestrator for the
@@ -136,14 +137,13 @@ class DocumentService:
         if not chunks:
             raise ValidationError("No text content found in document")
 
-        vectors = self.embedding_service.embed_documents(chunks)
+        vector_store = await get_vector_store_async(self.user.id)
 
-        vector_store = get_vector_store(self.user.id)
-        
-        vector_ids = vector_store.add_vectors(
-            vectors=vectors,
-            documents=chunks,
-            document_ids=[document.id] * len(chunks),
+        vector_ids = await embed_and_store(
+            document.id,
+            chunks,
+            self.embedding_service.embed_documents_async,
+            vector_store,
         )
 
         document.chunk_count = len(chunks)
@@ -184,8 +184,8 @@ class DocumentService:
         document = await self.get_document(document_id)
 
         try:
-            vector_store = get_vector_store(self.user.id)
-            vector_store.delete_vectors(document_id)
+            vector_store = await get_vector_store_async(self.user.id)
+            await vector_store.delete_vectors_async(document_id)
         except Exception as e:
             logger.warning(
                 "vector_deletion_failed",
@@ -0,0 +1,138 @@
+"""Micro-batching of concurrent query embeddings."""
+
+import asyncio
+import threading
+import time
+import weakref
+from typing import Awaitable, Callable, Optional
+
+from prometheus_client import Histogram
+
+from app.config import get_settings
+from app.core.logging import get_logger
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+BATCH_SIZE = Histogram(
+    "embedding_query_batch_size",
+    "Queries embedded per provider call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+BATCH_WAIT = Histogram(
+    "embedding_query_batch_wait_seconds",
+    "Time a query waited in the batcher before its batch was sent",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+
+class _PendingBatch:
+    """Queries collected on one event loop."""
+
+    def __init__(self):
+        self.items: list[tuple[str, asyncio.Future, float]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.tasks: set[asyncio.Task] = set()
+
+
+class QueryBatcher:
+    """
+    Collects concurrent queries into one embedding call.
+
+    Features:
+    - Flushes after `max_wait_ms` or once `max_size` queries are waiting
+    - Identical queries in a batch are embedded once
+    - A failed call fails every query of its batch
+    - Batch-size and wait-time histograms
+
+    Design decision: State is kept per event loop, because futures and
+    timers belong to the loop that created them; the batcher itself can
+    be shared by a process-wide `EmbeddingService`.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[list[str]], Awaitable[list[list[float]]]],
+        max_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            embed: Coroutine function embedding a list of texts
+            max_size: Largest batch (defaults to settings)
+            max_wait_ms: Longest time a query waits for company (defaults to settings)
+        """
+        self.embed = embed
+        self.max_size = max_size or settings.query_batch_max_size
+        if max_wait_ms is None:
+            max_wait_ms = settings.query_batch_max_wait_ms
+        self.max_wait = max_wait_ms / 1000
+        self._batches: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _pending(self, loop: asyncio.AbstractEventLoop) -> _PendingBatch:
+        """Pending batch of an event loop."""
+        with self._lock:
+            batch = self._batches.get(loop)
+            if batch is None:
+                batch = self._batches[loop] = _PendingBatch()
+            return batch
+
+    async def submit(self, text: str) -> list[float]:
+        """
+        Embed a query as part of the next batch.
+
+        Args:
+            text: Query string
+
+        Returns:
+            Embedding vector
+        """
+        loop = asyncio.get_running_loop()
+        batch = self._pending(loop)
+        future = loop.create_future()
+        batch.items.append((text, future, time.perf_counter()))
+
+        if len(batch.items) >= self.max_size:
+            self._flush(batch)
+        elif batch.timer is None:
+            batch.timer = loop.call_later(self.max_wait, self._flush, batch)
+
+        return await future
+
+    def _flush(self, batch: _PendingBatch) -> None:
+        """Send the waiting queries of a loop as one batch."""
+        if batch.timer is not None:
+            batch.timer.cancel()
+            batch.timer = None
+        items, batch.items = batch.items, []
+        if not items:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(items))
+        batch.tasks.add(task)
+        task.add_done_callback(batch.tasks.discard)
+
+    async def _run(self, items: list[tuple[str, asyncio.Future, float]]) -> None:
+        """Embed a batch and resolve its futures."""
+        now = time.perf_counter()
+        BATCH_SIZE.observe(len(items))
+        for _, _, enqueued in items:
+            BATCH_WAIT.observe(now - enqueued)
+
+        texts = list(dict.fromkeys(text for text, _, _ in items))
+        try:
+            vectors = dict(zip(texts, await self.embed(texts)))
+        except Exception as e:
+            logger.warning("query_batch_failed", queries=len(items), error=str(e))
+            for _, future, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for text, future, _ in items:
+            # A caller may have been cancelled while the batch was in flight.
+            if not future.done():
+                future.set_result(vectors[text])
@@ -0,0 +1,407 @@
+"""Caches of document embeddings (by content hash) and query embeddings."""
+
+import asyncio
+import base64
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from prometheus_client import Counter
+
+from app.config import get_settings
+from app.core.logging import get_logger
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+EMBEDDING_CACHE = Counter(
+    "embedding_cache_total",
+    "Embedding cache lookups by result",
+    ["backend", "result"],
+)
+
+# Stay well below SQLite's bound-parameter limit.
+BATCH_SIZE = 500
+
+
+class EmbeddingCache:
+    """
+    Embedding cache keyed by (model, dimensions, sha256(text)).
+
+    Features:
+    - Batched multi-get and multi-set
+    - Hit and miss counters per backend
+    - Sync and async access
+
+    Design decision: Key on the content hash rather than on documents, so
+    re-uploads and boilerplate repeated across documents are embedded once.
+    The base class caches nothing and is used when caching is disabled.
+    """
+
+    backend = "none"
+
+    def __init__(self, model: str, dimensions: Optional[int] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            model: Embedding model name
+            dimensions: Requested output dimensions, if the model supports it
+        """
+        self.prefix = f"emb:{model}:{dimensions or 0}:"
+
+    def key(self, text: str) -> str:
+        """Cache key of a text."""
+        return self.prefix + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """
+        Look up embeddings.
+
+        Args:
+            keys: Cache keys
+
+        Returns:
+            Mapping of found keys to embeddings
+        """
+        return {}
+
+    def set_many(self, embeddings: dict[str, list[float]]) -> None:
+        """
+        Store embeddings.
+
+        Args:
+            embeddings: Mapping of cache keys to embeddings
+        """
+
+    async def get_many_async(self, keys: list[str]) -> dict[str, list[float]]:
+        """Look up embeddings without blocking the event loop."""
+        return await asyncio.to_thread(self.get_many, keys)
+
+    async def set_many_async(self, embeddings: dict[str, list[float]]) -> None:
+        """Store embeddings without blocking the event loop."""
+        await asyncio.to_thread(self.set_many, embeddings)
+
+    def record(self, hits: int, misses: int) -> None:
+        """Count a lookup in the cache metrics."""
+        EMBEDDING_CACHE.labels(backend=self.backend, result="hit").inc(hits)
+        EMBEDDING_CACHE.labels(backend=self.backend, result="miss").inc(misses)
+
+
+class DiskEmbeddingCache(EmbeddingCache):
+    """
+    Embedding cache in a local SQLite file.
+
+    Shared by every process on the host; embeddings are stored as raw
+    float32 blobs. Rows expire `embedding_cache_ttl_seconds` after they are
+    written and the oldest are dropped beyond `embedding_cache_max_rows`;
+    writers prune at most once per `embedding_cache_prune_interval_seconds`.
+    """
+
+    backend = "disk"
+
+    def __init__(self, model: str, dimensions: Optional[int] = None, path: Optional[str] = None):
+        """
+        Open (or create) the cache file.
+
+        Args:
+            model: Embedding model name
+            dimensions: Requested output dimensions, if the model supports it
+            path: SQLite file (defaults to settings)
+        """
+        super().__init__(model, dimensions)
+        self.path = path or settings.embedding_cache_path
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL)"
+        )
+        self._migrate()
+        self._last_prune = time.monotonic()
+
+    def _migrate(self) -> None:
+        """Add the write time to caches created without one; existing rows count as new."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+        if "created_at" not in columns:
+            self._conn.execute("ALTER TABLE embeddings ADD COLUMN created_at REAL")
+            self._conn.execute("UPDATE embeddings SET created_at = ?", (time.time(),))
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_created_at ON embeddings (created_at)"
+        )
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), BATCH_SIZE):
+                batch = keys[start:start + BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                )
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32).tolist()
+        return found
+
+    def set_many(self, embeddings: dict[str, list[float]]) -> None:
+        if not embeddings:
+            return
+        now = time.time()
+        rows = [
+            (key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in embeddings.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                rows,
+            )
+
+        if time.monotonic() - self._last_prune >= settings.embedding_cache_prune_interval_seconds:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Drop expired rows, then the oldest rows beyond the size limit.
+
+        Returns:
+            Number of rows deleted
+        """
+        self._last_prune = time.monotonic()
+        cutoff = time.time() - settings.embedding_cache_ttl_seconds
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM embeddings WHERE created_at < ?", (cutoff,)
+            ).rowcount
+            if settings.embedding_cache_max_rows:
+                rows = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                excess = rows - settings.embedding_cache_max_rows
+                if excess > 0:
+                    deleted += self._conn.execute(
+                        "DELETE FROM embeddings WHERE key IN "
+                        "(SELECT key FROM embeddings ORDER BY created_at LIMIT ?)",
+                        (excess,),
+                    ).rowcount
+
+        if deleted:
+            logger.info("embedding_cache_pruned", path=self.path, rows=deleted)
+        return deleted
+
+
+class RedisEmbeddingCache(EmbeddingCache):
+    """
+    Embedding cache in Redis through `CacheService`.
+
+    Shared by every host. Redis is reached through the async client, so
+    only the async embedding paths (ingestion) use this backend.
+    """
+
+    backend = "redis"
+
+    def __init__(self, model: str, dimensions: Optional[int] = None, cache_service=None):
+        """
+        Initialize the cache.
+
+        Args:
+            model: Embedding model name
+            dimensions: Requested output dimensions, if the model supports it
+            cache_service: Cache service (defaults to the shared instance)
+        """
+        super().__init__(model, dimensions)
+        if cache_service is None:
+            from app.services.cache_service import cache_service
+        self.cache_service = cache_service
+
+    async def get_many_async(self, keys: list[str]) -> dict[str, list[float]]:
+        values = await self.cache_service.get_many(keys)
+        return {key: _decode(value) for key, value in values.items()}
+
+    async def set_many_async(self, embeddings: dict[str, list[float]]) -> None:
+        if not embeddings:
+            return
+        values = {key: _encode(vector) for key, vector in embeddings.items()}
+        await self.cache_service.set_many(values, expire=settings.embedding_cache_ttl_seconds)
+
+
+def _encode(vector: list[float]) -> str:
+    """Encode an embedding as base64 float32 for Redis."""
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def _decode(value: str) -> list[float]:
+    """Decode an embedding stored by `_encode`."""
+    return np.frombuffer(base64.b64decode(value), dtype=np.float32).tolist()
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize a query for cache lookups.
+
+    Applies NFKC, case folding and whitespace collapsing, so questions
+    that differ only in casing or spacing share an entry.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def query_digest(text: str, *scope: str) -> str:
+    """
+    Stable digest of a normalized query.
+
+    Unlike `hash()`, the digest is the same in every process and across
+    restarts, so it can key caches shared between workers.
+
+    Args:
+        text: Query text
+        scope: Extra values the cached result depends on
+
+    Returns:
+        Hex sha256 digest
+    """
+    payload = "\x00".join([normalize_query(text), *scope])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QueryEmbeddingCache:
+    """
+    Two-tier cache of query embeddings.
+
+    Features:
+    - Bounded in-process LRU, checked first by sync and async lookups
+    - Optional Redis tier shared by every worker (async lookups only)
+    - Hit and miss counters per tier
+
+    Design decision: Queries are short and repeat often within a session,
+    so the LRU answers most lookups without I/O; Redis covers repeats that
+    land on another worker or survive a restart.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, cache_service=None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: LRU capacity (defaults to settings, 0 disables caching)
+            cache_service: Redis tier (defaults to the shared instance if enabled)
+        """
+        if max_entries is None:
+            max_entries = settings.query_embedding_cache_size
+        if cache_service is None and settings.query_embedding_cache_redis:
+            from app.services.cache_service import cache_service
+        self.max_entries = max_entries
+        self.cache_service = cache_service
+        self._entries: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, dimensions: Optional[int], text: str) -> str:
+        """Cache key of a query embedded with a model."""
+        return f"qemb:{model}:{dimensions or 0}:{query_digest(text)}"
+
+    def get(self, key: str) -> Optional[list[float]]:
+        """
+        Look up a query embedding in the in-process tier.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Embedding, or None on a miss
+        """
+        if not self.max_entries:
+            return None
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+        EMBEDDING_CACHE.labels(
+            backend="query_memory", result="miss" if vector is None else "hit"
+        ).inc()
+        return vector
+
+    def set(self, key: str, vector: list[float]) -> None:
+        """
+        Store a query embedding in the in-process tier.
+
+        Args:
+            key: Cache key
+            vector: Embedding
+        """
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._entries[key] = vector
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_async(self, key: str) -> Optional[list[float]]:
+        """Look up a query embedding in memory, then in Redis."""
+        vector = self.get(key)
+        if vector is not None or not self.max_entries or self.cache_service is None:
+            return vector
+
+        value = await self.cache_service.get(key)
+        EMBEDDING_CACHE.labels(
+            backend="query_redis", result="miss" if value is None else "hit"
+        ).inc()
+        if value is None:
+            return None
+        vector = _decode(value)
+        self.set(key, vector)
+        return vector
+
+    async def set_async(self, key: str, vector: list[float]) -> None:
+        """Store a query embedding in memory and in Redis."""
+        if not self.max_entries:
+            return
+        self.set(key, vector)
+        if self.cache_service is not None:
+            await self.cache_service.set(
+                key, _encode(vector), expire=settings.query_embedding_cache_ttl_seconds
+            )
+
+
+_caches: dict[tuple, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model: str, dimensions: Optional[int] = None) -> EmbeddingCache:
+    """
+    Factory function to get the configured embedding cache.
+
+    Instances are shared per backend and model, so services created per
+    request reuse one database connection.
+    """
+    backend = settings.embedding_cache_backend
+    key = (backend, model, dimensions)
+    with _caches_lock:
+        if key not in _caches:
+            if backend == "disk":
+                _caches[key] = DiskEmbeddingCache(model, dimensions)
+            elif backend == "redis":
+                _caches[key] = RedisEmbeddingCache(model, dimensions)
+            else:
+                _caches[key] = EmbeddingCache(model, dimensions)
+        return _caches[key]
+
+
+_query_cache: Optional[QueryEmbeddingCache] = None
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """Factory function to get the process-wide query embedding cache."""
+    global _query_cache
+    with _caches_lock:
+        if _query_cache is None:
+            _query_cache = QueryEmbeddingCache()
+        return _query_cache
@@ -1,12 +1,23 @@
 """Embedding service for generating text embeddings."""
 
 import os
+import threading
+from functools import cached_property
 from typing import Optional
 
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.embeddings import HuggingFaceEmbeddings
 
 from app.config import get_settings
+from app.core.http_client import get_async_http_client, get_http_client
+from app.services.embedding_batcher import QueryBatcher
+from app.services.embedding_cache import (
+    EmbeddingCache,
+    QueryEmbeddingCache,
+    get_embedding_cache,
+    get_query_embedding_cache,
+)
+from app.services.fake_backends import FakeEmbeddings
 
 settings = get_settings()
 
@@ -19,9 +30,19 @@ class EmbeddingService:
     - OpenAI text-embedding-3-small (default)
     - OpenAI text-embedding-ada-002
     - HuggingFace sentence-transformers
+    - Local ONNX models (fp32 or int8) for air-gapped CPU deployments
+    - A deterministic fake for load tests and CI
+    
+    Document embeddings go through a content-hash cache, so only texts
+    that were never embedded with this model reach the provider. Query
+    embeddings go through an in-process LRU backed by Redis, so repeated
+    questions skip the provider round trip, and concurrent async misses
+    are micro-batched into one provider call.
     
     Design decision: Use OpenAI by default for quality,
-    with HuggingFace as self-hosted alternative.
+    with HuggingFace as self-hosted alternative. Instances are shared per
+    model (see `get_embedding_service`) and OpenAI calls go through the
+    process-wide HTTP pool.
     """
 
     def __init__(self, model_name: Optional[str] = None):
@@ -32,17 +53,58 @@ class EmbeddingService:
             model_name: Override default embedding model
         """
         self.model_name = model_name or settings.openai_embedding_model
+        self.backend = self._resolve_backend()
         self.embeddings = self._initialize_embeddings()
+        self.dimensions = settings.openai_embedding_dimensions if self._is_openai() else None
+        # Vectors that differ from the model's real output are cached apart.
+        self.cache_model = self.model_name
+        if self.backend == "onnx" and settings.local_embedding_quantized:
+            self.cache_model += ":int8"
+        elif self.backend == "fake":
+            self.cache_model = f"fake:{self.model_name}"
+        self.cache: EmbeddingCache = get_embedding_cache(self.cache_model, self.dimensions)
+        self.query_cache: QueryEmbeddingCache = get_query_embedding_cache()
+        self.query_batcher: Optional[QueryBatcher] = None
+        if settings.query_batch_max_size > 1:
+            self.query_batcher = QueryBatcher(self.embeddings.aembed_documents)
 
-    def _initialize_embeddings(self):
-        """Initialize the embedding model."""
+    def _resolve_backend(self) -> str:
+        """Backend serving the model: the configured one, or derived from the model name."""
+        if settings.embedding_backend != "auto":
+            return settings.embedding_backend
         if self.model_name.startswith("text-embedding-3") or self.model_name.startswith(
             "text-embedding-ada"
         ):
+            return "openai"
+        return "huggingface"
+
+    @cached_property
+    def output_dimension(self) -> int:
+        """Width of the vectors the backend returns, which vector stores must accept."""
+        if self._is_openai():
+            return settings.openai_embedding_dimensions
+        dimension = getattr(self.embeddings, "dimension", None)
+        return dimension or len(self.embeddings.embed_query("dimension"))
+
+    def _is_openai(self) -> bool:
+        """Check whether the model is served by the OpenAI API."""
+        return self.backend == "openai"
+
+    def _initialize_embeddings(self):
+        """Initialize the embedding model."""
+        if self.backend == "fake":
+            return FakeEmbeddings()
+        if self.backend == "onnx":
+            from app.services.local_embeddings import OnnxEmbeddings
+
+            return OnnxEmbeddings(os.path.join(settings.local_embedding_model_dir, self.model_name))
+        if self._is_openai():
             return OpenAIEmbeddings(
                 model=self.model_name,
                 openai_api_key=settings.openai_api_key,
                 dimensions=settings.openai_embedding_dimensions,
+                http_client=get_http_client(),
+                http_async_client=get_async_http_client(),
             )
         else:
             return HuggingFaceEmbeddings(
@@ -55,43 +117,129 @@ class EmbeddingService:
         """
         Generate embeddings for multiple documents.
         
+        Cached embeddings are returned as is; the remaining texts are
+        deduplicated and embedded in one provider call.
+        
         Args:
             texts: List of text strings
         
         Returns:
             List of embedding vectors
         """
-        return self.embeddings.embed_documents(texts)
+        keys = [self.cache.key(text) for text in texts]
+        found = self.cache.get_many(list(set(keys)))
+        missing = self._missing(texts, keys, found)
+
+        if missing:
+            embedded = dict(zip(missing, self.embeddings.embed_documents(list(missing.values()))))
+            self.cache.set_many(embedded)
+            found.update(embedded)
+
+        return [found[key] for key in keys]
+
+    def _missing(
+        self,
+        texts: list[str],
+        keys: list[str],
+        found: dict[str, list[float]],
+    ) -> dict[str, str]:
+        """Record cache hits and return the unique texts that still need embedding."""
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        hits = sum(key in found for key in keys)
+        self.cache.record(hits, len(keys) - hits)
+        return missing
 
     def embed_query(self, text: str) -> list[float]:
         """
         Generate embedding for a query.
         
+        Only the in-process tier of the query cache is consulted here;
+        Redis is reached from `embed_query_async`.
+        
         Args:
             text: Query string
         
         Returns:
             Embedding vector
         """
-        return self.embeddings.embed_query(text)
+        key = self.query_cache.key(self.cache_model, self.dimensions, text)
+        vector = self.query_cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.query_cache.set(key, vector)
+        return vector
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """
+        Generate embeddings for several queries in one request.
+        
+        The supported models embed queries and documents the same way,
+        so this batches through the document endpoint.
+        
+        Args:
+            texts: Query strings
+        
+        Returns:
+            List of embedding vectors
+        """
+        return self.embeddings.embed_documents(texts)
 
     async def embed_documents_async(self, texts: list[str]) -> list[list[float]]:
         """
-        Async wrapper for document embedding.
+        Async wrapper for document embedding, through the embedding cache.
         
         Note: OpenAI SDK handles async internally using httpx.
         """
-        return await self.embeddings.aembed_documents(texts)
+        keys = [self.cache.key(text) for text in texts]
+        found = await self.cache.get_many_async(list(set(keys)))
+        missing = self._missing(texts, keys, found)
+
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            embedded = dict(zip(missing, vectors))
+            await self.cache.set_many_async(embedded)
+            found.update(embedded)
+
+        return [found[key] for key in keys]
 
     async def embed_query_async(self, text: str) -> list[float]:
         """
-        Async wrapper for query embedding.
+        Async wrapper for query embedding, through both query cache tiers.
+        
+        Misses wait a few milliseconds in the query batcher so concurrent
+        requests share one provider call.
         
         Note: OpenAI SDK handles async internally using httpx.
         """
-        return await self.embeddings.aembed_query(text)
+        key = self.query_cache.key(self.cache_model, self.dimensions, text)
+        vector = await self.query_cache.get_async(key)
+        if vector is None:
+            if self.query_batcher is not None:
+                vector = await self.query_batcher.submit(text)
+            else:
+                vector = await self.embeddings.aembed_query(text)
+            await self.query_cache.set_async(key, vector)
+        return vector
+
+
+_services: dict[str, EmbeddingService] = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_service(model_name: Optional[str] = None) -> EmbeddingService:
+    """
+    Factory function to get the shared embedding service of a model.
+
+    The service is built once per process, so requests no longer pay for
+    client setup or, for HuggingFace, reloading the model from disk.
+    """
+    model_name = model_name or settings.openai_embedding_model
+    with _services_lock:
+        if model_name not in _services:
+            _services[model_name] = EmbeddingService(model_name)
+        return _services[model_name]
 
 
-def get_embedding_service() -> EmbeddingService:
-    """Factory function to get embedding service instance."""
-    return EmbeddingService()
+def get_embedding_dimension() -> int:
+    """Width of the configured model's embeddings, used to open vector stores."""
+    return get_embedding_service().output_dimension
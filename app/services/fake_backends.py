@@ -0,0 +1,137 @@
+"""Deterministic offline stand-ins for the embedding and LLM providers."""
+
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator, Optional
+
+import numpy as np
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def fake_vector(text: str, dimension: int) -> list[float]:
+    """
+    Unit vector seeded by the sha256 of a text.
+
+    The same text gets the same vector in every process.
+    """
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class FakeEmbeddings:
+    """
+    Embedding model that never leaves the process.
+
+    Features:
+    - Hash-seeded, normalized vectors of the configured dimension
+    - Configurable latency per call, so pipelines keep realistic timing
+    - Same interface as the LangChain embedding classes
+
+    Design decision: Vectors are random rather than semantic; load tests
+    need stable shapes and costs, not relevant results.
+    """
+
+    def __init__(self, dimension: Optional[int] = None, latency_ms: Optional[float] = None):
+        """
+        Initialize the model.
+
+        Args:
+            dimension: Vector dimension (defaults to settings)
+            latency_ms: Simulated provider latency per call (defaults to settings)
+        """
+        self.dimension = dimension or settings.openai_embedding_dimensions
+        if latency_ms is None:
+            latency_ms = settings.fake_embedding_latency_ms
+        self.latency = latency_ms / 1000
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        time.sleep(self.latency)
+        return [fake_vector(text, self.dimension) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        await asyncio.sleep(self.latency)
+        return [fake_vector(text, self.dimension) for text in texts]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+@dataclass
+class FakeMessage:
+    """Response or streamed chunk of `FakeChatModel`."""
+
+    content: str
+
+
+class FakeChatModel:
+    """
+    Chat model that streams a deterministic answer at a configured pace.
+
+    Features:
+    - Time to first token and tokens per second from settings
+    - Answers are built from words of the prompt, seeded by its hash
+    - `invoke` and `astream` like the LangChain chat models
+
+    Design decision: Pacing is simulated with sleeps, so streaming
+    endpoints hold connections as long as a real provider would.
+    """
+
+    def __init__(
+        self,
+        first_token_ms: Optional[float] = None,
+        tokens_per_second: Optional[float] = None,
+        response_tokens: Optional[int] = None,
+    ):
+        """
+        Initialize the model.
+
+        Args:
+            first_token_ms: Delay before the first token (defaults to settings)
+            tokens_per_second: Streaming rate, 0 = no delay (defaults to settings)
+            response_tokens: Tokens per answer (defaults to settings)
+        """
+        if first_token_ms is None:
+            first_token_ms = settings.fake_llm_first_token_ms
+        if tokens_per_second is None:
+            tokens_per_second = settings.fake_llm_tokens_per_second
+        self.first_token_delay = first_token_ms / 1000
+        self.token_delay = 1 / tokens_per_second if tokens_per_second else 0.0
+        self.response_tokens = response_tokens or settings.fake_llm_response_tokens
+
+    def _tokens(self, messages: list) -> list[str]:
+        """Answer tokens for a conversation."""
+        prompt = " ".join(str(message.content) for message in messages)
+        words = prompt.split() or ["ok"]
+        seed = int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:8], "big")
+        picks = np.random.default_rng(seed).integers(0, len(words), self.response_tokens)
+        return [words[pick] + " " for pick in picks]
+
+    def _stream(self, messages: list) -> Iterator[tuple[float, str]]:
+        """Tokens with the delay that precedes each."""
+        for position, token in enumerate(self._tokens(messages)):
+            yield (self.first_token_delay if position == 0 else self.token_delay), token
+
+    def invoke(self, messages: list) -> FakeMessage:
+        content = []
+        for delay, token in self._stream(messages):
+            time.sleep(delay)
+            content.append(token)
+        return FakeMessage("".join(content).rstrip())
+
+    async def ainvoke(self, messages: list) -> FakeMessage:
+        content = [chunk.content async for chunk in self.astream(messages)]
+        return FakeMessage("".join(content).rstrip())
+
+    async def astream(self, messages: list) -> AsyncIterator[FakeMessage]:
+        for delay, token in self._stream(messages):
+            await asyncio.sleep(delay)
+            yield FakeMessage(token)
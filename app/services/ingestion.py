@@ -0,0 +1,90 @@
+"""Concurrent, retried embedding of document chunks into a vector store."""
+
+import asyncio
+from typing import Awaitable, Callable
+
+from tenacity import AsyncRetrying, RetryCallState, stop_after_attempt, wait_exponential
+
+from app.config import get_settings
+from app.core.logging import get_logger
+from app.services.vector_service import TenantVectorStore, VectorStore
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+EmbedFunc = Callable[[list[str]], Awaitable[list[list[float]]]]
+
+
+async def embed_and_store(
+    document_id: str,
+    chunks: list[str],
+    embed: EmbedFunc,
+    vector_store: VectorStore | TenantVectorStore,
+) -> list[str]:
+    """
+    Embed chunks in concurrent batches and add each batch once embedded.
+
+    At most `embedding_concurrency` batches of `embedding_batch_size`
+    chunks are in flight. If a batch still fails after its retries, no
+    further batches start and the vectors already added for the document
+    are removed before the error is raised.
+
+    Args:
+        document_id: Document the chunks belong to
+        chunks: Chunk texts
+        embed: Async embedding function for a batch of texts
+        vector_store: User's vector store
+
+    Returns:
+        Vector IDs in chunk order
+    """
+    size = settings.embedding_batch_size
+    batches = [chunks[start:start + size] for start in range(0, len(chunks), size)]
+    semaphore = asyncio.Semaphore(settings.embedding_concurrency)
+    batch_ids: list[list[str]] = [[] for _ in batches]
+    errors: list[Exception] = []
+
+    async def ingest(index: int, batch: list[str]) -> None:
+        async with semaphore:
+            if errors:
+                return
+            try:
+                vectors = await embed_with_retry(embed, batch)
+                batch_ids[index] = await vector_store.add_vectors_async(
+                    vectors=vectors,
+                    documents=batch,
+                    document_ids=[document_id] * len(batch),
+                )
+            except Exception as e:
+                errors.append(e)
+
+    await asyncio.gather(*(ingest(index, batch) for index, batch in enumerate(batches)))
+
+    if errors:
+        try:
+            await vector_store.delete_vectors_async(document_id)
+        except Exception as e:
+            logger.error("document_rollback_failed", document_id=document_id, error=str(e))
+        raise errors[0]
+
+    logger.info("document_embedded", document_id=document_id, batches=len(batches))
+    return [vector_id for ids in batch_ids for vector_id in ids]
+
+
+async def embed_with_retry(embed: EmbedFunc, batch: list[str]) -> list[list[float]]:
+    """Embed one batch, retrying with exponential backoff."""
+    async for attempt in AsyncRetrying(
+        stop=stop_after_attempt(settings.embedding_max_attempts),
+        wait=wait_exponential(multiplier=settings.embedding_retry_backoff_seconds, max=30),
+        before_sleep=_log_retry,
+        reraise=True,
+    ):
+        with attempt:
+            return await embed(batch)
+    raise AssertionError("unreachable: AsyncRetrying re-raises the last error")
+
+
+def _log_retry(state: RetryCallState) -> None:
+    """Log a failed embedding attempt before backing off."""
+    error = state.outcome.exception() if state.outcome is not None else None
+    logger.warning("embedding_batch_retry", attempt=state.attempt_number, error=str(error))
@@ -1,14 +1,15 @@
 """LLM service for generating responses using OpenAI."""
 
+import threading
 from typing import AsyncGenerator, Optional
 
+from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
-from langchain.chains import ConversationalRetrievalChain
-from langchain.prompts import PromptTemplate
-from langchain.schema import HumanMessage, SystemMessage
 
 from app.config import get_settings
+from app.core.http_client import get_async_http_client, get_http_client
 from app.core.logging import get_logger
+from app.services.fake_backends import FakeChatModel
 
 settings = get_settings()
 logger = get_logger(__name__)
@@ -20,11 +21,14 @@ class LLMService:
     
     Features:
     - OpenAI GPT integration
+    - Offline fake model for load tests (LLM_BACKEND=fake)
     - Streaming responses
     - Configurable parameters
     - Error handling
     
-    Design decision: Use LangChain for abstraction.
+    Design decision: Use LangChain for abstraction. Instances are shared
+    per (model, temperature, max tokens) and reuse the process-wide HTTP
+    pool, so each chat turn skips client construction and TLS handshakes.
     For production, add:
     - Fallback models
     - Circuit breakers
@@ -50,14 +54,20 @@ class LLMService:
         self.max_tokens = max_tokens or settings.openai_max_tokens
         self.llm = self._initialize_llm()
 
-    def _initialize_llm(self) -> ChatOpenAI:
-        """Initialize OpenAI chat model."""
+    def _initialize_llm(self) -> ChatOpenAI | FakeChatModel:
+        """Initialize the chat model (OpenAI, or the offline fake)."""
+        if settings.llm_backend == "fake":
+            return FakeChatModel(
+                response_tokens=min(settings.fake_llm_response_tokens, self.max_tokens)
+            )
         return ChatOpenAI(
             model=self.model_name,
             temperature=self.temperature,
             max_tokens=self.max_tokens,
             api_key=settings.openai_api_key,
             streaming=True,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
         )
 
     def generate(
@@ -161,6 +171,22 @@ If the context doesn't contain relevant information, say so."""
         return prompt
 
 
-def get_llm_service() -> LLMService:
-    """Factory function to get LLM service."""
-    return LLMService()
+_services: dict[tuple, LLMService] = {}
+_services_lock = threading.Lock()
+
+
+def get_llm_service(
+    model_name: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+) -> LLMService:
+    """Factory function to get the shared LLM service for a configuration."""
+    key = (
+        model_name or settings.openai_model,
+        temperature or settings.openai_temperature,
+        max_tokens or settings.openai_max_tokens,
+    )
+    with _services_lock:
+        if key not in _services:
+            _services[key] = LLMService(*key)
+        return _services[key]
@@ -0,0 +1,218 @@
+"""Local CPU embedding engine running ONNX sentence-transformer models."""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from app.config import get_settings
+from app.core.logging import get_logger
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+def length_batches(lengths: list[int], batch_size: int) -> list[list[int]]:
+    """
+    Group inputs of similar length.
+
+    Args:
+        lengths: Token count of each input
+        batch_size: Inputs per batch
+
+    Returns:
+        Batches of input positions, shortest inputs first
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    return [order[start:start + batch_size] for start in range(0, len(order), batch_size)]
+
+
+def mean_pool(hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """
+    Average token embeddings over real tokens and L2-normalize the result.
+
+    Args:
+        hidden: Token embeddings, shape (batch, tokens, dimension)
+        attention_mask: 1 for real tokens, 0 for padding, shape (batch, tokens)
+
+    Returns:
+        Sentence embeddings, shape (batch, dimension)
+    """
+    mask = attention_mask[..., None].astype(np.float32)
+    pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    return pooled / np.maximum(norms, 1e-12)
+
+
+class OnnxEmbeddings:
+    """
+    Sentence embeddings from an ONNX model on CPU.
+
+    Features:
+    - fp32 or int8-quantized models (`model.onnx` / `model_quantized.onnx`)
+    - Length-bucketed batches, padded only to the longest input of each batch
+    - Batches run in parallel on a dedicated thread pool
+    - Same interface as the LangChain embedding classes
+    - `dimension` reports the model's native embedding width
+
+    Design decision: ONNX Runtime releases the GIL during inference, so a
+    thread pool sharing one session gives process-pool throughput without
+    loading the model once per process. The engine is built once per
+    model, through the shared `EmbeddingService`.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        quantized: Optional[bool] = None,
+        max_length: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        workers: Optional[int] = None,
+    ):
+        """
+        Load the model and tokenizer.
+
+        Args:
+            model_dir: Directory with the ONNX model and `tokenizer.json`
+            quantized: Load the int8 model (defaults to settings)
+            max_length: Tokens kept per input (defaults to settings)
+            batch_size: Inputs per inference call (defaults to settings)
+            workers: Inference threads (defaults to settings)
+        """
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The onnx embedding backend needs onnxruntime and tokenizers: "
+                "pip install -r requirements-local.txt"
+            ) from e
+
+        if quantized is None:
+            quantized = settings.local_embedding_quantized
+        self.batch_size = batch_size or settings.local_embedding_batch_size
+        workers = workers or settings.local_embedding_workers
+        model_path = os.path.join(model_dir, QUANTIZED_MODEL_FILE if quantized else MODEL_FILE)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.pad_id = (self.tokenizer.padding or {}).get("pad_id", 0)
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length or settings.local_embedding_max_length)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = settings.local_embedding_threads or max(
+            1, (os.cpu_count() or 1) // workers
+        )
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed")
+        self.dimension = self._output_dimension()
+
+        logger.info(
+            "onnx_embeddings_loaded", model=model_path, workers=workers, dimension=self.dimension
+        )
+
+    def _output_dimension(self) -> int:
+        """Width of the model's embeddings, probed if the graph leaves it symbolic."""
+        width = self.session.get_outputs()[0].shape[-1]
+        return width if isinstance(width, int) else len(self.embed_query("dimension"))
+
+    def _infer(self, encodings: list) -> np.ndarray:
+        """Run one batch, padded to its longest input."""
+        width = max(len(encoding.ids) for encoding in encodings)
+        input_ids = np.full((len(encodings), width), self.pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), width), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        output = self.session.run(None, feeds)[0]
+
+        if output.ndim == 2:
+            # The model pools itself (e.g. a `sentence_embedding` output).
+            return output / np.maximum(np.linalg.norm(output, axis=1, keepdims=True), 1e-12)
+        return mean_pool(output, attention_mask)
+
+    def _plan(self, texts: list[str]) -> tuple[list, list[list[int]]]:
+        """Tokenize texts and group them into length buckets."""
+        encodings = self.tokenizer.encode_batch(texts)
+        return encodings, length_batches([len(e.ids) for e in encodings], self.batch_size)
+
+    @staticmethod
+    def _assemble(count: int, batches: list[list[int]], results: list[np.ndarray]) -> list:
+        """Put batch results back in input order."""
+        vectors = np.empty((count, results[0].shape[1]), dtype=np.float32)
+        for positions, result in zip(batches, results):
+            vectors[positions] = result
+        return vectors.tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embed texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Normalized embedding vectors in input order
+        """
+        if not texts:
+            return []
+        encodings, batches = self._plan(texts)
+        futures = [
+            self.executor.submit(self._infer, [encodings[i] for i in batch]) for batch in batches
+        ]
+        return self._assemble(len(texts), batches, [future.result() for future in futures])
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query."""
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts on the inference pool without blocking the event loop."""
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        encodings, batches = await loop.run_in_executor(self.executor, self._plan, texts)
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(self.executor, self._infer, [encodings[i] for i in batch])
+                for batch in batches
+            )
+        )
+        return self._assemble(len(texts), batches, list(results))
+
+    async def aembed_query(self, text: str) -> list[float]:
+        """Embed a query without blocking the event loop."""
+        return (await self.aembed_documents([text]))[0]
+
+
+def quantize_model(model_dir: str) -> str:
+    """
+    Write an int8 dynamically quantized copy of a model.
+
+    Args:
+        model_dir: Directory containing `model.onnx`
+
+    Returns:
+        Path of the quantized model
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    target = os.path.join(model_dir, QUANTIZED_MODEL_FILE)
+    quantize_dynamic(os.path.join(model_dir, MODEL_FILE), target, weight_type=QuantType.QInt8)
+    logger.info("onnx_model_quantized", model=target)
+    return target
@@ -5,7 +5,8 @@ from typing import Optional
 from app.config import get_settings
 from app.core.logging import get_logger
 from app.services.embedding_service import get_embedding_service
-from app.services.vector_service import get_vector_store
+from app.services.vector_service import get_vector_store, get_vector_store_async
+from app.utils.faiss_index import higher_is_better
 
 settings = get_settings()
 logger = get_logger(__name__)
@@ -44,13 +45,17 @@ class RetrievalService:
         """
         self.user_id = user_id
         self.embedding_service = embedding_service or get_embedding_service()
-        self.vector_store = vector_store or get_vector_store(user_id)
+        self.vector_store = vector_store or get_vector_store(
+            user_id,
+            read_only=settings.faiss_mmap_search,
+        )
 
     def retrieve(
         self,
         query: str,
         k: int = 4,
         document_ids: Optional[list[str]] = None,
+        score_threshold: Optional[float] = None,
     ) -> list[dict]:
         """
         Retrieve relevant documents for a query.
@@ -59,6 +64,8 @@ class RetrievalService:
             query: User query string
             k: Number of results to return
             document_ids: Optional filter by document IDs
+            score_threshold: Drop hits with a larger L2 distance or a smaller
+                similarity, depending on the store metric (defaults to settings)
         
         Returns:
             List of relevant document chunks with metadata
@@ -71,6 +78,50 @@ class RetrievalService:
             query_vector=query_embedding,
             k=k * 2,  # Get more results for filtering
             document_ids=document_ids,
+            score_threshold=self._score_threshold(score_threshold),
+        )
+
+        filtered_results = self._filter_and_rank(results, k)
+
+        logger.info(
+            "retrieval_completed",
+            user_id=self.user_id,
+            results_found=len(filtered_results),
+        )
+
+        return filtered_results
+
+    async def retrieve_async(
+        self,
+        query: str,
+        k: int = 4,
+        document_ids: Optional[list[str]] = None,
+        score_threshold: Optional[float] = None,
+    ) -> list[dict]:
+        """
+        Retrieve relevant documents without blocking the event loop.
+        
+        The query is embedded asynchronously and the search runs on the
+        vector executor; results match `retrieve`.
+        
+        Args:
+            query: User query string
+            k: Number of results to return
+            document_ids: Optional filter by document IDs
+            score_threshold: Drop hits beyond this score (see `retrieve`)
+        
+        Returns:
+            List of relevant document chunks with metadata
+        """
+        logger.info("retrieval_started", user_id=self.user_id, query=query[:100])
+
+        query_embedding = await self.embedding_service.embed_query_async(query)
+
+        results = await self.vector_store.search_async(
+            query_vector=query_embedding,
+            k=k * 2,  # Get more results for filtering
+            document_ids=document_ids,
+            score_threshold=self._score_threshold(score_threshold),
         )
 
         filtered_results = self._filter_and_rank(results, k)
@@ -83,6 +134,58 @@ class RetrievalService:
 
         return filtered_results
 
+    def retrieve_batch(
+        self,
+        queries: list[str],
+        k: int = 4,
+        document_ids: Optional[list[str]] = None,
+        score_threshold: Optional[float] = None,
+    ) -> list[list[dict]]:
+        """
+        Retrieve relevant documents for several queries at once.
+        
+        Use for query expansion, evaluation runs or batched chat: the
+        queries are embedded in one request and searched as one batch.
+        
+        Args:
+            queries: User query strings
+            k: Number of results to return per query
+            document_ids: Optional filter by document IDs
+            score_threshold: Drop hits beyond this score (see `retrieve`)
+        
+        Returns:
+            One list of relevant document chunks per query
+        """
+        if not queries:
+            return []
+
+        logger.info("batch_retrieval_started", user_id=self.user_id, queries=len(queries))
+
+        query_embeddings = self.embedding_service.embed_queries(queries)
+
+        batch_results = self.vector_store.search_batch(
+            query_vectors=query_embeddings,
+            k=k * 2,  # Get more results for filtering
+            document_ids=document_ids,
+            score_threshold=self._score_threshold(score_threshold),
+        )
+
+        filtered_results = [self._filter_and_rank(results, k) for results in batch_results]
+
+        logger.info(
+            "batch_retrieval_completed",
+            user_id=self.user_id,
+            results_found=sum(len(results) for results in filtered_results),
+        )
+
+        return filtered_results
+
+    def _score_threshold(self, score_threshold: Optional[float]) -> Optional[float]:
+        """Resolve the score threshold, falling back to settings."""
+        if score_threshold is not None:
+            return score_threshold
+        return settings.retrieval_score_threshold
+
     def _filter_and_rank(self, results: list[dict], k: int) -> list[dict]:
         """
         Filter and rank retrieval results.
@@ -105,23 +208,45 @@ class RetrievalService:
 
         filtered = list(unique_by_doc.values())
         
-        filtered.sort(key=lambda x: x["score"])
+        filtered.sort(
+            key=lambda x: x["score"],
+            reverse=higher_is_better(self.vector_store.metric),
+        )
         
         return filtered[:k]
 
-    def get_context(self, query: str, k: int = 4) -> tuple[str, list[dict]]:
+    def get_context(
+        self,
+        query: str,
+        k: int = 4,
+        document_ids: Optional[list[str]] = None,
+    ) -> tuple[str, list[dict]]:
         """
         Get context string and source metadata for LLM.
         
         Args:
             query: User query
             k: Number of documents to retrieve
+            document_ids: Only use chunks of these documents; the filter is
+                applied inside the search, so up to k of their chunks are found
         
         Returns:
             Tuple of (context_string, sources_list)
         """
-        results = self.retrieve(query, k=k)
-        
+        return self._build_context(self.retrieve(query, k=k, document_ids=document_ids))
+
+    async def get_context_async(
+        self,
+        query: str,
+        k: int = 4,
+        document_ids: Optional[list[str]] = None,
+    ) -> tuple[str, list[dict]]:
+        """Get context string and source metadata without blocking the event loop."""
+        results = await self.retrieve_async(query, k=k, document_ids=document_ids)
+        return self._build_context(results)
+
+    def _build_context(self, results: list[dict]) -> tuple[str, list[dict]]:
+        """Format retrieval results as LLM context and source metadata."""
         if not results:
             return "", []
 
@@ -148,3 +273,9 @@ class RetrievalService:
 def get_retrieval_service(user_id: str) -> RetrievalService:
     """Factory function to get retrieval service."""
     return RetrievalService(user_id)
+
+
+async def get_retrieval_service_async(user_id: str) -> RetrievalService:
+    """Get a retrieval service, loading its vector store off the event loop."""
+    vector_store = await get_vector_store_async(user_id, read_only=settings.faiss_mmap_search)
+    return RetrievalService(user_id, vector_store=vector_store)
@@ -0,0 +1,560 @@
+"""
+Standalone vector service and its client.
+
+Runs every `VectorStore` in one process that API workers reach over a
+Unix socket or localhost TCP, so search capacity scales independently of
+the number of API workers and each index is loaded once.
+
+Start the service:
+    python -m app.services.vector_rpc --address unix:///run/lexora/vector.sock
+
+and point API workers at it with `VECTOR_RPC_ADDRESS`; `get_vector_store`
+then returns a `RemoteVectorStore`.
+
+Wire format, one frame per request and per response:
+    !II header length, payload length | JSON header | payload
+Vectors travel in the payload as raw float32 (shape in the header), so
+embeddings are never converted to and from JSON.
+"""
+
+import argparse
+import ipaddress
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import threading
+from typing import Any, Optional
+
+import numpy as np
+
+from app.config import get_settings
+from app.core.exceptions import ServiceUnavailableError
+from app.core.logging import get_logger
+from app.services.vector_service import (
+    VectorStoreManager,
+    run_in_vector_executor,
+    vector_store_manager,
+)
+
+settings = get_settings()
+logger = get_logger(__name__)
+
+FRAME_HEADER = struct.Struct("!II")
+
+# Calls that can be retried on a fresh connection without side effects.
+READ_METHODS = {"search", "search_batch", "get_stats", "info"}
+
+
+class VectorRPCError(RuntimeError):
+    """Raised when the vector service rejects or fails a call."""
+
+
+def parse_address(address: str) -> tuple[int, Any]:
+    """
+    Parse a vector service address.
+
+    The protocol has no authentication, so TCP is limited to loopback
+    hosts; reach the service from other hosts through a Unix socket
+    mounted into their containers or an authenticated tunnel.
+
+    Args:
+        address: `unix:///path/to.sock` or `tcp://host:port` with a loopback host
+
+    Returns:
+        Socket family and address
+
+    Raises:
+        ValueError: If the scheme is unknown or the TCP host is not loopback
+    """
+    if address.startswith("unix://"):
+        return socket.AF_UNIX, address[len("unix://"):]
+    if address.startswith("tcp://"):
+        host, _, port = address[len("tcp://"):].rpartition(":")
+        host = host or "127.0.0.1"
+        if not _is_loopback(host):
+            raise ValueError(f"Vector service TCP address must be loopback: {address}")
+        return socket.AF_INET, (host, int(port))
+    raise ValueError(f"Unsupported vector service address: {address}")
+
+
+def _is_loopback(host: str) -> bool:
+    """Check whether a host name or IP address only reaches this machine."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Read exactly `size` bytes, or None if the peer closed first."""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            return None
+        received += count
+    return bytes(buffer)
+
+
+def write_frame(sock: socket.socket, header: dict, payload: bytes = b"") -> None:
+    """Send one frame."""
+    header_bytes = json.dumps(header).encode("utf-8")
+    sock.sendall(FRAME_HEADER.pack(len(header_bytes), len(payload)) + header_bytes + payload)
+
+
+def read_frame(sock: socket.socket) -> Optional[tuple[dict, bytes]]:
+    """
+    Receive one frame, or None if the connection was closed.
+
+    Raises:
+        ConnectionError: If the frame declares more than
+            `vector_rpc_max_frame_bytes`; the stream cannot be resynced, so
+            the connection must be dropped
+    """
+    sizes = _recv_exact(sock, FRAME_HEADER.size)
+    if sizes is None:
+        return None
+    header_size, payload_size = FRAME_HEADER.unpack(sizes)
+    if header_size + payload_size > settings.vector_rpc_max_frame_bytes:
+        raise ConnectionError(
+            f"Frame of {header_size + payload_size} bytes exceeds "
+            f"{settings.vector_rpc_max_frame_bytes}"
+        )
+    header = _recv_exact(sock, header_size)
+    payload = _recv_exact(sock, payload_size) if payload_size else b""
+    if header is None or payload is None:
+        return None
+    return json.loads(header), payload
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Serve calls on one client connection until it closes."""
+
+    def handle(self) -> None:
+        while True:
+            try:
+                frame = read_frame(self.request)
+            except ConnectionError as e:
+                logger.warning("vector_rpc_frame_rejected", error=str(e))
+                return
+            if frame is None:
+                return
+            header, payload = frame
+            write_frame(self.request, self.server.dispatch(header, payload))
+
+
+class _ServerMixin:
+    """Dispatch shared by the Unix and TCP servers."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+    manager: VectorStoreManager
+
+    def dispatch(self, header: dict, payload: bytes) -> dict:
+        """Run one call against the user's store and build the response header."""
+        method = header.get("method")
+        try:
+            store = self.manager.get_store(
+                header["user_id"],
+                header.get("dimension", 1536),
+                read_only=header.get("read_only", False),
+            )
+            args = header.get("args", {})
+            vectors = None
+            if "shape" in header:
+                vectors = np.frombuffer(payload, dtype=np.float32).reshape(header["shape"])
+
+            if method == "search":
+                result = store.search(vectors[0], **args)
+            elif method == "search_batch":
+                result = store.search_batch(vectors, **args)
+            elif method == "add_vectors":
+                result = store.add_vectors(vectors, **args)
+            elif method == "delete_vectors":
+                result = store.delete_vectors(**args)
+            elif method == "get_stats":
+                result = store.get_stats()
+            elif method == "info":
+                result = {"total_vectors": store.total_vectors}
+            else:
+                raise ValueError(f"Unknown method: {method}")
+
+            return {"result": result, "metric": store.metric}
+        except Exception as e:
+            logger.warning("vector_rpc_failed", method=method, error=str(e))
+            return {"error": str(e), "type": type(e).__name__}
+
+
+class _UnixServer(_ServerMixin, socketserver.ThreadingUnixStreamServer):
+    pass
+
+
+class _TCPServer(_ServerMixin, socketserver.ThreadingTCPServer):
+    pass
+
+
+class VectorRPCServer:
+    """
+    Vector service owning every vector store of this host.
+
+    Features:
+    - Unix socket or localhost TCP listener
+    - One thread per client connection; connections are kept open
+    - Stores cached by the usual `VectorStoreManager` (LRU, memory budget)
+    - Errors are returned to the caller instead of closing the connection
+
+    Design decision: stdlib `socketserver` with length-prefixed frames.
+    API workers hold a few long-lived connections each, and FAISS releases
+    the GIL during searches, so a thread per connection is enough.
+    """
+
+    def __init__(self, address: str, manager: Optional[VectorStoreManager] = None):
+        """
+        Bind the service.
+
+        Args:
+            address: `unix:///path/to.sock` or loopback `tcp://host:port`
+            manager: Store manager (defaults to the process-wide one)
+        """
+        self.address = address
+        family, bind_address = parse_address(address)
+        if family == socket.AF_UNIX:
+            # A socket file left behind by a previous run blocks the bind.
+            if os.path.exists(bind_address):
+                os.unlink(bind_address)
+            self._server = _UnixServer(bind_address, _RequestHandler)
+        else:
+            self._server = _TCPServer(bind_address, _RequestHandler)
+        self._server.manager = manager or vector_store_manager
+
+    def serve_forever(self) -> None:
+        """Serve until `shutdown` is called."""
+        logger.info("vector_rpc_started", address=self.address)
+        self._server.serve_forever()
+
+    def shutdown(self) -> None:
+        """Stop serving and close the listener."""
+        self._server.shutdown()
+        self._server.server_close()
+        logger.info("vector_rpc_stopped", address=self.address)
+
+
+class VectorRPCClient:
+    """
+    Client for the vector service.
+
+    Keeps one connection per thread, so concurrent callers (including the
+    vector executor's threads) never interleave frames.
+    """
+
+    def __init__(self, address: str, timeout: Optional[float] = None):
+        """
+        Initialize the client.
+
+        Args:
+            address: `unix:///path/to.sock` or loopback `tcp://host:port`
+            timeout: Socket timeout in seconds (defaults to settings)
+        """
+        self.address = address
+        self.timeout = timeout if timeout is not None else settings.vector_rpc_timeout
+        self._family, self._connect_address = parse_address(address)
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        """Get this thread's connection, opening it if needed."""
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(self._family, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self._connect_address)
+            if self._family == socket.AF_INET:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._local.sock = sock
+        return sock
+
+    def _disconnect(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def call(
+        self,
+        method: str,
+        header: dict,
+        vectors: Optional[np.ndarray] = None,
+    ) -> dict:
+        """
+        Make one call.
+
+        Read calls are retried once on a fresh connection, which covers a
+        service restart; writes are not, since they may have been applied.
+
+        Args:
+            method: Remote method name
+            header: Store selection (`user_id`, `read_only`, `dimension`) and `args`
+            vectors: Optional float32 matrix sent as the binary payload
+
+        Returns:
+            Response header with `result` and the store `metric`
+        """
+        header = {**header, "method": method}
+        payload = b""
+        if vectors is not None:
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            header["shape"] = list(vectors.shape)
+            payload = vectors.tobytes()
+
+        attempts = 2 if method in READ_METHODS else 1
+        for attempt in range(attempts):
+            try:
+                sock = self._connection()
+                write_frame(sock, header, payload)
+                frame = read_frame(sock)
+                if frame is None:
+                    raise ConnectionError("vector service closed the connection")
+                break
+            except OSError as e:
+                self._disconnect()
+                if attempt + 1 == attempts:
+                    raise ServiceUnavailableError(
+                        "Vector service unavailable",
+                        details={"address": self.address, "error": str(e)},
+                    ) from e
+
+        response, _ = frame
+        if "error" in response:
+            raise VectorRPCError(f"{response['type']}: {response['error']}")
+        return response
+
+
+_client: Optional[VectorRPCClient] = None
+_client_lock = threading.Lock()
+
+
+def get_rpc_client() -> VectorRPCClient:
+    """Get the process-wide vector service client."""
+    global _client
+    with _client_lock:
+        if _client is None or _client.address != settings.vector_rpc_address:
+            _client = VectorRPCClient(settings.vector_rpc_address)
+        return _client
+
+
+class RemoteVectorStore:
+    """
+    A user's vector store served by the vector service.
+
+    Same interface as `VectorStore`, so retrieval and ingestion code does
+    not know whether FAISS runs in-process or in the vector service.
+    """
+
+    def __init__(
+        self,
+        user_id: str,
+        dimension: int = 1536,
+        read_only: bool = False,
+        client: Optional[VectorRPCClient] = None,
+    ):
+        """
+        Initialize the remote store.
+
+        Args:
+            user_id: User ID
+            dimension: Embedding dimension, used if the service creates the store
+            read_only: Use the service's memory-mapped, search-only store
+            client: Vector service client (defaults to the process-wide one)
+        """
+        self.user_id = user_id
+        self.dimension = dimension
+        self.read_only = read_only
+        self.client = client or get_rpc_client()
+        self._metric: Optional[str] = None
+
+    def _call(self, method: str, vectors: Optional[np.ndarray] = None, **args: Any) -> Any:
+        """Call the service for this store and remember its metric."""
+        header = {
+            "user_id": self.user_id,
+            "dimension": self.dimension,
+            "read_only": self.read_only,
+            "args": args,
+        }
+        response = self.client.call(method, header, vectors)
+        self._metric = response["metric"]
+        return response["result"]
+
+    @property
+    def metric(self) -> str:
+        """Distance metric of the remote store."""
+        if self._metric is None:
+            self._call("info")
+        return self._metric
+
+    @property
+    def total_vectors(self) -> int:
+        """Number of searchable vectors in the remote store."""
+        return self._call("info")["total_vectors"]
+
+    def add_vectors(
+        self,
+        vectors: list[list[float]],
+        documents: list[str],
+        document_ids: list[str],
+    ) -> list[str]:
+        """Add vectors (see `VectorStore.add_vectors`)."""
+        if len(vectors) == 0:
+            return []
+        array = np.array(vectors, dtype=np.float32).reshape(len(documents), -1)
+        return self._call(
+            "add_vectors",
+            array,
+            documents=documents,
+            document_ids=document_ids,
+        )
+
+    def search(
+        self,
+        query_vector: list[float],
+        k: int = 4,
+        document_ids: Optional[list[str]] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+    ) -> list[dict]:
+        """Search for similar vectors (see `VectorStore.search`)."""
+        return self._call(
+            "search",
+            np.array(query_vector, dtype=np.float32).reshape(1, -1),
+            k=k,
+            document_ids=document_ids,
+            nprobe=nprobe,
+            ef_search=ef_search,
+            score_threshold=score_threshold,
+        )
+
+    def search_batch(
+        self,
+        query_vectors: list[list[float]] | np.ndarray,
+        k: int = 4,
+        document_ids: Optional[list[str]] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+    ) -> list[list[dict]]:
+        """Search for several queries at once (see `VectorStore.search_batch`)."""
+        array = np.array(query_vectors, dtype=np.float32)
+        if len(array) == 0:
+            return []
+        return self._call(
+            "search_batch",
+            array.reshape(len(array), -1),
+            k=k,
+            document_ids=document_ids,
+            nprobe=nprobe,
+            ef_search=ef_search,
+            score_threshold=score_threshold,
+        )
+
+    def delete_vectors(self, document_id: str) -> bool:
+        """Delete all vectors of a document (see `VectorStore.delete_vectors`)."""
+        return self._call("delete_vectors", document_id=document_id)
+
+    async def add_vectors_async(
+        self,
+        vectors: list[list[float]],
+        documents: list[str],
+        document_ids: list[str],
+    ) -> list[str]:
+        """Add vectors without blocking the event loop."""
+        return await run_in_vector_executor(self.add_vectors, vectors, documents, document_ids)
+
+    async def search_async(
+        self,
+        query_vector: list[float],
+        k: int = 4,
+        document_ids: Optional[list[str]] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+    ) -> list[dict]:
+        """Search without blocking the event loop."""
+        return await run_in_vector_executor(
+            self.search,
+            query_vector,
+            k,
+            document_ids,
+            nprobe,
+            ef_search,
+            score_threshold,
+        )
+
+    async def search_batch_async(
+        self,
+        query_vectors: list[list[float]] | np.ndarray,
+        k: int = 4,
+        document_ids: Optional[list[str]] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+    ) -> list[list[dict]]:
+        """Search several queries without blocking the event loop."""
+        return await run_in_vector_executor(
+            self.search_batch,
+            query_vectors,
+            k,
+            document_ids,
+            nprobe,
+            ef_search,
+            score_threshold,
+        )
+
+    async def delete_vectors_async(self, document_id: str) -> bool:
+        """Delete a document's vectors without blocking the event loop."""
+        return await run_in_vector_executor(self.delete_vectors, document_id)
+
+    def refresh(self) -> bool:
+        """The service keeps its stores fresh; nothing to do client-side."""
+        return False
+
+    def memory_bytes(self) -> int:
+        """Indexes live in the vector service, not in this process."""
+        return 0
+
+    def get_stats(self) -> dict:
+        """Get vector store statistics from the service."""
+        return self._call("get_stats")
+
+
+def main() -> None:
+    """Run the vector service until SIGTERM or SIGINT."""
+    from app.core.logging import configure_logging
+
+    parser = argparse.ArgumentParser(description="Lexora vector service")
+    parser.add_argument(
+        "--address",
+        default=settings.vector_rpc_address or "tcp://127.0.0.1:7070",
+        help="unix:///path/to.sock or tcp://127.0.0.1:port",
+    )
+    args = parser.parse_args()
+
+    configure_logging()
+    server = VectorRPCServer(args.address)
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever, so it must run on another thread.
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,92 +1,672 @@
 """Vector storage service using FAISS."""
 
+import asyncio
+import functools
 import json
 import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Iterable, Iterator, Optional, TypeVar
 
 import faiss
 import numpy as np
+from prometheus_client import Counter, Gauge
 
 from app.config import get_settings
 from app.core.logging import get_logger
-from app.services.embedding_service import get_embedding_service
+from app.utils.chunk_store import ChunkStore
+from app.utils.dimension_reduction import DimensionReducer
+from app.utils.faiss_index import (
+    IndexConfig,
+    build_ann_index,
+    can_train,
+    create_flat_index,
+    estimate_memory,
+    get_index_ids,
+    get_index_type,
+    get_search_params,
+    higher_is_better,
+    is_compressed,
+    is_id_mapped,
+    normalize,
+    reconstruct_all,
+    search_subset,
+    supports_remove,
+    unwrap_index,
+)
+from app.utils.rwlock import ReadWriteLock
+from app.utils.vector_storage import (
+    FileLock,
+    VectorFile,
+    WriteAheadLog,
+    file_checksum,
+    write_atomic,
+)
 
 settings = get_settings()
 logger = get_logger(__name__)
 
+T = TypeVar("T")
+
+VECTOR_STORE_CACHE = Counter(
+    "vector_store_cache_total",
+    "Vector store cache lookups and evictions",
+    ["result"],
+)
+
+VECTOR_STORE_CACHE_BYTES = Gauge(
+    "vector_store_cache_bytes",
+    "Estimated memory held by cached vector stores",
+)
+
 
 class VectorStore:
     """
     FAISS-based vector store for document embeddings.
     
     Features:
-    - Persistent storage with JSON metadata
+    - Persistent storage with SQLite chunk metadata
     - User-level isolation
     - Efficient similarity search
     - Incremental updates
+    - Automatic promotion from exact to approximate (IVF / HNSW) search
+    - Compressed (SQ8 / PQ) indexes with exact re-ranking from the sidecar
+    - L2 distance, inner product or cosine similarity scores
+    - Stable int64 chunk IDs with in-place deletion
+    - Raw vector sidecar so rebuilds never re-embed
+    - Write-ahead log with background checkpoint merges
+    - Read-only mode that memory-maps the checkpoint for sharing across workers
+    - Catches up with writes made by other processes
+    - Reader/writer locking: searches run concurrently and pause only for
+      the in-memory part of a write; async variants run on a bounded executor
+    - Optional reduced dimension (Matryoshka truncation or PCA) per store
+    
+    On-disk layout per user:
+    - `checkpoint.json`: manifest naming the current and previous snapshot,
+      with their WAL sequence numbers, checksums and vector counts
+    - `index-<seq>-<crc>.faiss`: snapshots of the index (current and previous)
+    - `wal.log` + `wal.head`: operations since the checkpoint, newest seq
+    - `vectors.bin` / `vector_ids.bin`: raw vectors (reduced, if the store is)
+    - `reduction.json` (+ `reduction-pca.npz`): the store's dimension reduction
+    - `chunks.db`: chunk text and document mapping
+    - `write.lock` / `checkpoint.lock`: cross-process locks
+    
+    Snapshots are fsynced and renamed into place before the manifest that
+    names them, so a crash never leaves a torn checkpoint. A snapshot that
+    fails its checksum falls back to the previous one plus the log kept
+    since it, then to a rebuild from the vector sidecar.
+    
+    Any number of processes may open the same store. Writes are serialized
+    by an exclusive lock on `write.lock` and start by replaying operations
+    other processes have logged, so chunk IDs and sequence numbers never
+    collide. Cached stores compare the published log head and the
+    checkpoint file with what they have applied and replay only the new
+    log records.
     
     Design decision: Use FAISS for its speed and recall performance.
     For 10k+ users, consider migrating to Pinecone or Weaviate.
     """
 
-    def __init__(self, user_id: str, dimension: int = 1536):
+    def __init__(
+        self,
+        user_id: str,
+        dimension: int = 1536,
+        config: Optional[IndexConfig] = None,
+        read_only: bool = False,
+    ):
         """
         Initialize vector store for a user.
         
         Args:
             user_id: User ID for isolation
-            dimension: Embedding dimension
+            dimension: Embedding dimension of the vectors callers pass in
+            config: Index configuration (defaults to settings and tenant overrides)
+            read_only: Memory-map the checkpoint and reject writes. Operations
+                logged after the checkpoint are held in a small in-memory
+                delta index, so processes on one host share the index pages.
         """
         self.user_id = user_id
-        self.dimension = dimension
+        self.input_dimension = dimension
+        self.config = config or IndexConfig.for_user(user_id)
+        self.metric = self.config.metric
+        self.read_only = read_only
         self.index_path = self._get_index_path()
-        self.metadata_path = self._get_metadata_path()
+        self.checkpoint_path = self._get_checkpoint_path()
+        directory = os.path.dirname(self.index_path)
+        self.directory = directory
+        self._open_vector_file()
+        self.chunks = ChunkStore(directory, settings.faiss_metadata_mmap_bytes)
+        self.wal = WriteAheadLog(directory)
+        self._writer_lock = FileLock(os.path.join(directory, "write.lock"))
+        self._checkpoint_lock = FileLock(os.path.join(directory, "checkpoint.lock"))
+        self._checkpoint_version: Optional[tuple] = None
+        self._bad_snapshots: set[str] = set()
         self.index: Optional[faiss.Index] = None
-        self.metadata: list[dict] = []
+        self.delta_index: Optional[faiss.Index] = None
+        self.deleted_ids: set[int] = set()
+        self.next_id = 0
+        self.checkpoint_seq = 0
+        self._lock = threading.RLock()
+        self._index_lock = ReadWriteLock()
+        self._merge_lock = threading.RLock()
+        self._merge_thread: Optional[threading.Thread] = None
         self._load_or_create_index()
 
+    def _open_vector_file(self) -> None:
+        """
+        Load the store's dimension reduction and open the sidecar at the kept dimension.
+
+        Raises:
+            ValueError: If the store holds embeddings of another dimension
+        """
+        self.reducer = self._load_reducer()
+        accepted = (
+            self.reducer.input_dimension
+            if self.reducer is not None
+            else VectorFile.stored_dimension(self.directory)
+        )
+        if accepted is not None and accepted != self.input_dimension:
+            raise ValueError(
+                f"Vector store {self.user_id} holds {accepted}-dimension embeddings, "
+                f"but the embedding model returns {self.input_dimension}"
+            )
+        self.dimension = self.reducer.dimension if self.reducer else self.input_dimension
+        self.vector_file = VectorFile(self.directory, self.dimension, settings.faiss_vector_dtype)
+
+    def _load_reducer(self) -> Optional[DimensionReducer]:
+        """
+        Load the store's dimension reduction, starting one for a new store if configured.
+
+        A reducer whose dimension does not match the sidecar was saved by a
+        reduction interrupted before the sidecar was rewritten, and is ignored.
+        """
+        stored = VectorFile.stored_dimension(self.directory)
+        reducer = DimensionReducer.load(self.directory)
+        if reducer is not None and stored is not None and stored != reducer.dimension:
+            return None
+
+        is_new = stored is None and not any(
+            os.path.exists(path) for path in (self.checkpoint_path, self.index_path)
+        )
+        if (
+            reducer is None
+            and is_new
+            and not self.read_only
+            and self.config.reduction == "truncate"
+            and 0 < self.config.reduced_dimension < self.input_dimension
+        ):
+            reducer = DimensionReducer(
+                "truncate", self.input_dimension, self.config.reduced_dimension
+            )
+            reducer.save(self.directory)
+            logger.info("store_reduced", user_id=self.user_id, dimension=reducer.dimension)
+        return reducer
+
+    def _reduce(self, vectors: np.ndarray) -> np.ndarray:
+        """Map embeddings to the dimension the store keeps."""
+        return self.reducer.transform(vectors) if self.reducer is not None else vectors
+
     def _get_index_path(self) -> str:
-        """Get path for FAISS index file."""
+        """Get path of the unversioned index file written by earlier versions."""
         base_path = Path(settings.faiss_index_path) / self.user_id
         base_path.mkdir(parents=True, exist_ok=True)
         return str(base_path / "index.faiss")
 
-    def _get_metadata_path(self) -> str:
-        """Get path for metadata JSON file."""
+    def _get_checkpoint_path(self) -> str:
+        """Get path for the checkpoint JSON file."""
         base_path = Path(settings.faiss_index_path) / self.user_id
         base_path.mkdir(parents=True, exist_ok=True)
-        return str(base_path / "metadata.json")
+        return str(base_path / "checkpoint.json")
+
+    def _get_legacy_metadata_path(self) -> str:
+        """Get path of the JSON metadata written by earlier versions."""
+        return str(Path(settings.faiss_index_path) / self.user_id / "metadata.json")
 
     def _load_or_create_index(self) -> None:
-        """Load existing index or create new one."""
-        if os.path.exists(self.index_path) and os.path.exists(self.metadata_path):
+        """Load the last checkpoint and replay the write-ahead log."""
+        if self.read_only:
+            self._load_index()
+            return
+
+        # Loading may migrate or recover the store, so writers load under the lock.
+        with self._writer_lock.hold():
+            self._load_index()
+
+    def _load_index(self) -> None:
+        """Read the checkpoint, replay the log and re-checkpoint migrated stores."""
+        needs_checkpoint = False
+        legacy_path = self._get_legacy_metadata_path()
+        self._checkpoint_version = self._stat_checkpoint()
+
+        if os.path.exists(self.checkpoint_path) or (
+            os.path.exists(legacy_path) and os.path.exists(self.index_path)
+        ):
             try:
-                self.index = faiss.read_index(self.index_path)
-                with open(self.metadata_path, "r") as f:
-                    self.metadata = json.load(f)
-                logger.info("index_loaded", user_id=self.user_id, vectors=len(self.metadata))
+                if os.path.exists(legacy_path):
+                    self._migrate_metadata_json(legacy_path)
+                    needs_checkpoint = True
+                else:
+                    # Snapshots and the manifest are replaced under this lock.
+                    with self._checkpoint_lock.hold(exclusive=False):
+                        # Replace a bad snapshot rather than keep it as the fallback.
+                        needs_checkpoint = self._load_snapshot()
             except Exception as e:
                 logger.warning(
                     "index_load_failed",
                     user_id=self.user_id,
                     error=str(e),
                 )
+                needs_checkpoint = self._recover_from_vector_file()
+                if not needs_checkpoint:
+                    self._quarantine_checkpoint()
+                    self._create_new_index()
+        elif self.chunks.chunk_count:
+            needs_checkpoint = self._recover_from_vector_file()
+            if not needs_checkpoint:
                 self._create_new_index()
         else:
             self._create_new_index()
 
+        if self.read_only:
+            self.delta_index = create_flat_index(self.dimension, self.metric)
+            self._replay_wal()
+            logger.info(
+                "index_mapped",
+                user_id=self.user_id,
+                vectors=self.index.ntotal,
+                delta=self.delta_index.ntotal,
+            )
+            return
+
+        self._replay_wal()
+        self._backfill_vector_file()
+        self.next_id = max(self.next_id, self.vector_file.next_id())
+        if self.metric != self.config.metric:
+            logger.info(
+                "index_metric_changed",
+                user_id=self.user_id,
+                old_metric=self.metric,
+                metric=self.config.metric,
+            )
+            self.metric = self.config.metric
+            self._rebuild_index()
+            needs_checkpoint = True
+        if needs_checkpoint:
+            self._save(force=True)
+            if os.path.exists(legacy_path):
+                os.remove(legacy_path)
+                if os.path.exists(self.index_path):
+                    os.remove(self.index_path)
+        logger.info("index_loaded", user_id=self.user_id, vectors=self.index.ntotal)
+
+    def _load_snapshot(self) -> bool:
+        """
+        Load the newest snapshot named by the manifest that passes verification.
+
+        The previous snapshot is used if the current one is missing,
+        unreadable or fails its checksum; the log since the previous
+        snapshot is kept for exactly this case.
+
+        Returns:
+            True if the store fell back to the previous snapshot
+
+        Raises:
+            ValueError: If no snapshot is usable
+        """
+        with open(self.checkpoint_path, "r") as f:
+            manifest = json.load(f)
+
+        for entry in (manifest, manifest.get("previous")):
+            if entry is None:
+                continue
+            index_file = entry.get("index_file", "index.faiss")
+            try:
+                index = self._read_snapshot(entry)
+            except Exception as e:
+                self._bad_snapshots.add(index_file)
+                logger.warning(
+                    "snapshot_invalid",
+                    user_id=self.user_id,
+                    index_file=index_file,
+                    error=str(e),
+                )
+                continue
+
+            self.index = index
+            self._load_checkpoint(entry)
+            self._load_tombstones()
+            if entry is manifest:
+                return False
+            logger.warning("snapshot_fallback", user_id=self.user_id, index_file=index_file)
+            return True
+
+        raise ValueError("No usable index snapshot")
+
+    def _read_snapshot(self, entry: dict) -> faiss.Index:
+        """Read a snapshot and check it against its manifest entry."""
+        # Checkpoints written before the manifest name `index.faiss` and carry no checks.
+        path = os.path.join(self.directory, entry.get("index_file", "index.faiss"))
+        if "checksum" in entry and file_checksum(path) != entry["checksum"]:
+            raise ValueError(f"Checksum mismatch: {path}")
+
+        index = self._read_index(path)
+        if index.d != self.dimension:
+            raise ValueError(f"Expected {self.dimension} dimensions, found {index.d}: {path}")
+        if "vectors" in entry and index.ntotal != entry["vectors"]:
+            raise ValueError(f"Expected {entry['vectors']} vectors, found {index.ntotal}: {path}")
+        return index
+
+    def _read_index(self, path: str) -> faiss.Index:
+        """Read a snapshot, memory-mapped in read-only mode."""
+        if not self.read_only:
+            return faiss.read_index(path)
+
+        # IO_FLAG_MMAP_IFC maps flat, HNSW and quantizer codes as well as inverted
+        # lists; plain IO_FLAG_MMAP maps only the latter.
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+
+    def _quarantine_checkpoint(self) -> None:
+        """
+        Move an unusable manifest aside so its snapshots are never cleaned up.
+
+        Reached only when neither snapshot nor the vector sidecar can
+        restore the index; the files are kept for manual recovery.
+        """
+        if self.read_only or not os.path.exists(self.checkpoint_path):
+            return
+
+        path = f"{self.checkpoint_path}.corrupt-{int(time.time())}"
+        os.replace(self.checkpoint_path, path)
+        logger.error("index_unrecoverable", user_id=self.user_id, checkpoint=path)
+
+    def _load_tombstones(self) -> None:
+        """Find chunks deleted from the chunk store but still in an HNSW snapshot."""
+        if supports_remove(self.index) or not self.index.ntotal:
+            return
+        deleted = np.setdiff1d(get_index_ids(self.index), self.chunks.all_ids())
+        self.deleted_ids = set(deleted.tolist())
+
+    def _load_checkpoint(self, data: dict) -> None:
+        """Restore counters and the index metric from a checkpoint."""
+        self.metric = data.get("metric", "l2")
+        self.next_id = data["next_id"]
+        self.checkpoint_seq = data.get("wal_seq", 0)
+        self.wal.seq = self.checkpoint_seq
+
+    def _replay_wal(self) -> None:
+        """Apply operations logged after the checkpoint."""
+        with self._index_lock.write():
+            self._apply_log(self.wal.replay(self.checkpoint_seq))
+
+    def _apply_log(self, records: Iterable[dict]) -> None:
+        """Apply logged operations to the in-memory index."""
+        replayed = 0
+        removed = []
+
+        for record in records:
+            if self.read_only:
+                self._apply_to_delta(record)
+            elif record["op"] == "add":
+                # Records written before chunk metadata moved to SQLite carry the chunks.
+                if "chunks" in record:
+                    self.chunks.add(record["chunks"])
+                    ids = [chunk["faiss_id"] for chunk in record["chunks"]]
+                else:
+                    ids = record["ids"]
+                vectors, found = self._read_vectors(np.array(ids, dtype=np.int64))
+                self.index.add_with_ids(vectors, found)
+                self.next_id = max(self.next_id, record["next_id"])
+            elif record["op"] == "delete":
+                self.chunks.delete(record["ids"])
+                removed.extend(record["ids"])
+            replayed += 1
+
+        if self.read_only:
+            if replayed:
+                logger.info("wal_replayed", user_id=self.user_id, records=replayed)
+            return
+
+        if removed:
+            if supports_remove(self.index):
+                self.index.remove_ids(np.array(removed, dtype=np.int64))
+            else:
+                self.deleted_ids.update(removed)
+        self._maybe_promote()
+
+        if replayed:
+            logger.info("wal_replayed", user_id=self.user_id, records=replayed)
+
+    def _apply_to_delta(self, record: dict) -> None:
+        """Apply a logged operation to the in-memory delta of a read-only store."""
+        if record["op"] == "add":
+            ids = record.get("ids") or [chunk["faiss_id"] for chunk in record["chunks"]]
+            vectors, found = self._read_vectors(np.array(ids, dtype=np.int64))
+            self.delta_index.add_with_ids(vectors, found)
+        elif record["op"] == "delete":
+            ids = np.array(record["ids"], dtype=np.int64)
+            in_delta = np.isin(ids, faiss.vector_to_array(self.delta_index.id_map))
+            self.delta_index.remove_ids(ids[in_delta])
+            self.deleted_ids.update(ids[~in_delta].tolist())
+
+    def _stat_checkpoint(self) -> Optional[tuple]:
+        """Version of the checkpoint file on disk."""
+        try:
+            stat = os.stat(self.checkpoint_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def _read_checkpoint_seq(self) -> int:
+        """Sequence number of the checkpoint currently on disk."""
+        try:
+            with open(self.checkpoint_path, "r") as f:
+                return json.load(f).get("wal_seq", 0)
+        except (OSError, ValueError):
+            return 0
+
+    def refresh(self) -> bool:
+        """
+        Catch up with operations written by other processes.
+
+        Costs one small read and a `stat` when nothing changed. New log
+        records are replayed incrementally; the store is reloaded only when
+        another process wrote a checkpoint covering records this store has
+        not seen (or, for a read-only store, any newer checkpoint to re-map).
+
+        Returns:
+            True if the store was behind
+        """
+        if (
+            self.wal.head() <= self.wal.seq
+            and self._stat_checkpoint() == self._checkpoint_version
+        ):
+            return False
+
+        with self._lock:
+            self._catch_up()
+        return True
+
+    def _catch_up(self) -> None:
+        """Apply log records and checkpoints written since the last catch-up."""
+        checkpoint_version = self._stat_checkpoint()
+        expected = self.wal.seq + 1
+        records = list(self.wal.tail(self.wal.seq))
+        # Sealed logs are discarded only after their checkpoint is in place,
+        # so reading it after the log reveals any records we missed.
+        disk_seq = self._read_checkpoint_seq()
+        applied_seq = self.checkpoint_seq if self.read_only else self.wal.seq
+
+        # A dimension reduction rewrote the sidecar under us.
+        reduced = any(record["op"] == "reduce" for record in records)
+        if disk_seq > applied_seq or (records and records[0]["seq"] != expected) or reduced:
+            self._reload()
+        else:
+            self.checkpoint_seq = max(self.checkpoint_seq, disk_seq)
+            self._checkpoint_version = checkpoint_version
+            if records:
+                self.chunks.refresh_counts()
+                with self._index_lock.write():
+                    self._apply_log(records)
+
+        if records:
+            logger.info("index_refreshed", user_id=self.user_id, seq=self.wal.seq)
+
+    def _reload(self) -> None:
+        """Discard in-memory state and load the store from disk again."""
+        with self._index_lock.write():
+            self.index = None
+            self.delta_index = None
+            self.metric = self.config.metric
+            self.deleted_ids = set()
+            self.next_id = 0
+            self.checkpoint_seq = 0
+            self.wal = WriteAheadLog(os.path.dirname(self.index_path))
+            self.chunks.refresh_counts()
+            self._open_vector_file()
+            self._load_or_create_index()
+
+    @contextmanager
+    def _write(self) -> Iterator[None]:
+        """Hold the cross-process writer lock, caught up with other writers."""
+        self._check_writable()
+        with self._writer_lock.hold(), self._lock:
+            self._catch_up()
+            yield
+
+    def _backfill_vector_file(self) -> None:
+        """Seed the vector sidecar of a store created before it existed."""
+        if len(self.vector_file) or not self.index.ntotal:
+            return
+
+        if get_index_type(self.index) not in ("flat", "hnsw"):
+            logger.warning("vector_file_missing", user_id=self.user_id)
+            return
+
+        vectors, ids = reconstruct_all(self.index)
+        order = np.argsort(ids)
+        self.vector_file.append(ids[order], vectors[order])
+        logger.info("vector_file_backfilled", user_id=self.user_id, vectors=len(ids))
+
+    def _recover_from_vector_file(self) -> bool:
+        """
+        Rebuild an unreadable or missing index from the chunk store and vector sidecar.
+
+        Chunk rows are committed before an operation is logged, so the chunk
+        store already reflects every logged operation and the log is skipped.
+
+        Returns:
+            True if the store was recovered
+        """
+        if not self.vector_file.exists():
+            return False
+
+        self.metric = self.config.metric
+        self._rebuild_index()
+
+        for _ in self.wal.replay(0):
+            pass
+        self.checkpoint_seq = self.wal.seq
+        self.next_id = self.vector_file.next_id()
+
+        logger.info("index_recovered", user_id=self.user_id, vectors=self.index.ntotal)
+        return True
+
+    def _migrate_metadata_json(self, path: str) -> None:
+        """
+        Move chunks from the JSON metadata of earlier versions into the chunk store.
+
+        Stores whose metadata is a plain list address chunks by list position.
+        The position becomes the chunk ID; existing `vec_*` string IDs are kept
+        so document records stay valid, and new IDs start above them.
+        """
+        self.index = faiss.read_index(self.index_path)
+        with open(path, "r") as f:
+            data = json.load(f)
+
+        if isinstance(data, dict):
+            self.chunks.add(data["chunks"])
+            self._load_checkpoint(data)
+            logger.info("metadata_migrated", user_id=self.user_id, chunks=len(data["chunks"]))
+            return
+
+        ids = np.arange(len(data), dtype=np.int64)
+        highest = max((int(m["id"].split("_")[-1]) for m in data), default=-1)
+        self.metric = "l2"
+
+        for faiss_id, meta in zip(ids.tolist(), data):
+            meta["faiss_id"] = faiss_id
+        self.chunks.add(data)
+        self.next_id = max(len(data), highest + 1)
+
+        if not is_id_mapped(self.index):
+            storage = unwrap_index(self.index)
+            vectors = storage.reconstruct_n(0, storage.ntotal) if storage.ntotal else np.empty(
+                (0, self.dimension), dtype=np.float32
+            )
+            self.index = self._build_index(vectors, ids)
+
+        logger.info("index_migrated", user_id=self.user_id, vectors=len(data))
+
     def _create_new_index(self) -> None:
         """Create a new FAISS index."""
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.metadata = []
+        self.metric = self.config.metric
+        self.index = create_flat_index(self.dimension, self.metric)
+        self.deleted_ids = set()
+        self.next_id = 0
+        self.checkpoint_seq = 0
         logger.info("index_created", user_id=self.user_id, dimension=self.dimension)
 
+    def _build_index(self, vectors: np.ndarray, ids: np.ndarray) -> faiss.Index:
+        """Build the index type appropriate for the given vectors."""
+        if self._should_promote(len(vectors)):
+            return build_ann_index(self.config, self.dimension, vectors, ids)
+
+        index = create_flat_index(self.dimension, self.metric)
+        if len(vectors):
+            index.add_with_ids(vectors, ids)
+        return index
+
+    def _should_promote(self, count: int) -> bool:
+        """Check whether a flat index of `count` vectors should become an ANN index."""
+        return (
+            self.config.index_type != "flat"
+            and count >= self.config.promotion_threshold
+            and can_train(self.config, count)
+        )
+
+    def _maybe_promote(self) -> None:
+        """Promote a flat index to the configured ANN index once it is large enough."""
+        if get_index_type(self.index) != "flat" or not self._should_promote(self.index.ntotal):
+            return
+
+        vectors, ids = self._read_live_vectors()
+        index = build_ann_index(self.config, self.dimension, vectors, ids)
+        with self._index_lock.write():
+            self.index = index
+            self.deleted_ids = set()
+        logger.info(
+            "index_promoted",
+            user_id=self.user_id,
+            index_type=self.config.index_type,
+            vectors=self.index.ntotal,
+        )
+
+    def _check_writable(self) -> None:
+        """Reject writes to a read-only store."""
+        if self.read_only:
+            raise RuntimeError(f"Vector store for {self.user_id} is opened read-only")
+
     def add_vectors(
         self,
         vectors: list[list[float]],
         documents: list[str],
         document_ids: list[str],
+        tenant_id: Optional[str] = None,
     ) -> list[str]:
         """
         Add vectors to the index.
@@ -95,31 +675,59 @@ class VectorStore:
             vectors: List of embedding vectors
             documents: List of text chunks
             document_ids: List of source document IDs
+            tenant_id: Owning user of the chunks in a shared shard
         
         Returns:
             List of vector IDs
         """
-        if not vectors:
+        if len(vectors) == 0:
             return []
 
+        self._check_writable()
         vectors_array = np.array(vectors, dtype=np.float32)
         
         if vectors_array.ndim == 1:
             vectors_array = vectors_array.reshape(1, -1)
+        # Checked before IDs are allocated, so a bad batch leaves nothing on disk.
+        if vectors_array.ndim != 2 or vectors_array.shape[1] != self.input_dimension:
+            raise ValueError(
+                f"Expected vectors of {self.input_dimension} dimensions, "
+                f"got shape {vectors_array.shape}"
+            )
+        if not len(documents) == len(document_ids) == len(vectors_array):
+            raise ValueError(
+                f"Got {len(vectors_array)} vectors, {len(documents)} documents "
+                f"and {len(document_ids)} document IDs"
+            )
 
-        vector_ids = []
-        start_id = len(self.metadata)
+        with self._write():
+            # Reduced under the writer lock, so a concurrent migration cannot slip in.
+            vectors_array = self._reduce(vectors_array)
+            ids = np.arange(self.next_id, self.next_id + len(vectors_array), dtype=np.int64)
+            self.next_id += len(vectors_array)
 
-        for i, (vector, doc, doc_id) in enumerate(zip(vectors, documents, document_ids)):
-            vector_ids.append(f"vec_{start_id + i}")
-            self.metadata.append({
-                "id": f"vec_{start_id + i}",
-                "text": doc,
-                "document_id": doc_id,
-            })
+            chunks = [
+                {
+                    "id": f"vec_{faiss_id}",
+                    "faiss_id": faiss_id,
+                    "text": doc,
+                    "document_id": doc_id,
+                    "tenant_id": tenant_id,
+                }
+                for faiss_id, doc, doc_id in zip(ids.tolist(), documents, document_ids)
+            ]
 
-        self.index.add(vectors_array)
-        self._save()
+            # The sidecar keeps raw vectors so the metric can be changed later.
+            self.vector_file.append(ids, vectors_array)
+            self.chunks.add(chunks)
+            self.wal.append("add", ids=ids.tolist(), next_id=self.next_id)
+
+            normalized = normalize(vectors_array.copy(), self.metric)
+            with self._index_lock.write():
+                self.index.add_with_ids(normalized, ids)
+            self._maybe_promote()
+
+        self._schedule_merge()
 
         logger.info(
             "vectors_added",
@@ -128,153 +736,1214 @@ class VectorStore:
             total=self.index.ntotal,
         )
 
-        return vector_ids
+        return [chunk["id"] for chunk in chunks]
 
     def search(
         self,
         query_vector: list[float],
         k: int = 4,
         document_ids: Optional[list[str]] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+        tenant_id: Optional[str] = None,
     ) -> list[dict]:
         """
         Search for similar vectors.
         
+        The document filter is applied inside the search, so up to `k`
+        chunks of the given documents are returned even when other
+        documents hold closer matches.
+        
         Args:
             query_vector: Query embedding
             k: Number of results to return
             document_ids: Optional filter by document IDs
+            nprobe: IVF lists to visit (defaults to the store config)
+            ef_search: HNSW candidate list size (defaults to the store config)
+            score_threshold: Drop hits scoring worse than this (see `search_batch`)
+            tenant_id: Only return chunks of this user in a shared shard
         
         Returns:
             List of matching documents with scores
         """
-        if self.index.ntotal == 0:
-            return []
+        return self.search_batch(
+            [query_vector],
+            k,
+            document_ids,
+            nprobe,
+            ef_search,
+            score_threshold,
+            tenant_id,
+        )[0]
 
-        query_array = np.array([query_vector], dtype=np.float32)
+    def search_batch(
+        self,
+        query_vectors: list[list[float]] | np.ndarray,
+        k: int = 4,
+        document_ids: Optional[list[str]] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+        tenant_id: Optional[str] = None,
+    ) -> list[list[dict]]:
+        """
+        Search for similar vectors for several queries at once.
         
-        if self.index.ntotal < k:
-            k = self.index.ntotal
+        All queries go to FAISS as one (n, d) matrix and the chunk
+        metadata of every hit is fetched in a single lookup, which is much
+        cheaper than n calls to `search`.
+        
+        Scores are squared L2 distances (lower is better) for the `l2`
+        metric and similarities (higher is better, in [-1, 1] for
+        cosine) for `ip` and `cosine`.
+        
+        Args:
+            query_vectors: (n, d) query embeddings
+            k: Number of results to return per query
+            document_ids: Optional filter by document IDs, shared by all queries
+            nprobe: IVF lists to visit (defaults to the store config)
+            ef_search: HNSW candidate list size (defaults to the store config)
+            score_threshold: Drop hits with a larger distance (`l2`) or a
+                smaller similarity (`ip`, `cosine`) before their chunks are read
+            tenant_id: Only return chunks of this user in a shared shard; the
+                filter is applied inside the search like `document_ids`
+        
+        Returns:
+            One list of matching documents with scores per query
+        """
+        query_array = np.array(query_vectors, dtype=np.float32).reshape(-1, self.input_dimension)
+        empty = [[] for _ in range(len(query_array))]
 
-        distances, indices = self.index.search(query_array, k)
+        # Shared hold: searches run side by side and only wait for the brief
+        # in-memory index updates of a write, not for its disk I/O.
+        with self._index_lock.read():
+            # Reduced under the hold, so the queries match the index being searched.
+            query_array = normalize(self._reduce(query_array), self.metric)
+            total = self.total_vectors
+            if total == 0 or len(query_array) == 0:
+                return empty
 
-        results = []
-        seen = set()
+            allowed = None
+            if document_ids:
+                allowed = self.chunks.ids_for_documents(document_ids, tenant_id)
+            elif tenant_id is not None:
+                allowed = self.chunks.ids_for_tenant(tenant_id)
+            if allowed is not None:
+                total = min(total, len(allowed))
+                if total == 0:
+                    return empty
 
-        for distance, idx in zip(distances[0], indices[0]):
-            if idx < 0 or idx >= len(self.metadata):
-                continue
+            if total < k:
+                k = total
 
-            meta = self.metadata[idx]
-            
-            if document_ids and meta["document_id"] not in document_ids:
-                continue
+            distances, indices = self._search_index(query_array, k, nprobe, ef_search, allowed)
 
-            if meta["id"] in seen:
-                continue
+        if score_threshold is not None:
+            if higher_is_better(self.metric):
+                indices = np.where(distances >= score_threshold, indices, -1)
+            else:
+                indices = np.where(distances <= score_threshold, indices, -1)
 
-            seen.add(meta["id"])
-            results.append({
-                "text": meta["text"],
-                "document_id": meta["document_id"],
-                "vector_id": meta["id"],
-                "score": float(distance),
-            })
+        chunks = self.chunks.get_many(np.unique(indices[indices >= 0]).tolist())
 
-        return results
+        batch_results = []
+        for row_distances, row_indices in zip(distances, indices):
+            results = []
+            seen = set()
 
-    def delete_vectors(self, document_id: str) -> bool:
+            for distance, idx in zip(row_distances, row_indices):
+                meta = chunks.get(int(idx))
+                if meta is None:
+                    continue
+
+                if meta["id"] in seen:
+                    continue
+
+                seen.add(meta["id"])
+                results.append({
+                    "text": meta["text"],
+                    "document_id": meta["document_id"],
+                    "vector_id": meta["id"],
+                    "score": float(distance),
+                })
+
+            batch_results.append(results)
+
+        return batch_results
+
+    @property
+    def total_vectors(self) -> int:
+        """Number of searchable vectors, including the read-only delta."""
+        delta = self.delta_index.ntotal if self.delta_index is not None else 0
+        return self.index.ntotal - len(self.deleted_ids) + delta
+
+    def _search_index(
+        self,
+        query_array: np.ndarray,
+        k: int,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        allowed: Optional[np.ndarray] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Run a k-NN search over the index and, in read-only mode, the delta.
+
+        Args:
+            query_array: (n, d) float32 queries
+            k: Number of neighbors
+            nprobe: IVF lists to visit (defaults to the store config)
+            ef_search: HNSW candidate list size (defaults to the store config)
+            allowed: Restrict the search to these chunk IDs
+
+        Returns:
+            Tuple of ((n, k) distances, (n, k) chunk IDs)
+        """
+        exact = allowed is not None and self.vector_file.exists()
+        if exact and len(allowed) <= self.config.exact_filter_max:
+            return self._search_subset(query_array, k, allowed)
+
+        # Selectors must stay referenced until the search returns. The
+        # allowed IDs come from the chunk store, which never lists deleted chunks.
+        deleted = selector = None
+        if allowed is not None:
+            selector = faiss.IDSelectorBatch(allowed)
+        elif self.deleted_ids:
+            deleted = faiss.IDSelectorBatch(np.fromiter(self.deleted_ids, dtype=np.int64))
+            selector = faiss.IDSelectorNot(deleted)
+
+        rerank = (
+            self.config.rerank_factor > 1
+            and is_compressed(self.index)
+            and self.vector_file.exists()
+        )
+        fetch_k = k * self.config.rerank_factor if rerank else k
+
+        params = get_search_params(
+            self.index,
+            nprobe=nprobe or self.config.nprobe,
+            ef_search=ef_search or self.config.ef_search,
+            selector=selector,
+        )
+        distances, indices = self.index.search(query_array, fetch_k, params=params)
+
+        if self.delta_index is not None and self.delta_index.ntotal:
+            delta_k = min(fetch_k, self.delta_index.ntotal)
+            delta_params = get_search_params(self.delta_index, 0, 0, selector=selector)
+            delta_distances, delta_indices = self.delta_index.search(
+                query_array, delta_k, params=delta_params
+            )
+            distances, indices = self._merge_results(
+                distances, indices, delta_distances, delta_indices, fetch_k, self.metric
+            )
+
+        if rerank:
+            distances, indices = self._rerank(query_array, indices, k)
+
+        # IVF probes and HNSW walks can run out of candidates that pass a
+        # narrow filter; the exact search always finds k when they exist.
+        if exact and (indices < 0).any():
+            return self._search_subset(query_array, k, allowed)
+        return distances, indices
+
+    def _search_subset(
+        self,
+        query_array: np.ndarray,
+        k: int,
+        ids: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Exact search over the given chunks, read from the vector sidecar."""
+        vectors, found = self._read_vectors(np.sort(ids))
+        return search_subset(query_array, vectors, found, k, self.metric)
+
+    def _rerank(
+        self,
+        query_array: np.ndarray,
+        candidates: np.ndarray,
+        k: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Re-rank compressed-index candidates against their full-precision vectors."""
+        worst = -np.inf if higher_is_better(self.metric) else np.inf
+        distances = np.full((len(query_array), k), worst, dtype=np.float32)
+        indices = np.full((len(query_array), k), -1, dtype=np.int64)
+        for row, (query, ids) in enumerate(zip(query_array, candidates)):
+            vectors, found = self._read_vectors(np.unique(ids[ids >= 0]))
+            row_distances, row_indices = search_subset(query[None], vectors, found, k, self.metric)
+            distances[row], indices[row] = row_distances[0], row_indices[0]
+        return distances, indices
+
+    @staticmethod
+    def _merge_results(
+        distances: np.ndarray,
+        indices: np.ndarray,
+        delta_distances: np.ndarray,
+        delta_indices: np.ndarray,
+        k: int,
+        metric: str,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Merge two k-NN result sets into the k closest per query."""
+        distances = np.hstack([distances, delta_distances])
+        indices = np.hstack([indices, delta_indices])
+        keys = -distances if higher_is_better(metric) else distances
+        order = np.argsort(keys, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(distances, order, 1), np.take_along_axis(indices, order, 1)
+
+    def delete_vectors(self, document_id: str, tenant_id: Optional[str] = None) -> bool:
         """
         Delete all vectors associated with a document.
         
-        Note: FAISS doesn't support direct deletion, so we rebuild.
-        For production with frequent deletions, consider using
-        a different index type or database.
+        Chunks are removed from the index by ID, so no embeddings are
+        recomputed. HNSW graphs cannot drop nodes in place; their chunks
+        become tombstones that searches skip until `compact` rebuilds
+        the graph.
         
         Args:
             document_id: Document ID to delete
+            tenant_id: Owning user of the document in a shared shard
         
         Returns:
             True if successful
         """
-        original_count = len(self.metadata)
-        self.metadata = [m for m in self.metadata if m["document_id"] != document_id]
+        with self._write():
+            ids = self.chunks.ids_for_documents([document_id], tenant_id).tolist()
 
-        if len(self.metadata) == original_count:
-            return False
+            if not ids:
+                return False
 
-        self._rebuild_index()
-        logger.info("vectors_deleted", user_id=self.user_id, document_id=document_id)
+            self.chunks.delete(ids)
+            self.wal.append("delete", ids=ids)
+
+            with self._index_lock.write():
+                if supports_remove(self.index):
+                    self.index.remove_ids(np.array(ids, dtype=np.int64))
+                else:
+                    self.deleted_ids.update(ids)
+
+        self._schedule_merge()
+
+        logger.info(
+            "vectors_deleted",
+            user_id=self.user_id,
+            document_id=document_id,
+            count=len(ids),
+        )
         return True
 
+    async def add_vectors_async(
+        self,
+        vectors: list[list[float]],
+        documents: list[str],
+        document_ids: list[str],
+        tenant_id: Optional[str] = None,
+    ) -> list[str]:
+        """Add vectors on the vector executor (see `add_vectors`)."""
+        return await run_in_vector_executor(
+            self.add_vectors,
+            vectors,
+            documents,
+            document_ids,
+            tenant_id,
+        )
+
+    async def search_async(
+        self,
+        query_vector: list[float],
+        k: int = 4,
+        document_ids: Optional[list[str]] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+        tenant_id: Optional[str] = None,
+    ) -> list[dict]:
+        """Search on the vector executor (see `search`)."""
+        return await run_in_vector_executor(
+            self.search,
+            query_vector,
+            k,
+            document_ids,
+            nprobe,
+            ef_search,
+            score_threshold,
+            tenant_id,
+        )
+
+    async def search_batch_async(
+        self,
+        query_vectors: list[list[float]] | np.ndarray,
+        k: int = 4,
+        document_ids: Optional[list[str]] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+        tenant_id: Optional[str] = None,
+    ) -> list[list[dict]]:
+        """Search several queries on the vector executor (see `search_batch`)."""
+        return await run_in_vector_executor(
+            self.search_batch,
+            query_vectors,
+            k,
+            document_ids,
+            nprobe,
+            ef_search,
+            score_threshold,
+            tenant_id,
+        )
+
+    async def delete_vectors_async(
+        self,
+        document_id: str,
+        tenant_id: Optional[str] = None,
+    ) -> bool:
+        """Delete a document's vectors on the vector executor (see `delete_vectors`)."""
+        return await run_in_vector_executor(self.delete_vectors, document_id, tenant_id)
+
+    def _read_vectors(self, ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Read vectors from the sidecar, normalized for the cosine metric."""
+        vectors, found = self.vector_file.read(ids)
+        return normalize(vectors, self.metric), found
+
+    def _read_live_vectors(self) -> tuple[np.ndarray, np.ndarray]:
+        """Read the vectors of all live chunks from the sidecar."""
+        return self._read_vectors(self.chunks.all_ids())
+
     def _rebuild_index(self) -> None:
-        """Rebuild FAISS index from metadata."""
-        if not self.metadata:
-            self.index = faiss.IndexFlatL2(self.dimension)
-            self._save()
+        """Rebuild FAISS index from the vector sidecar, keeping live chunks only."""
+        if not self.chunks.chunk_count:
+            with self._index_lock.write():
+                self.index = create_flat_index(self.dimension, self.metric)
+                self.deleted_ids = set()
             return
 
-        texts = [m["text"] for m in self.metadata]
-        embedding_service = get_embedding_service()
-        vectors = embedding_service.embed_documents(texts)
+        vectors, ids = self._read_live_vectors()
+        if len(ids) != self.chunks.chunk_count:
+            logger.warning(
+                "vector_file_incomplete",
+                user_id=self.user_id,
+                expected=self.chunks.chunk_count,
+                found=len(ids),
+            )
+
+        index = self._build_index(vectors, ids)
+        with self._index_lock.write():
+            self.index = index
+            self.deleted_ids = set()
+
+    def reindex(self, config: IndexConfig) -> None:
+        """
+        Switch the store to a new index configuration.
+
+        Vectors are read from the sidecar, so no embeddings are recomputed.
 
-        self.index = faiss.IndexFlatL2(self.dimension)
-        self.index.add(np.array(vectors, dtype=np.float32))
+        Args:
+            config: New index configuration
+        """
+        with self._write():
+            self.config = config
+            self.metric = config.metric
+            self._rebuild_index()
         self._save()
+        logger.info(
+            "index_rebuilt",
+            user_id=self.user_id,
+            index_type=get_index_type(self.index),
+            vectors=self.index.ntotal,
+        )
 
-    def _save(self) -> None:
-        """Save index and metadata to disk."""
-        if self.index is not None:
-            faiss.write_index(self.index, self.index_path)
-        
-        with open(self.metadata_path, "w") as f:
-            json.dump(self.metadata, f)
+    def _schedule_merge(self) -> None:
+        """Start a background merge once the write-ahead log grows large enough."""
+        if self.wal.nbytes < settings.faiss_wal_merge_bytes:
+            return
+        if self._merge_thread is not None and self._merge_thread.is_alive():
+            return
+
+        self._merge_thread = threading.Thread(target=self.merge, daemon=True)
+        self._merge_thread.start()
+
+    def merge(self) -> None:
+        """Fold the write-ahead log into a new checkpoint."""
+        if self.read_only or self.wal.seq == self.checkpoint_seq:
+            return
+        self._save()
+
+    def _save(self, force: bool = False) -> None:
+        """
+        Write a checkpoint of the index to disk.
+
+        The index is serialized under the writer lock and the log is sealed
+        at that point; the files are written afterwards so adds and
+        searches are not blocked by disk I/O. A checkpoint that another
+        process has already superseded is not written.
+
+        Args:
+            force: Also rewrite a checkpoint at the current sequence number,
+                after a migration, recovery or metric change
+        """
+        with self._merge_lock:
+            with self._write():
+                seq = self.wal.seq
+                index_bytes = faiss.serialize_index(self.index)
+                checksum = zlib.crc32(index_bytes)
+                entry = {
+                    "next_id": self.next_id,
+                    "wal_seq": seq,
+                    "metric": self.metric,
+                    # Forced checkpoints reuse the sequence number, so the name
+                    # also carries the checksum to avoid replacing a named snapshot.
+                    "index_file": f"index-{seq:012d}-{checksum:08x}.faiss",
+                    "checksum": checksum,
+                    "vectors": self.index.ntotal,
+                }
+                self.wal.seal()
+
+            with self._checkpoint_lock.hold():
+                disk_seq = self._read_checkpoint_seq()
+                written = disk_seq < seq or (force and disk_seq == seq)
+                if written:
+                    self._write_snapshot(entry, index_bytes)
+                self.checkpoint_seq = max(seq, disk_seq)
+
+        logger.info("checkpoint_saved", user_id=self.user_id, seq=seq, written=written)
+
+    def _write_snapshot(self, entry: dict, index_bytes: np.ndarray) -> None:
+        """
+        Write a snapshot and make it current, keeping the last good one as fallback.
+
+        The snapshot file is durable before the manifest names it, and the
+        manifest is replaced atomically, so readers and crash recovery see
+        either the old or the new checkpoint. Log files are kept back to
+        the previous snapshot's sequence number so it can still be replayed.
+
+        Args:
+            entry: Manifest entry of the new snapshot
+            index_bytes: Serialized index
+        """
+        try:
+            with open(self.checkpoint_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+
+        candidates = [c for c in (manifest, manifest.get("previous")) if c]
+        previous = next(
+            (
+                {key: value for key, value in c.items() if key != "previous"}
+                for c in candidates
+                if c.get("index_file", "index.faiss") not in self._bad_snapshots
+                and c.get("index_file", "index.faiss") != entry["index_file"]
+            ),
+            None,
+        )
+
+        write_atomic(os.path.join(self.directory, entry["index_file"]), index_bytes)
+        write_atomic(
+            self.checkpoint_path,
+            json.dumps({**entry, "previous": previous}).encode("utf-8"),
+        )
+
+        keep = {entry["index_file"], previous and previous.get("index_file", "index.faiss")}
+        for candidate in candidates:
+            index_file = candidate.get("index_file", "index.faiss")
+            if index_file not in keep and os.path.exists(os.path.join(self.directory, index_file)):
+                os.remove(os.path.join(self.directory, index_file))
+        self.wal.discard_sealed(previous.get("wal_seq", 0) if previous else entry["wal_seq"])
+
+    @property
+    def dead_rows(self) -> int:
+        """Sidecar rows of deleted chunks, reclaimable by `compact`."""
+        return max(0, len(self.vector_file) - self.chunks.chunk_count)
+
+    def needs_compaction(self, min_dead_ratio: Optional[float] = None) -> bool:
+        """
+        Check whether enough space is held by deleted chunks to compact.
+
+        Args:
+            min_dead_ratio: Fraction of dead sidecar rows (defaults to settings)
+        """
+        if min_dead_ratio is None:
+            min_dead_ratio = settings.faiss_compaction_min_dead_ratio
+        rows = len(self.vector_file)
+        return rows > 0 and self.dead_rows / rows >= min_dead_ratio
+
+    def compact(self) -> dict:
+        """
+        Reclaim the space left by deleted chunks and rebuild the index.
+
+        Drops dead rows from the vector sidecar, rebuilds (and retrains)
+        the index from the live vectors, vacuums the chunk store and writes
+        a fresh checkpoint. Chunk IDs are
+        never reassigned: they are referenced by document records and are
+        allocated from a counter that never goes back.
+
+        Returns:
+            Report with bytes before and after, bytes reclaimed, rows
+            dropped, live vectors and duration in milliseconds
+        """
+        self._check_writable()
+        start = time.perf_counter()
+
+        with self._merge_lock, self._write():
+            bytes_before = self._disk_bytes()
+            rows_before = len(self.vector_file)
+
+            keep = self.chunks.all_ids()
+            if rows_before:
+                # Keep the highest ID row so the sidecar still knows the next free ID.
+                keep = np.union1d(keep, [self.vector_file.next_id() - 1])
+            vectors, ids = self.vector_file.read(keep)
+            self.vector_file.rewrite(ids, vectors)
+
+            self._rebuild_index()
+            self.chunks.vacuum()
+            self._save(force=True)
+            bytes_after = self._disk_bytes()
+
+        report = {
+            "user_id": self.user_id,
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_after,
+            "bytes_reclaimed": bytes_before - bytes_after,
+            "rows_dropped": rows_before - len(ids),
+            "vectors": self.index.ntotal,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+        logger.info("store_compacted", **report)
+        return report
+
+    def reduce_dimension(
+        self,
+        dimension: int,
+        method: str = "truncate",
+        sample_size: Optional[int] = None,
+    ) -> dict:
+        """
+        Migrate the store to reduced-dimension vectors.
+
+        Fits the reduction on the sidecar's vectors (PCA trains on a sample
+        of them), rewrites the sidecar with the reduced vectors, rebuilds
+        the index and writes a fresh checkpoint. Embeddings are not
+        recomputed; searches and adds keep taking full-size embeddings.
+
+        Args:
+            dimension: Dimension to keep
+            method: "truncate" or "pca"
+            sample_size: Most vectors PCA is trained on (defaults to settings)
+
+        Returns:
+            Report with dimensions, vectors, bytes and index memory before
+            and after, and duration in milliseconds
+        """
+        self._check_writable()
+        if self.reducer is not None:
+            raise ValueError(f"Store {self.user_id} is already reduced to {self.dimension}")
+        start = time.perf_counter()
+
+        with self._merge_lock, self._write():
+            bytes_before = self._disk_bytes()
+            memory_before = self.memory_bytes()
+
+            keep = self.chunks.all_ids()
+            if len(self.vector_file):
+                # Keep the highest ID row so the sidecar still knows the next free ID.
+                keep = np.union1d(keep, [self.vector_file.next_id() - 1])
+            vectors, ids = self.vector_file.read(keep)
+            reducer = DimensionReducer.fit(
+                method, vectors, dimension, sample_size or settings.faiss_pca_sample_size
+            )
+            reduced = reducer.transform(vectors)
+
+            # Searches pause until the index matches the reduced queries.
+            with self._index_lock.write():
+                # The reducer is ignored until the sidecar it describes is in place.
+                reducer.save(self.directory)
+                self.vector_file.rewrite(ids, reduced)
+                self.reducer = reducer
+                self.dimension = reducer.dimension
+                self._rebuild_index()
+            self.wal.append("reduce", dimension=reducer.dimension)
+            self._save(force=True)
+
+        report = {
+            "user_id": self.user_id,
+            "method": method,
+            "input_dimension": self.input_dimension,
+            "dimension": self.dimension,
+            "vectors": self.index.ntotal,
+            "bytes_before": bytes_before,
+            "bytes_after": self._disk_bytes(),
+            "memory_before": memory_before,
+            "memory_after": self.memory_bytes(),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+        logger.info("store_dimension_reduced", **report)
+        return report
+
+    def _disk_bytes(self) -> int:
+        """Total size of the store's files."""
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file())
+
+    def memory_bytes(self) -> int:
+        """
+        Estimate the memory held by this store's index.
+
+        Pages of a memory-mapped checkpoint are shared page cache, so only
+        the private delta of a read-only store is counted.
+        """
+        if self.read_only and self.delta_index is not None:
+            return estimate_memory(self.delta_index)
+        return estimate_memory(self.index) if self.index is not None else 0
+
+    def close(self) -> None:
+        """Release the store's file handles."""
+        if self._merge_thread is not None:
+            self._merge_thread.join()
+        self.chunks.close()
 
     def get_stats(self) -> dict:
         """Get vector store statistics."""
         return {
             "user_id": self.user_id,
-            "total_vectors": self.index.ntotal if self.index else 0,
-            "documents": len(set(m["document_id"] for m in self.metadata)),
+            "total_vectors": self.total_vectors if self.index else 0,
+            "read_only": self.read_only,
+            "metric": self.metric,
+            "dimension": self.dimension,
+            "index_type": get_index_type(self.index) if self.index else None,
+            "memory_bytes": self.memory_bytes(),
+            "documents": self.chunks.document_count,
+            "chunks": self.chunks.chunk_count,
+            "vector_file_bytes": self.vector_file.nbytes,
+            "metadata_bytes": self.chunks.nbytes,
+            "wal_bytes": self.wal.nbytes,
         }
 
 
+class TenantVectorStore:
+    """
+    One user's view of a shared vector store shard.
+
+    Features:
+    - Same interface as `VectorStore`, so retrieval and ingestion code is
+      unchanged in sharded mode
+    - Every search is filtered to the user's chunks inside the index
+    - Adds tag chunks with the user; deletes only touch the user's chunks
+
+    Design decision: The view holds no state of its own. The shard owns
+    the index, log and locks, so all users hashed to it share one trained
+    ANN index and one set of files.
+    """
+
+    def __init__(self, store: VectorStore, user_id: str):
+        """
+        Initialize the view.
+
+        Args:
+            store: Shard holding the user's chunks
+            user_id: User the view is scoped to
+        """
+        self.store = store
+        self.user_id = user_id
+
+    @property
+    def dimension(self) -> int:
+        """Embedding dimension the shard accepts."""
+        return self.store.input_dimension
+
+    @property
+    def metric(self) -> str:
+        """Distance metric of the shard."""
+        return self.store.metric
+
+    @property
+    def read_only(self) -> bool:
+        """Whether the shard was opened read-only."""
+        return self.store.read_only
+
+    @property
+    def total_vectors(self) -> int:
+        """Number of the user's chunks in the shard."""
+        return self.store.chunks.tenant_counts(self.user_id)[0]
+
+    def add_vectors(
+        self,
+        vectors: list[list[float]],
+        documents: list[str],
+        document_ids: list[str],
+    ) -> list[str]:
+        """Add the user's vectors to the shard (see `VectorStore.add_vectors`)."""
+        return self.store.add_vectors(vectors, documents, document_ids, self.user_id)
+
+    def search(
+        self,
+        query_vector: list[float],
+        k: int = 4,
+        document_ids: Optional[list[str]] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+    ) -> list[dict]:
+        """Search the user's chunks (see `VectorStore.search`)."""
+        return self.store.search(
+            query_vector,
+            k,
+            document_ids,
+            nprobe,
+            ef_search,
+            score_threshold,
+            self.user_id,
+        )
+
+    def search_batch(
+        self,
+        query_vectors: list[list[float]] | np.ndarray,
+        k: int = 4,
+        document_ids: Optional[list[str]] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+    ) -> list[list[dict]]:
+        """Search the user's chunks for several queries (see `VectorStore.search_batch`)."""
+        return self.store.search_batch(
+            query_vectors,
+            k,
+            document_ids,
+            nprobe,
+            ef_search,
+            score_threshold,
+            self.user_id,
+        )
+
+    def delete_vectors(self, document_id: str) -> bool:
+        """Delete one of the user's documents (see `VectorStore.delete_vectors`)."""
+        return self.store.delete_vectors(document_id, self.user_id)
+
+    async def add_vectors_async(
+        self,
+        vectors: list[list[float]],
+        documents: list[str],
+        document_ids: list[str],
+    ) -> list[str]:
+        """Add the user's vectors on the vector executor."""
+        return await self.store.add_vectors_async(vectors, documents, document_ids, self.user_id)
+
+    async def search_async(
+        self,
+        query_vector: list[float],
+        k: int = 4,
+        document_ids: Optional[list[str]] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+    ) -> list[dict]:
+        """Search the user's chunks on the vector executor."""
+        return await self.store.search_async(
+            query_vector,
+            k,
+            document_ids,
+            nprobe,
+            ef_search,
+            score_threshold,
+            self.user_id,
+        )
+
+    async def search_batch_async(
+        self,
+        query_vectors: list[list[float]] | np.ndarray,
+        k: int = 4,
+        document_ids: Optional[list[str]] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        score_threshold: Optional[float] = None,
+    ) -> list[list[dict]]:
+        """Search the user's chunks for several queries on the vector executor."""
+        return await self.store.search_batch_async(
+            query_vectors,
+            k,
+            document_ids,
+            nprobe,
+            ef_search,
+            score_threshold,
+            self.user_id,
+        )
+
+    async def delete_vectors_async(self, document_id: str) -> bool:
+        """Delete one of the user's documents on the vector executor."""
+        return await self.store.delete_vectors_async(document_id, self.user_id)
+
+    def refresh(self) -> bool:
+        """Catch the shard up with other processes (see `VectorStore.refresh`)."""
+        return self.store.refresh()
+
+    def memory_bytes(self) -> int:
+        """Memory held by the shard, which all its users share."""
+        return self.store.memory_bytes()
+
+    def get_stats(self) -> dict:
+        """Get the user's statistics within the shard."""
+        chunks, documents = self.store.chunks.tenant_counts(self.user_id)
+        return {
+            "user_id": self.user_id,
+            "shard": self.store.user_id,
+            "total_vectors": chunks,
+            "read_only": self.read_only,
+            "metric": self.metric,
+            "index_type": get_index_type(self.store.index) if self.store.index else None,
+            "documents": documents,
+            "chunks": chunks,
+            "shard_vectors": self.store.total_vectors,
+        }
+
+
+def shard_for_user(user_id: str) -> str:
+    """
+    Name the shard that holds a user's chunks in sharded mode.
+
+    The hash is stable across processes and restarts, unlike `hash()`.
+
+    Args:
+        user_id: User ID
+
+    Returns:
+        Shard name, used as the store directory
+    """
+    shard = zlib.crc32(user_id.encode("utf-8")) % settings.faiss_shard_count
+    return f"shard-{shard:03d}"
+
+
 class VectorStoreManager:
     """
     Manager for multiple user vector stores.
     
-    Provides caching and lifecycle management.
+    Provides caching and lifecycle management. Cached stores are kept
+    in least-recently-used order under a total memory budget; evicted
+    stores are closed and reloaded from disk on their next access.
+
+    Stores load outside the cache lock, so a cold tenant never stalls
+    requests for the others; concurrent requests for the same cold store
+    wait for a single load.
+
+    With `faiss_shard_count` set, users are hash-partitioned into that
+    many shared shards and each caller gets a `TenantVectorStore` view of
+    its shard instead of a store of its own.
     """
 
-    def __init__(self):
-        self._stores: dict[str, VectorStore] = {}
+    def __init__(self, max_bytes: Optional[int] = None):
+        """
+        Initialize the manager.
+
+        Args:
+            max_bytes: Memory budget for cached stores (defaults to settings)
+        """
+        self.max_bytes = max_bytes if max_bytes is not None else settings.vector_store_cache_bytes
+        self._stores: OrderedDict[tuple[str, bool], VectorStore] = OrderedDict()
+        self._sizes: dict[tuple[str, bool], int] = {}
+        self._loading: dict[tuple[str, bool], Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
-    def get_store(self, user_id: str, dimension: int = 1536) -> VectorStore:
+    def get_store(
+        self,
+        user_id: str,
+        dimension: int = 1536,
+        read_only: bool = False,
+    ) -> VectorStore | TenantVectorStore:
         """
         Get or create vector store for a user.
         
         Args:
             user_id: User ID
             dimension: Embedding dimension
+            read_only: Return the memory-mapped, search-only store
         
         Returns:
-            VectorStore instance
+            VectorStore instance, or the user's view of its shard in sharded mode
         """
-        if user_id not in self._stores:
-            self._stores[user_id] = VectorStore(user_id, dimension)
-        
-        return self._stores[user_id]
+        shard = shard_for_user(user_id) if settings.faiss_shard_count else None
+        key = (shard or user_id, read_only)
+        loading = None
+        with self._lock:
+            store = self._stores.get(key)
+            if store is not None:
+                self._stores.move_to_end(key)
+                self.hits += 1
+                VECTOR_STORE_CACHE.labels(result="hit").inc()
+                evicted = self._evict(keep=key)
+            elif key in self._loading:
+                waiting = self._loading[key]
+            else:
+                loading = waiting = self._loading[key] = Future()
+
+        if loading is not None:
+            store = self._load(key, dimension, loading)
+        elif store is None:
+            store = waiting.result()
+        else:
+            self._close(evicted)
+
+        # Pick up documents ingested by other workers since the last access.
+        store.refresh()
+        return TenantVectorStore(store, user_id) if shard else store
+
+    def _load(self, key: tuple[str, bool], dimension: int, loading: Future) -> VectorStore:
+        """Load a store outside the cache lock and publish it to waiting callers."""
+        try:
+            store = VectorStore(key[0], dimension, read_only=key[1])
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            loading.set_exception(e)
+            raise
+
+        with self._lock:
+            self._stores[key] = store
+            del self._loading[key]
+            self.misses += 1
+            VECTOR_STORE_CACHE.labels(result="miss").inc()
+            evicted = self._evict(keep=key)
+        loading.set_result(store)
+        self._close(evicted)
+        return store
+
+    @staticmethod
+    def _close(stores: list[VectorStore]) -> None:
+        """Close stores dropped from the cache, outside the cache lock."""
+        for store in stores:
+            store.close()
+
+    def _evict(self, keep: tuple[str, bool]) -> list[VectorStore]:
+        """
+        Drop least recently used stores until the cache fits its budget.
+
+        Returns:
+            The dropped stores, for the caller to close once it releases the lock
+        """
+        # Stores grow as documents are added, so sizes are re-measured each time.
+        self._sizes = {key: store.memory_bytes() for key, store in self._stores.items()}
+        total = sum(self._sizes.values())
+        evicted = []
+
+        while total > self.max_bytes and len(self._stores) > 1:
+            key = next(iter(self._stores))
+            if key == keep:
+                break
+            # Pending writes are already durable in the store's WAL, so
+            # closing is safe; in-flight callers reopen what they still use.
+            evicted.append(self._stores.pop(key))
+            total -= self._sizes.pop(key)
+            self.evictions += 1
+            VECTOR_STORE_CACHE.labels(result="eviction").inc()
+            logger.info("vector_store_evicted", user_id=key[0], read_only=key[1])
+
+        VECTOR_STORE_CACHE_BYTES.set(total)
+        return evicted
 
     def delete_store(self, user_id: str) -> bool:
-        """Delete user's vector store."""
-        if user_id in self._stores:
-            del self._stores[user_id]
-            return True
-        return False
+        """
+        Delete user's vector store from the cache.
+
+        In sharded mode this drops the user's whole shard, which the next
+        access to any of its users reloads.
+        """
+        name = shard_for_user(user_id) if settings.faiss_shard_count else user_id
+        dropped = []
+        with self._lock:
+            for key in [(name, False), (name, True)]:
+                if key in self._stores:
+                    dropped.append(self._stores.pop(key))
+                    self._sizes.pop(key, None)
+        self._close(dropped)
+        return bool(dropped)
+
+    def get_stats(self) -> dict:
+        """Get cache statistics."""
+        with self._lock:
+            return {
+                "stores": len(self._stores),
+                "memory_bytes": sum(self._sizes.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
 
 
 vector_store_manager = VectorStoreManager()
 
 
-def get_vector_store(user_id: str) -> VectorStore:
-    """Factory function to get vector store."""
-    return vector_store_manager.get_store(user_id)
+def compact_stores(min_dead_ratio: Optional[float] = None) -> list[dict]:
+    """
+    Compact every store under `faiss_index_path` that has enough dead rows.
+
+    Safe to run next to API workers: each store is compacted under its
+    cross-process writer lock, and other processes pick up the new files
+    on their next access. The dead-row ratio is read from the sidecar
+    length and the chunk count first, so only stores that need compacting
+    are loaded.
+
+    Args:
+        min_dead_ratio: Fraction of dead sidecar rows (defaults to settings)
+
+    Returns:
+        Compaction reports of the stores that were compacted
+    """
+    root = Path(settings.faiss_index_path)
+    if not root.is_dir():
+        return []
+    if min_dead_ratio is None:
+        min_dead_ratio = settings.faiss_compaction_min_dead_ratio
+
+    reports = []
+    for directory in sorted(path for path in root.iterdir() if path.is_dir()):
+        dimension = VectorFile.stored_dimension(str(directory))
+        if dimension is None:
+            continue
+        try:
+            if _dead_ratio(str(directory), dimension) < min_dead_ratio:
+                continue
+            store = VectorStore(directory.name, _input_dimension(str(directory), dimension))
+            try:
+                if store.needs_compaction(min_dead_ratio):
+                    reports.append(store.compact())
+            finally:
+                store.close()
+        except Exception as e:
+            logger.warning("store_compaction_failed", user_id=directory.name, error=str(e))
+
+    logger.info(
+        "stores_compacted",
+        stores=len(reports),
+        bytes_reclaimed=sum(report["bytes_reclaimed"] for report in reports),
+    )
+    return reports
+
+
+def _input_dimension(directory: str, stored: int) -> int:
+    """Dimension of the embeddings a store on disk accepts, before any reduction."""
+    reducer = DimensionReducer.load(directory)
+    if reducer is not None and reducer.dimension == stored:
+        return reducer.input_dimension
+    return stored
+
+
+def _dead_ratio(directory: str, dimension: int) -> float:
+    """Fraction of a store's sidecar rows whose chunks were deleted, without loading it."""
+    rows = len(VectorFile(directory, dimension))
+    if not rows:
+        return 0.0
+    chunks = ChunkStore(directory, settings.faiss_metadata_mmap_bytes)
+    try:
+        return max(0, rows - chunks.chunk_count) / rows
+    finally:
+        chunks.close()
+
+
+def reduce_store_dimension(
+    name: str,
+    dimension: int,
+    method: str = "truncate",
+    sample_size: Optional[int] = None,
+) -> dict:
+    """
+    Migrate one store under `faiss_index_path` to reduced-dimension vectors.
+
+    Safe to run next to API workers: the store is migrated under its
+    cross-process writer lock, and other processes reload it on their next
+    access. In sharded mode `name` is the shard, not a user.
+
+    Args:
+        name: Store directory name (user ID, or shard in sharded mode)
+        dimension: Dimension to keep
+        method: "truncate" or "pca"
+        sample_size: Most vectors PCA is trained on (defaults to settings)
+
+    Returns:
+        Migration report (see `VectorStore.reduce_dimension`)
+    """
+    directory = os.path.join(settings.faiss_index_path, name)
+    stored = VectorFile.stored_dimension(directory)
+    if stored is None:
+        raise ValueError(f"No vector store at {directory}")
+
+    store = VectorStore(name, _input_dimension(directory, stored))
+    try:
+        return store.reduce_dimension(dimension, method, sample_size)
+    finally:
+        store.close()
+
+
+def get_vector_store(user_id: str, read_only: bool = False) -> VectorStore | TenantVectorStore:
+    """
+    Factory function to get vector store.
+
+    With `vector_rpc_address` set, returns a client for the store held by
+    the vector service instead of loading it in this process. Stores are
+    opened at the embedding model's width, so a store created for another
+    model is rejected instead of receiving vectors it cannot hold.
+    """
+    from app.services.embedding_service import get_embedding_dimension
+
+    dimension = get_embedding_dimension()
+    if settings.vector_rpc_address:
+        from app.services.vector_rpc import RemoteVectorStore
+
+        return RemoteVectorStore(user_id, dimension=dimension, read_only=read_only)
+    return vector_store_manager.get_store(user_id, dimension, read_only=read_only)
+
+
+async def get_vector_store_async(
+    user_id: str,
+    read_only: bool = False,
+) -> VectorStore | TenantVectorStore:
+    """Get a vector store without blocking the event loop on loading or refreshing it."""
+    return await run_in_vector_executor(get_vector_store, user_id, read_only)
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_vector_executor() -> ThreadPoolExecutor:
+    """
+    Get the thread pool that runs vector store work for async callers.
+
+    The pool is bounded so a burst of searches and uploads queues here
+    instead of spawning threads, and created on first use so forked
+    workers do not inherit a parent's threads.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.vector_executor_workers,
+                thread_name_prefix="vector",
+            )
+        return _executor
+
+
+async def run_in_vector_executor(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking vector store call on the vector executor.
+
+    FAISS releases the GIL while it searches and adds, so the event loop
+    keeps serving other requests in the meantime.
+
+    Args:
+        func: Blocking callable
+        *args: Positional arguments for `func`
+        **kwargs: Keyword arguments for `func`
+
+    Returns:
+        The result of `func`
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    return await loop.run_in_executor(get_vector_executor(), call)
+
+
+def shutdown_vector_executor() -> None:
+    """Wait for queued vector store work and stop the executor."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
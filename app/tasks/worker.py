@@ -27,6 +27,14 @@ celery_app.conf.update(
     worker_max_tasks_per_child=100,
 )
 
+if settings.faiss_compaction_interval_seconds:
+    celery_app.conf.beat_schedule = {
+        "compact-vector-stores": {
+            "task": "app.tasks.worker.compact_vector_stores_task",
+            "schedule": settings.faiss_compaction_interval_seconds,
+        },
+    }
+
 
 @celery_app.task(bind=True)
 def process_document_task(self, document_id: str, user_id: str):
@@ -71,3 +79,44 @@ def process_document_task(self, document_id: str, user_id: str):
                 return {"status": "failed", "error": str(e)}
     
     return asyncio.run(_process())
+
+
+@celery_app.task
+def compact_vector_stores_task(min_dead_ratio: float | None = None):
+    """
+    Periodic task reclaiming the space held by deleted chunks.
+    
+    Args:
+        min_dead_ratio: Fraction of deleted vectors that triggers compaction
+            (defaults to settings)
+    
+    Returns:
+        One report per compacted store with bytes reclaimed and duration
+    """
+    from app.services.vector_service import compact_stores
+
+    return compact_stores(min_dead_ratio)
+
+
+@celery_app.task
+def reduce_vector_store_task(
+    name: str,
+    dimension: int,
+    method: str = "truncate",
+    sample_size: int | None = None,
+):
+    """
+    Migrate a vector store to reduced-dimension vectors.
+    
+    Args:
+        name: Store directory (user ID, or shard in sharded mode)
+        dimension: Dimension to keep, e.g. 256 or 512
+        method: "truncate" for Matryoshka models, "pca" otherwise
+        sample_size: Most vectors PCA is trained on (defaults to settings)
+    
+    Returns:
+        Migration report with dimensions, bytes and index memory before and after
+    """
+    from app.services.vector_service import reduce_store_dimension
+
+    return reduce_store_dimension(name, dimension, method, sample_size)
@@ -0,0 +1,313 @@
+"""SQLite-backed storage for chunk text and metadata."""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    faiss_id INTEGER PRIMARY KEY,
+    vector_id TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    tenant_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_document_id ON chunks (document_id);
+CREATE TABLE IF NOT EXISTS documents (
+    document_id TEXT PRIMARY KEY,
+    chunk_count INTEGER NOT NULL
+);
+"""
+
+# Stay well below SQLite's bound-parameter limit.
+BATCH_SIZE = 500
+
+
+def _batches(values: list, size: int = BATCH_SIZE) -> Iterable[list]:
+    """Split a list into fixed-size batches."""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class ChunkStore:
+    """
+    Chunk metadata store for a single vector store.
+
+    Features:
+    - Opens in constant time; no chunk text is loaded up front
+    - Point lookups by chunk ID for search hits
+    - Document -> chunk ID index
+    - Constant-time chunk and document counts
+    - Optional tenant column for stores shared by many users
+
+    Design decision: SQLite with memory-mapped I/O gives us an indexed,
+    crash-safe file without running another service. Chunk text is read
+    from the page cache only for the hits a search returns.
+    """
+
+    def __init__(self, directory: str, mmap_size: int = 268435456):
+        """
+        Open (or create) the chunk store.
+
+        Args:
+            directory: Store directory
+            mmap_size: Bytes of the database file to memory-map
+        """
+        self.path = os.path.join(directory, "chunks.db")
+        self.mmap_size = mmap_size
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._enable_wal()
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self.refresh_counts()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """
+        The database connection, opened on first use.
+
+        A store closed while a caller still holds it reopens the connection
+        for that caller instead of failing its query.
+        """
+        if self._connection is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._connection = conn
+        return self._connection
+
+    def _enable_wal(self, attempts: int = 50) -> None:
+        """
+        Switch a new database to WAL mode (the mode persists in the file).
+
+        The switch fails instead of waiting while another process holds the
+        database, so processes creating a store together retry it.
+        """
+        for attempt in range(attempts):
+            try:
+                if self._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+                    return
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                return
+            except sqlite3.OperationalError:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.01)
+
+    def _migrate(self) -> None:
+        """Add columns introduced after a database was created."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chunks)")}
+        if "tenant_id" not in columns:
+            self._conn.execute("ALTER TABLE chunks ADD COLUMN tenant_id TEXT")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chunks_tenant_document "
+            "ON chunks (tenant_id, document_id)"
+        )
+
+    def refresh_counts(self) -> None:
+        """Reload the cached chunk and document counts."""
+        with self._lock:
+            self.chunk_count = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            self.document_count = self._count_documents()
+
+    def add(self, chunks: list[dict]) -> None:
+        """
+        Insert chunks, skipping IDs that are already stored.
+
+        Args:
+            chunks: Dicts with `faiss_id`, `id`, `document_id`, `text` and,
+                in shared stores, `tenant_id`
+        """
+        if not chunks:
+            return
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                stored = set(self._select([c["faiss_id"] for c in chunks]))
+                new = [c for c in chunks if c["faiss_id"] not in stored]
+
+                per_document: dict[str, int] = {}
+                for chunk in new:
+                    document_id = chunk["document_id"]
+                    per_document[document_id] = per_document.get(document_id, 0) + 1
+
+                self._conn.executemany(
+                    "INSERT INTO chunks (faiss_id, vector_id, document_id, text, tenant_id) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (c["faiss_id"], c["id"], c["document_id"], c["text"], c.get("tenant_id"))
+                        for c in new
+                    ],
+                )
+                self._conn.executemany(
+                    "INSERT INTO documents (document_id, chunk_count) VALUES (?, ?) "
+                    "ON CONFLICT(document_id) "
+                    "DO UPDATE SET chunk_count = chunk_count + excluded.chunk_count",
+                    list(per_document.items()),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            self.chunk_count += len(new)
+            self.document_count = self._count_documents()
+
+    def _count_documents(self) -> int:
+        """Count documents with at least one chunk."""
+        return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def _select(self, ids: list[int]) -> dict[int, dict]:
+        """Fetch chunks by ID without taking the lock."""
+        chunks = {}
+        for batch in _batches([int(i) for i in ids]):
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                "SELECT faiss_id, vector_id, document_id, text FROM chunks "
+                f"WHERE faiss_id IN ({placeholders})",
+                batch,
+            )
+            for faiss_id, vector_id, document_id, text in rows:
+                chunks[faiss_id] = {
+                    "faiss_id": faiss_id,
+                    "id": vector_id,
+                    "document_id": document_id,
+                    "text": text,
+                }
+        return chunks
+
+    def get_many(self, ids: list[int]) -> dict[int, dict]:
+        """
+        Fetch chunks by ID.
+
+        Args:
+            ids: Chunk IDs
+
+        Returns:
+            Mapping of chunk ID to chunk dict; unknown IDs are omitted
+        """
+        if not ids:
+            return {}
+
+        with self._lock:
+            return self._select(ids)
+
+    def ids_for_documents(
+        self,
+        document_ids: list[str],
+        tenant_id: Optional[str] = None,
+    ) -> np.ndarray:
+        """
+        Return the chunk IDs of the given documents.
+
+        Args:
+            document_ids: Document IDs
+            tenant_id: Only return chunks owned by this tenant
+
+        Returns:
+            Chunk IDs
+        """
+        tenant_clause = "" if tenant_id is None else " AND tenant_id = ?"
+        ids = []
+        with self._lock:
+            for batch in _batches(list(document_ids)):
+                placeholders = ",".join("?" * len(batch))
+                params = batch if tenant_id is None else [*batch, tenant_id]
+                ids.extend(
+                    row[0]
+                    for row in self._conn.execute(
+                        f"SELECT faiss_id FROM chunks WHERE document_id IN ({placeholders})"
+                        + tenant_clause,
+                        params,
+                    )
+                )
+        return np.array(ids, dtype=np.int64)
+
+    def ids_for_tenant(self, tenant_id: str) -> np.ndarray:
+        """Return every chunk ID owned by a tenant."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT faiss_id FROM chunks WHERE tenant_id = ?",
+                (tenant_id,),
+            ).fetchall()
+        return np.array([row[0] for row in rows], dtype=np.int64)
+
+    def tenant_counts(self, tenant_id: str) -> tuple[int, int]:
+        """Return the chunk and document counts of a tenant."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT document_id) FROM chunks WHERE tenant_id = ?",
+                (tenant_id,),
+            ).fetchone()
+
+    def all_ids(self) -> np.ndarray:
+        """Return every stored chunk ID in ascending order."""
+        with self._lock:
+            rows = self._conn.execute("SELECT faiss_id FROM chunks ORDER BY faiss_id").fetchall()
+        return np.array([row[0] for row in rows], dtype=np.int64)
+
+    def delete(self, ids: list[int]) -> int:
+        """
+        Delete chunks by ID.
+
+        Args:
+            ids: Chunk IDs
+
+        Returns:
+            Number of chunks deleted
+        """
+        if not ids:
+            return 0
+
+        deleted = 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for batch in _batches([int(i) for i in ids]):
+                    placeholders = ",".join("?" * len(batch))
+                    counts = self._conn.execute(
+                        "SELECT document_id, COUNT(*) FROM chunks "
+                        f"WHERE faiss_id IN ({placeholders}) GROUP BY document_id",
+                        batch,
+                    ).fetchall()
+                    self._conn.executemany(
+                        "UPDATE documents SET chunk_count = chunk_count - ? WHERE document_id = ?",
+                        [(count, document_id) for document_id, count in counts],
+                    )
+                    deleted += self._conn.execute(
+                        f"DELETE FROM chunks WHERE faiss_id IN ({placeholders})",
+                        batch,
+                    ).rowcount
+                self._conn.execute("DELETE FROM documents WHERE chunk_count <= 0")
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            self.chunk_count -= deleted
+            self.document_count = self._count_documents()
+        return deleted
+
+    def vacuum(self) -> None:
+        """Rebuild the database without the pages freed by deletes and truncate its log."""
+        with self._lock:
+            self._conn.execute("VACUUM")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the database on disk."""
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
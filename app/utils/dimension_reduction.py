@@ -0,0 +1,147 @@
+"""Per-store embedding dimension reduction (Matryoshka truncation or PCA)."""
+
+import io
+import json
+import os
+from typing import Optional
+
+import faiss
+import numpy as np
+
+from app.utils.faiss_index import REDUCTIONS
+from app.utils.vector_storage import write_atomic
+
+REDUCTION_FILE = "reduction.json"
+PCA_FILE = "reduction-pca.npz"
+
+
+class DimensionReducer:
+    """
+    Maps embeddings to the smaller dimension a store keeps.
+
+    Features:
+    - `truncate`: keep the leading components and re-normalize, for
+      Matryoshka-trained models such as OpenAI text-embedding-3
+    - `pca`: project onto the principal components of the store's own
+      vectors, for models without nested representations. Components are
+      taken around the origin rather than the mean, which best preserves
+      the inner products that cosine and `ip` search rank by
+
+    Design decision: Truncating and re-normalizing a text-embedding-3
+    vector gives the same result as requesting fewer `dimensions` from the
+    API, so stores reduce on their side and one embedding (and one cache
+    entry) per text serves tenants of every size.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        input_dimension: int,
+        dimension: int,
+        matrix: Optional[np.ndarray] = None,
+    ):
+        """
+        Initialize the reducer.
+
+        Args:
+            method: "truncate" or "pca"
+            input_dimension: Dimension of the embeddings it accepts
+            dimension: Dimension of the vectors it returns
+            matrix: (dimension, input_dimension) PCA projection
+        """
+        if method not in REDUCTIONS:
+            raise ValueError(f"Unsupported reduction: {method}. Allowed: {', '.join(REDUCTIONS)}")
+        if not 0 < dimension < input_dimension:
+            raise ValueError(f"Cannot reduce {input_dimension} dimensions to {dimension}")
+        self.method = method
+        self.input_dimension = input_dimension
+        self.dimension = dimension
+        self.matrix = matrix
+
+    @classmethod
+    def fit(
+        cls,
+        method: str,
+        vectors: np.ndarray,
+        dimension: int,
+        sample_size: int = 100000,
+    ) -> "DimensionReducer":
+        """
+        Build a reducer for a set of vectors.
+
+        Args:
+            method: "truncate" or "pca"
+            vectors: (n, d) float32 embeddings; PCA is trained on a sample
+            dimension: Target dimension
+            sample_size: Most vectors PCA is trained on
+
+        Returns:
+            DimensionReducer instance
+        """
+        input_dimension = vectors.shape[1]
+        if method != "pca":
+            return cls(method, input_dimension, dimension)
+
+        if len(vectors) < dimension:
+            raise ValueError(f"PCA to {dimension} dimensions needs at least {dimension} vectors")
+        if len(vectors) > sample_size:
+            rows = np.random.default_rng(0).choice(len(vectors), sample_size, replace=False)
+            vectors = vectors[np.sort(rows)]
+
+        sample = np.asarray(vectors, dtype=np.float64)
+        _, eigenvectors = np.linalg.eigh(sample.T @ sample)
+        # eigh sorts ascending; keep the leading components as rows.
+        matrix = eigenvectors[:, ::-1][:, :dimension].T
+        return cls(method, input_dimension, dimension, np.ascontiguousarray(matrix, np.float32))
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Reduce embeddings.
+
+        Args:
+            vectors: (n, input_dimension) float32 embeddings
+
+        Returns:
+            New (n, dimension) contiguous float32 array
+        """
+        if self.method == "pca":
+            return np.ascontiguousarray(vectors @ self.matrix.T, dtype=np.float32)
+
+        reduced = np.ascontiguousarray(vectors[:, :self.dimension], dtype=np.float32)
+        if len(reduced):
+            faiss.normalize_L2(reduced)
+        return reduced
+
+    def save(self, directory: str) -> None:
+        """Write the reducer to a store directory, projection before description."""
+        if self.method == "pca":
+            buffer = io.BytesIO()
+            np.savez(buffer, matrix=self.matrix)
+            write_atomic(os.path.join(directory, PCA_FILE), buffer.getvalue())
+
+        description = {
+            "method": self.method,
+            "input_dimension": self.input_dimension,
+            "dimension": self.dimension,
+        }
+        write_atomic(os.path.join(directory, REDUCTION_FILE), json.dumps(description).encode())
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["DimensionReducer"]:
+        """Read a store directory's reducer, or None if the store keeps full vectors."""
+        try:
+            with open(os.path.join(directory, REDUCTION_FILE), "r") as f:
+                description = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        matrix = None
+        if description["method"] == "pca":
+            with np.load(os.path.join(directory, PCA_FILE)) as data:
+                matrix = data["matrix"]
+        return cls(
+            description["method"],
+            description["input_dimension"],
+            description["dimension"],
+            matrix,
+        )
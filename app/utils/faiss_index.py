@@ -0,0 +1,406 @@
+"""FAISS index construction and tuning helpers."""
+
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+from pydantic import BaseModel, field_validator
+
+from app.config import get_settings
+
+settings = get_settings()
+
+INDEX_TYPES = ("flat", "sq8", "pq", "ivf_flat", "ivf_sq8", "ivf_pq", "hnsw")
+IVF_TYPES = ("ivf_flat", "ivf_sq8", "ivf_pq")
+# Types whose stored codes are lossy and benefit from exact re-ranking.
+COMPRESSED_TYPES = ("sq8", "pq", "ivf_sq8", "ivf_pq")
+# Cosine is inner product over vectors normalized to unit length.
+METRICS = ("l2", "ip", "cosine")
+REDUCTIONS = ("truncate", "pca")
+
+
+class IndexConfig(BaseModel):
+    """
+    Per-store FAISS index configuration.
+
+    Every store starts with an exact flat index. Once it holds
+    `promotion_threshold` vectors it is promoted to `index_type`,
+    trained on the vectors it already contains. Searches filtered to at
+    most `exact_filter_max` chunks skip the index and are computed exactly.
+
+    Compressed types (SQ8: 4x smaller, PQ: d * 4 / pq_m times smaller)
+    fetch `k * rerank_factor` candidates and re-rank them against the
+    full-precision vectors in the sidecar when `rerank_factor` > 1.
+
+    `metric` selects squared L2 distance (lower is better) or inner
+    product / cosine similarity (higher is better) for scores.
+
+    `reduced_dimension` > 0 stores vectors with fewer dimensions, by
+    `truncate` (new stores start reduced) or `pca` (trained when an
+    existing store is migrated with `VectorStore.reduce_dimension`).
+    """
+
+    index_type: str = "flat"
+    metric: str = "l2"
+    promotion_threshold: int = 50000
+    nlist: int = 0
+    pq_m: int = 64
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    nprobe: int = 16
+    ef_search: int = 64
+    exact_filter_max: int = 10000
+    rerank_factor: int = 0
+    reduced_dimension: int = 0
+    reduction: str = "truncate"
+
+    @field_validator("index_type")
+    @classmethod
+    def validate_index_type(cls, value: str) -> str:
+        """Ensure the index type is one we know how to build."""
+        value = value.lower()
+        if value not in INDEX_TYPES:
+            raise ValueError(f"Unsupported index type: {value}. Allowed: {', '.join(INDEX_TYPES)}")
+        return value
+
+    @field_validator("metric")
+    @classmethod
+    def validate_metric(cls, value: str) -> str:
+        """Ensure the metric is one we support."""
+        value = value.lower()
+        if value not in METRICS:
+            raise ValueError(f"Unsupported metric: {value}. Allowed: {', '.join(METRICS)}")
+        return value
+
+    @field_validator("reduction")
+    @classmethod
+    def validate_reduction(cls, value: str) -> str:
+        """Ensure the reduction is one we support."""
+        value = value.lower()
+        if value not in REDUCTIONS:
+            raise ValueError(f"Unsupported reduction: {value}. Allowed: {', '.join(REDUCTIONS)}")
+        return value
+
+    @classmethod
+    def for_user(cls, user_id: Optional[str] = None) -> "IndexConfig":
+        """
+        Build the configuration for a store.
+
+        Args:
+            user_id: Tenant whose overrides in `faiss_tenant_overrides` apply
+
+        Returns:
+            IndexConfig instance
+        """
+        values = {
+            "index_type": settings.faiss_index_type,
+            "metric": settings.faiss_metric,
+            "promotion_threshold": settings.faiss_promotion_threshold,
+            "nlist": settings.faiss_ivf_nlist,
+            "pq_m": settings.faiss_pq_m,
+            "pq_nbits": settings.faiss_pq_nbits,
+            "hnsw_m": settings.faiss_hnsw_m,
+            "ef_construction": settings.faiss_hnsw_ef_construction,
+            "nprobe": settings.faiss_nprobe,
+            "ef_search": settings.faiss_ef_search,
+            "exact_filter_max": settings.faiss_exact_filter_max,
+            "rerank_factor": settings.faiss_rerank_factor,
+            "reduced_dimension": settings.faiss_reduced_dimension,
+            "reduction": settings.faiss_reduction,
+        }
+        if user_id and user_id in settings.faiss_tenant_overrides:
+            values.update(settings.faiss_tenant_overrides[user_id])
+        return cls(**values)
+
+
+def faiss_metric(metric: str) -> int:
+    """Return the FAISS metric constant for a METRICS name."""
+    return faiss.METRIC_L2 if metric == "l2" else faiss.METRIC_INNER_PRODUCT
+
+
+def higher_is_better(metric: str) -> bool:
+    """Check whether larger scores mean closer matches."""
+    return metric != "l2"
+
+
+def normalize(vectors: np.ndarray, metric: str) -> np.ndarray:
+    """
+    Scale vectors to unit length in place for the cosine metric.
+
+    Args:
+        vectors: (n, d) contiguous float32 vectors
+        metric: Store metric
+
+    Returns:
+        The same array
+    """
+    if metric == "cosine" and len(vectors):
+        faiss.normalize_L2(vectors)
+    return vectors
+
+
+def create_flat_index(dimension: int, metric: str = "l2") -> faiss.Index:
+    """Create an empty exact (brute-force) index keyed by chunk ID."""
+    if metric == "l2":
+        return faiss.IndexIDMap2(faiss.IndexFlatL2(dimension))
+    return faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+
+
+def unwrap_index(index: faiss.Index) -> faiss.Index:
+    """Return the storage index behind an ID map."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def is_id_mapped(index: faiss.Index) -> bool:
+    """
+    Check whether an index carries explicit chunk IDs.
+
+    IVF indexes store IDs in their inverted lists; flat and HNSW
+    storage needs an IndexIDMap2 wrapper.
+    """
+    index = faiss.downcast_index(index)
+    return isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2, faiss.IndexIVF))
+
+
+def get_index_type(index: faiss.Index) -> str:
+    """Return the INDEX_TYPES name of an index instance."""
+    index = unwrap_index(index)
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFScalarQuantizer):
+        return "ivf_sq8"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    if isinstance(index, faiss.IndexHNSWFlat):
+        return "hnsw"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "sq8"
+    if isinstance(index, faiss.IndexPQ):
+        return "pq"
+    return "flat"
+
+
+def is_compressed(index: faiss.Index) -> bool:
+    """Check whether an index stores lossy vector codes."""
+    return get_index_type(index) in COMPRESSED_TYPES
+
+
+def choose_nlist(config: IndexConfig, count: int) -> int:
+    """
+    Pick the number of IVF lists for a training set.
+
+    Uses the configured value when set, otherwise 4 * sqrt(n),
+    capped so each centroid gets at least 39 training points.
+    """
+    nlist = config.nlist or int(4 * math.sqrt(count))
+    return max(1, min(nlist, count // 39))
+
+
+def choose_pq_m(config: IndexConfig, dimension: int) -> int:
+    """Largest number of PQ sub-quantizers <= pq_m that divides the dimension."""
+    for m in range(min(config.pq_m, dimension), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def can_train(config: IndexConfig, count: int) -> bool:
+    """Check whether `count` vectors are enough to train the configured index."""
+    if config.index_type in ("ivf_flat", "ivf_sq8"):
+        return count >= 39
+    if config.index_type == "ivf_pq":
+        return count >= max(39, 2 ** config.pq_nbits)
+    if config.index_type == "pq":
+        return count >= 2 ** config.pq_nbits
+    return True
+
+
+def build_ann_index(
+    config: IndexConfig,
+    dimension: int,
+    vectors: np.ndarray,
+    ids: np.ndarray,
+) -> faiss.Index:
+    """
+    Build, train and populate an approximate index.
+
+    Args:
+        config: Index configuration
+        dimension: Vector dimension
+        vectors: (n, d) float32 training and payload vectors
+        ids: (n,) int64 chunk IDs
+
+    Returns:
+        Populated FAISS index
+    """
+    metric = faiss_metric(config.metric)
+    if config.index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dimension, config.hnsw_m, metric)
+        hnsw.hnsw.efConstruction = config.ef_construction
+        index = faiss.IndexIDMap2(hnsw)
+    elif config.index_type in ("sq8", "pq"):
+        if config.index_type == "pq":
+            codec = faiss.IndexPQ(
+                dimension,
+                choose_pq_m(config, dimension),
+                config.pq_nbits,
+                metric,
+            )
+        else:
+            codec = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, metric)
+        codec.train(vectors)
+        index = faiss.IndexIDMap2(codec)
+    elif config.index_type in IVF_TYPES:
+        nlist = choose_nlist(config, len(vectors))
+        if config.metric == "l2":
+            quantizer = faiss.IndexFlatL2(dimension)
+        else:
+            quantizer = faiss.IndexFlatIP(dimension)
+        if config.index_type == "ivf_pq":
+            index = faiss.IndexIVFPQ(
+                quantizer,
+                dimension,
+                nlist,
+                choose_pq_m(config, dimension),
+                config.pq_nbits,
+                metric,
+            )
+        elif config.index_type == "ivf_sq8":
+            index = faiss.IndexIVFScalarQuantizer(
+                quantizer,
+                dimension,
+                nlist,
+                faiss.ScalarQuantizer.QT_8bit,
+                metric,
+            )
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, metric)
+        index.train(vectors)
+    else:
+        index = create_flat_index(dimension, config.metric)
+
+    if len(vectors):
+        index.add_with_ids(vectors, ids)
+    return index
+
+
+def get_index_ids(index: faiss.Index) -> np.ndarray:
+    """Return the chunk IDs of an ID-mapped flat or HNSW index."""
+    return faiss.vector_to_array(faiss.downcast_index(index).id_map).astype(np.int64)
+
+
+def reconstruct_all(index: faiss.Index) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Read every vector back out of an ID-mapped flat or HNSW index.
+
+    Returns:
+        Tuple of ((n, d) float32 vectors, (n,) int64 chunk IDs)
+    """
+    storage = unwrap_index(index)
+    if storage.ntotal == 0:
+        return np.empty((0, storage.d), dtype=np.float32), np.empty(0, dtype=np.int64)
+    return storage.reconstruct_n(0, storage.ntotal), get_index_ids(index)
+
+
+def estimate_memory(index: faiss.Index) -> int:
+    """
+    Estimate the resident size of an index in bytes.
+
+    Counts vector codes, stored IDs, graph links and coarse centroids;
+    allocator overhead is ignored.
+    """
+    storage = unwrap_index(index)
+    index_type = get_index_type(index)
+    ntotal = storage.ntotal
+    # IndexIDMap2 keeps an id array plus a reverse hash map.
+    id_bytes = 48 if is_id_mapped(index) and index_type not in IVF_TYPES else 8
+
+    if index_type == "hnsw":
+        per_vector = storage.d * 4 + storage.hnsw.nb_neighbors(0) * 4
+        return ntotal * (per_vector + id_bytes)
+    if index_type in IVF_TYPES:
+        centroids = storage.nlist * storage.d * 4
+        if index_type == "ivf_pq":
+            centroids += storage.pq.M * storage.pq.ksub * storage.pq.dsub * 4
+        return ntotal * (storage.code_size + id_bytes) + centroids
+    if index_type == "pq":
+        centroids = storage.pq.M * storage.pq.ksub * storage.pq.dsub * 4
+        return ntotal * (storage.code_size + id_bytes) + centroids
+    if index_type == "sq8":
+        return ntotal * (storage.code_size + id_bytes)
+    return ntotal * (storage.d * 4 + id_bytes)
+
+
+def search_subset(
+    query_array: np.ndarray,
+    vectors: np.ndarray,
+    ids: np.ndarray,
+    k: int,
+    metric: str = "l2",
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Exact k-NN search over a small set of vectors.
+
+    Args:
+        query_array: (n, d) float32 queries
+        vectors: (m, d) float32 candidate vectors
+        ids: (m,) int64 chunk IDs of the candidates
+        k: Number of neighbors
+        metric: Store metric (vectors already normalized for cosine)
+
+    Returns:
+        Tuple of ((n, k) scores, (n, k) chunk IDs), best first and padded
+        with the worst score / -1 when there are fewer than k candidates
+    """
+    worst = -np.inf if higher_is_better(metric) else np.inf
+    distances = np.full((len(query_array), k), worst, dtype=np.float32)
+    labels = np.full((len(query_array), k), -1, dtype=np.int64)
+    found = min(k, len(ids))
+    if found:
+        knn_distances, rows = faiss.knn(query_array, vectors, found, metric=faiss_metric(metric))
+        distances[:, :found] = knn_distances
+        labels[:, :found] = ids[rows]
+    return distances, labels
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    """Check whether vectors can be removed from an index in place."""
+    return get_index_type(index) != "hnsw"
+
+
+def get_search_params(
+    index: faiss.Index,
+    nprobe: int,
+    ef_search: int,
+    selector: Optional[faiss.IDSelector] = None,
+) -> Optional[faiss.SearchParameters]:
+    """
+    Build search-time parameters for an index.
+
+    Args:
+        index: Index being searched
+        nprobe: IVF lists to visit
+        ef_search: HNSW candidate list size
+        selector: Restrict the search to the chunk IDs it accepts
+
+    Returns:
+        SearchParameters, or None for an unfiltered exact search
+    """
+    index_type = get_index_type(index)
+    if index_type in IVF_TYPES:
+        params = faiss.SearchParametersIVF(nprobe=nprobe)
+    elif index_type == "hnsw":
+        params = faiss.SearchParametersHNSW(efSearch=ef_search)
+    elif selector is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+
+    if selector is not None:
+        params.sel = selector
+    return params
@@ -0,0 +1,71 @@
+"""Reader/writer lock for in-process shared state."""
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class ReadWriteLock:
+    """
+    Many concurrent readers or one writer.
+
+    Features:
+    - Writer preference: once a writer waits, new readers queue behind it
+    - Reentrant for the writing thread, which may also take read holds
+
+    Design decision: Condition-based and pure Python. Holds are short
+    (an index search or an in-memory index mutation); the heavy work they
+    guard runs in C with the GIL released.
+    """
+
+    def __init__(self):
+        """Initialize the lock."""
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """Hold the lock shared for the duration of the block."""
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                # The writer already excludes everyone else.
+                self._writer_depth += 1
+            else:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+                self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                if self._writer == me:
+                    self._writer_depth -= 1
+                else:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """Hold the lock exclusively for the duration of the block."""
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me:
+                self._waiting_writers += 1
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+                self._waiting_writers -= 1
+                self._writer = me
+            self._writer_depth += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer_depth -= 1
+                if not self._writer_depth:
+                    self._writer = None
+                    self._cond.notify_all()
@@ -0,0 +1,539 @@
+"""On-disk storage for raw embedding vectors and store operations."""
+
+import fcntl
+import glob
+import json
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import IO, Any, Iterator, Optional
+
+import numpy as np
+
+MAGIC = b"LXVEC001"
+HEADER = struct.Struct("<8sII")  # magic, dimension, bytes per component
+DTYPES = {"float32": np.float32, "float16": np.float16}
+
+
+class VectorFile:
+    """
+    Append-only sidecar holding the raw vector of every chunk.
+
+    Layout:
+    - `vectors.bin`: fixed header followed by (n, d) rows
+    - `vector_ids.bin`: (n,) int64 chunk IDs in the same order
+
+    Chunk IDs are allocated in increasing order, so the ID file is sorted
+    and rows are located with a binary search. Both files are read through
+    numpy memory maps, so opening a store does not pull vectors into RAM.
+
+    Appends and compaction change both files under an exclusive
+    `vectors.lock`; readers take it shared only when they (re)map the
+    files, so they never pair the vectors of one generation with the IDs
+    of another. Rows a crashed append left in only one file are dropped
+    on open.
+
+    Design decision: Keep our own copy of every vector so index rebuilds,
+    index type migrations and compaction never call the embedding provider.
+    """
+
+    def __init__(self, directory: str, dimension: int, dtype: str = "float32"):
+        """
+        Initialize the vector file.
+
+        Args:
+            directory: Store directory
+            dimension: Embedding dimension
+            dtype: Storage precision for new files ("float32" or "float16")
+        """
+        self.dimension = dimension
+        self.vectors_path = os.path.join(directory, "vectors.bin")
+        self.ids_path = os.path.join(directory, "vector_ids.bin")
+        self.dtype = np.dtype(DTYPES[dtype])
+        self._vectors: Optional[np.memmap] = None
+        self._ids: Optional[np.memmap] = None
+        self._mapped: Optional[tuple[int, int]] = None
+        self._lock = FileLock(os.path.join(directory, "vectors.lock"))
+
+        self._finish_rewrite()
+        if self._read_header():
+            self._truncate_partial_append()
+
+    @staticmethod
+    def stored_dimension(directory: str) -> Optional[int]:
+        """Dimension recorded in a directory's sidecar, or None if it has none."""
+        path = os.path.join(directory, "vectors.bin")
+        staged = os.path.exists(os.path.join(directory, "vector_ids.bin.new"))
+        if staged and os.path.exists(path + ".new"):
+            # A staged rewrite is complete and will be swapped in on open.
+            path += ".new"
+        header = read_header(path)
+        return header[1] if header and header[0] == MAGIC else None
+
+    def _read_header(self) -> bool:
+        """
+        Read dtype and dimension from an existing file.
+
+        Returns:
+            False if there is no sidecar yet (no file, or a header cut short)
+        """
+        header = read_header(self.vectors_path)
+        if header is None:
+            return False
+
+        magic, dimension, itemsize = header
+        if magic != MAGIC or dimension != self.dimension:
+            raise ValueError(f"Incompatible vector file: {self.vectors_path}")
+        self.dtype = np.dtype(np.float16 if itemsize == 2 else np.float32)
+        return True
+
+    def _complete_sizes(self) -> Optional[tuple[int, int]]:
+        """Sizes both files should be cut to, or None if they hold the same rows."""
+        row_bytes = self.dimension * self.dtype.itemsize
+        vector_bytes = os.path.getsize(self.vectors_path) - HEADER.size
+        id_bytes = os.path.getsize(self.ids_path) if os.path.exists(self.ids_path) else 0
+        if vector_bytes == id_bytes // 8 * row_bytes and id_bytes % 8 == 0:
+            return None
+        rows = min(max(0, vector_bytes) // row_bytes, id_bytes // 8)
+        return HEADER.size + rows * row_bytes, rows * 8
+
+    def _truncate_partial_append(self) -> None:
+        """
+        Drop rows an interrupted append wrote to one file but not the other.
+
+        Without this, every later append would pair IDs with the vectors of
+        the rows before them.
+        """
+        if self._complete_sizes() is None:
+            return
+
+        # Appends hold the lock, so files still uneven under it were left by a crash.
+        with self._lock.hold():
+            sizes = self._complete_sizes()
+            if sizes is None:
+                return
+            for path, size in zip((self.vectors_path, self.ids_path), sizes):
+                if os.path.exists(path) and os.path.getsize(path) > size:
+                    os.truncate(path, size)
+
+    def exists(self) -> bool:
+        """Check whether the sidecar has been written."""
+        return os.path.exists(self.vectors_path) and os.path.exists(self.ids_path)
+
+    def __len__(self) -> int:
+        """Number of stored rows, including rows of deleted chunks."""
+        if not os.path.exists(self.ids_path):
+            return 0
+        return os.path.getsize(self.ids_path) // 8
+
+    def next_id(self) -> int:
+        """Smallest chunk ID that can still be appended."""
+        if not len(self):
+            return 0
+        with open(self.ids_path, "rb") as f:
+            f.seek(-8, os.SEEK_END)
+            return int(np.frombuffer(f.read(8), dtype=np.int64)[0]) + 1
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the sidecar on disk."""
+        paths = (self.vectors_path, self.ids_path)
+        return sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+
+    def append(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """
+        Append vectors to the sidecar.
+
+        Args:
+            ids: (n,) int64 chunk IDs, greater than any stored ID
+            vectors: (n, d) float32 vectors
+        """
+        with self._lock.hold():
+            if read_header(self.vectors_path) is None:
+                # Appears complete, so processes opening the store never see a partial header.
+                write_atomic(
+                    self.vectors_path, HEADER.pack(MAGIC, self.dimension, self.dtype.itemsize)
+                )
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=self.dtype).tobytes())
+            with open(self.ids_path, "ab") as f:
+                f.write(np.ascontiguousarray(ids, dtype=np.int64).tobytes())
+
+        self._vectors = None
+        self._ids = None
+        self._mapped = None
+
+    def rewrite(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """
+        Replace the sidecar contents, e.g. to drop the rows of deleted chunks.
+
+        Both files are staged and fsynced before either is swapped in; a
+        crash in between is completed by the next `VectorFile` opened on
+        the directory.
+
+        Args:
+            ids: (n,) sorted int64 chunk IDs
+            vectors: (n, d) float32 vectors; d becomes the file's dimension,
+                so a rewrite can also store reduced vectors
+        """
+        self.dimension = vectors.shape[1]
+        header = HEADER.pack(MAGIC, self.dimension, self.dtype.itemsize)
+        rows = np.ascontiguousarray(vectors, dtype=self.dtype).tobytes()
+        with self._lock.hold():
+            write_atomic(self.vectors_path + ".new", header + rows)
+            # The staged ID file appears last: its presence marks a complete rewrite.
+            write_atomic(self.ids_path + ".new", np.ascontiguousarray(ids, dtype=np.int64))
+            self._commit_rewrite()
+
+        self._vectors = None
+        self._ids = None
+        self._mapped = None
+
+    def _commit_rewrite(self) -> None:
+        """Swap staged files in, vectors first."""
+        if os.path.exists(self.vectors_path + ".new"):
+            os.replace(self.vectors_path + ".new", self.vectors_path)
+        os.replace(self.ids_path + ".new", self.ids_path)
+        fsync_directory(os.path.dirname(self.ids_path))
+
+    def _finish_rewrite(self) -> None:
+        """Complete a rewrite interrupted after staging, or drop a partial one."""
+        staged = [self.vectors_path + ".new", self.ids_path + ".new"]
+        if not any(os.path.exists(path) for path in staged):
+            return
+
+        with self._lock.hold():
+            if os.path.exists(self.ids_path + ".new"):
+                self._commit_rewrite()
+            elif os.path.exists(staged[0]):
+                os.remove(staged[0])
+
+    def _map(self) -> tuple[np.ndarray, np.ndarray]:
+        """Memory-map the sidecar files, remapping after appends or a rewrite."""
+        try:
+            stat = os.stat(self.ids_path)
+        except FileNotFoundError:
+            stat = None
+        if stat is None or stat.st_size < 8:
+            return np.empty((0, self.dimension), dtype=self.dtype), np.empty(0, dtype=np.int64)
+
+        if self._mapped != (stat.st_ino, stat.st_size):
+            with self._lock.hold(exclusive=False):
+                stat = os.stat(self.ids_path)
+                count = stat.st_size // 8
+                self._vectors = np.memmap(
+                    self.vectors_path,
+                    dtype=self.dtype,
+                    mode="r",
+                    offset=HEADER.size,
+                    shape=(count, self.dimension),
+                )
+                self._ids = np.memmap(self.ids_path, dtype=np.int64, mode="r", shape=(count,))
+                self._mapped = (stat.st_ino, stat.st_size)
+        return self._vectors, self._ids
+
+    def read(self, ids: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Read vectors as float32.
+
+        Args:
+            ids: Chunk IDs to read; all rows when omitted. IDs that are
+                not stored are skipped.
+
+        Returns:
+            Tuple of ((n, d) float32 vectors, (n,) int64 chunk IDs)
+        """
+        vectors, stored_ids = self._map()
+        if ids is None:
+            return np.asarray(vectors, dtype=np.float32), np.array(stored_ids)
+
+        ids = np.asarray(ids, dtype=np.int64)
+        rows = np.searchsorted(stored_ids, ids)
+        found = rows < len(stored_ids)
+        found[found] = stored_ids[rows[found]] == ids[found]
+        rows = rows[found]
+        return np.asarray(vectors[rows], dtype=np.float32), np.array(stored_ids[rows])
+
+
+class WriteAheadLog:
+    """
+    Append-only log of store operations since the last checkpoint.
+
+    Each line is a JSON record with a monotonically increasing `seq`.
+    Before a checkpoint is written the active file is sealed (renamed to
+    `wal-<last seq>.log`) so new operations keep appending while the
+    checkpoint is saved; sealed files are discarded once it is durable.
+
+    The newest sequence number is also published in `wal.head`, so other
+    processes can tell whether they are behind with one small read.
+
+    Design decision: Persisting an add costs one small append proportional
+    to the new chunks, instead of rewriting the whole index and metadata.
+    The read position in the active file is remembered, so catching up
+    with another process's appends only reads the new bytes.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Initialize the log.
+
+        Args:
+            directory: Store directory
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, "wal.log")
+        self.head_path = os.path.join(directory, "wal.head")
+        self.seq = 0
+        # (first seq, offset) of the active file read so far. Files are told
+        # apart by their first record, as inode numbers are reused.
+        self._position: Optional[tuple[int, int]] = None
+
+    def _sealed_paths(self) -> list[tuple[int, str]]:
+        """Sealed log files ordered by their last sequence number."""
+        sealed = []
+        for path in glob.glob(os.path.join(self.directory, "wal-*.log")):
+            seq = int(os.path.basename(path)[4:-4])
+            sealed.append((seq, path))
+        return sorted(sealed)
+
+    def append(self, op: str, **payload: Any) -> int:
+        """
+        Append an operation record.
+
+        Args:
+            op: Operation name
+            **payload: Operation data (JSON serializable)
+
+        Returns:
+            Sequence number of the record
+        """
+        self.seq += 1
+        record = {"seq": self.seq, "op": op, **payload}
+        with open(self.path, "ab") as f:
+            start = f.tell()
+            f.write((json.dumps(record) + "\n").encode())
+            # Callers append only after catching up, so the file is fully read.
+            if start == 0:
+                self._position = (self.seq, f.tell())
+            elif self._position is not None:
+                self._position = (self._position[0], f.tell())
+
+        fd = os.open(self.head_path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.pwrite(fd, self.seq.to_bytes(8, "little"), 0)
+        finally:
+            os.close(fd)
+        return self.seq
+
+    def head(self) -> int:
+        """Newest sequence number published by any writer (0 if unknown)."""
+        try:
+            with open(self.head_path, "rb") as f:
+                data = f.read(8)
+        except FileNotFoundError:
+            return 0
+        return int.from_bytes(data, "little") if len(data) == 8 else 0
+
+    @staticmethod
+    def _first_seq(f: IO[bytes]) -> Optional[int]:
+        """Sequence number of the first record of an open file."""
+        f.seek(0)
+        try:
+            return json.loads(f.readline())["seq"]
+        except (ValueError, KeyError):
+            return None
+
+    def _scan(
+        self,
+        f: IO[bytes],
+        offset: int,
+        after_seq: int,
+        first_seq: Optional[int] = None,
+    ) -> Iterator[dict]:
+        """
+        Yield complete records of an open file from a byte offset.
+
+        Args:
+            f: Log file opened in binary mode
+            offset: Byte offset to start at
+            after_seq: Skip records up to this sequence number
+            first_seq: First sequence number of the active file, to
+                remember the read position in it
+        """
+        f.seek(offset)
+        for line in f:
+            # A torn final line (crash or concurrent append) ends the file.
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            offset += len(line)
+            if first_seq is not None:
+                self._position = (first_seq, offset)
+            self.seq = max(self.seq, record["seq"])
+            if record["seq"] > after_seq:
+                yield record
+
+    def replay(self, after_seq: int) -> Iterator[dict]:
+        """
+        Yield records newer than a checkpoint, oldest first.
+
+        Files removed by a concurrent checkpoint are skipped.
+
+        Args:
+            after_seq: Sequence number covered by the checkpoint
+        """
+        self._position = None
+        paths = [(path, False) for _, path in self._sealed_paths()]
+        paths.append((self.path, True))
+
+        for path, active in paths:
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                continue
+            with f:
+                first_seq = self._first_seq(f) if active else None
+                yield from self._scan(f, 0, after_seq, first_seq)
+
+    def tail(self, after_seq: int) -> Iterator[dict]:
+        """
+        Yield records appended since the last read, oldest first.
+
+        Only the new bytes of the active file are read when it is the file
+        read last time; otherwise (e.g. it was sealed since) all files are
+        replayed.
+
+        Args:
+            after_seq: Last sequence number already applied
+        """
+        if self._position is not None:
+            try:
+                f = open(self.path, "rb")
+            except FileNotFoundError:
+                f = None
+            if f is not None:
+                with f:
+                    first_seq, offset = self._position
+                    if self._first_seq(f) == first_seq:
+                        yield from self._scan(f, offset, after_seq, first_seq)
+                        return
+
+        yield from self.replay(after_seq)
+
+    def seal(self) -> None:
+        """Close the active file so later appends start a new one."""
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            os.replace(self.path, os.path.join(self.directory, f"wal-{self.seq:012d}.log"))
+        self._position = None
+
+    def discard_sealed(self, upto_seq: int) -> None:
+        """Remove sealed files fully covered by a checkpoint."""
+        for seq, path in self._sealed_paths():
+            if seq <= upto_seq:
+                os.remove(path)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the active log file."""
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+
+class FileLock:
+    """
+    Advisory `flock` lock on a file, shared by every process on the host.
+
+    Nested holds by the same thread are reentrant and keep the mode of the
+    outermost hold. Different threads use separate descriptors, so the
+    lock also excludes threads of the same process.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the lock.
+
+        Args:
+            path: Lock file path (created on first use)
+        """
+        self.path = path
+        self._local = threading.local()
+
+    @contextmanager
+    def hold(self, exclusive: bool = True) -> Iterator[None]:
+        """
+        Hold the lock for the duration of the block.
+
+        Args:
+            exclusive: Exclusive (writer) instead of shared (reader) lock
+        """
+        if getattr(self._local, "depth", 0):
+            self._local.depth += 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._local.depth = 1
+            try:
+                yield
+            finally:
+                self._local.depth = 0
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+def fsync_directory(path: str) -> None:
+    """Flush a directory entry, making renames inside it durable."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_header(path: str) -> Optional[tuple[bytes, int, int]]:
+    """Header of a vector file, or None if the file is missing or shorter than a header."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(HEADER.size)
+    except FileNotFoundError:
+        return None
+    return HEADER.unpack(data) if len(data) == HEADER.size else None
+
+
+def write_atomic(path: str, data: Any) -> None:
+    """
+    Replace a file so that it holds either the old or the new contents, even after a crash.
+
+    The data is written to a temporary file and fsynced before it is
+    renamed over `path`, and the rename is fsynced through the directory.
+
+    Args:
+        path: Destination path
+        data: Bytes-like contents
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    fsync_directory(os.path.dirname(path) or ".")
+
+
+def file_checksum(path: str, chunk_size: int = 1 << 20) -> int:
+    """CRC-32 of a file, read in chunks so large indexes are not loaded at once."""
+    checksum = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            checksum = zlib.crc32(chunk, checksum)
+    return checksum
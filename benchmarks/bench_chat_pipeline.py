@@ -0,0 +1,126 @@
+"""
+Load-test ingestion and chat turns offline with the fake backends.
+
+Ingests synthetic documents (embedding, vector store) and then runs
+concurrent chat turns (query embedding, retrieval, streamed answer) with
+EMBEDDING_BACKEND=fake and LLM_BACKEND=fake, so no provider is called but
+provider latency and token pacing are still simulated. Reports ingestion
+chunks/sec, turns/sec and time-to-first-token / turn latency percentiles.
+
+Usage:
+    python benchmarks/bench_chat_pipeline.py --documents 50 --turns 200 --concurrency 20
+    python benchmarks/bench_chat_pipeline.py --embedding-latency-ms 80 --tokens-per-second 40
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import get_settings  # noqa: E402
+
+settings = get_settings()
+
+USER_ID = "bench"
+WORDS = (
+    "contract invoice policy employee quarterly revenue forecast compliance audit "
+    "retention schedule vendor onboarding security incident report summary appendix"
+).split()
+
+
+def sentence(rng: np.random.Generator, words: int) -> str:
+    """Random text from the benchmark vocabulary."""
+    return " ".join(rng.choice(WORDS, size=words))
+
+
+async def ingest(documents: int, chunks_per_document: int) -> float:
+    """Embed and store synthetic documents; returns chunks/sec."""
+    from app.services.embedding_service import get_embedding_service
+    from app.services.vector_service import get_vector_store_async
+
+    rng = np.random.default_rng(0)
+    embedding_service = get_embedding_service()
+    store = await get_vector_store_async(USER_ID)
+
+    async def ingest_document(index: int) -> None:
+        chunks = [sentence(rng, 120) for _ in range(chunks_per_document)]
+        vectors = await embedding_service.embed_documents_async(chunks)
+        await store.add_vectors_async(vectors, chunks, [f"doc-{index}"] * len(chunks))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(ingest_document(i) for i in range(documents)))
+    return documents * chunks_per_document / (time.perf_counter() - start)
+
+
+async def chat(turns: int, concurrency: int) -> tuple[float, list[float], list[float]]:
+    """Run chat turns; returns turns/sec, first-token and total latencies."""
+    from app.services.llm_service import get_llm_service
+    from app.services.retrieval_service import get_retrieval_service_async
+
+    rng = np.random.default_rng(1)
+    questions = [sentence(rng, 8) + "?" for _ in range(turns)]
+    llm_service = get_llm_service()
+    semaphore = asyncio.Semaphore(concurrency)
+    first_token: list[float] = []
+    total: list[float] = []
+
+    async def turn(question: str) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            retrieval = await get_retrieval_service_async(USER_ID)
+            context, _ = await retrieval.get_context_async(question, k=4)
+            first = None
+            async for _ in llm_service.generate_stream(question, context):
+                first = first or time.perf_counter()
+            first_token.append((first or time.perf_counter()) - start)
+            total.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(turn(question) for question in questions))
+    return turns / (time.perf_counter() - start), first_token, total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=40, help="chunks per document")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--embedding-latency-ms", type=float, default=50.0)
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--response-tokens", type=int, default=100)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    settings.embedding_backend = "fake"
+    settings.llm_backend = "fake"
+    settings.fake_embedding_latency_ms = args.embedding_latency_ms
+    settings.fake_llm_first_token_ms = args.first_token_ms
+    settings.fake_llm_tokens_per_second = args.tokens_per_second
+    settings.fake_llm_response_tokens = args.response_tokens
+    settings.faiss_index_path = os.path.join(directory, "faiss")
+    settings.embedding_cache_path = os.path.join(directory, "embedding_cache.db")
+    settings.query_embedding_cache_redis = False
+
+    async def run():
+        rate = await ingest(args.documents, args.chunks)
+        return rate, await chat(args.turns, args.concurrency)
+
+    ingest_rate, (turn_rate, first_token, total) = asyncio.run(run())
+
+    print(f"ingestion: {ingest_rate:.0f} chunks/sec")
+    print(f"chat: {turn_rate:.1f} turns/sec at concurrency {args.concurrency}")
+    for name, values in (("first token", first_token), ("turn", total)):
+        p50, p95 = np.percentile(values, [50, 95]) * 1000
+        print(f"{name:<12} p50 {p50:8.1f} ms   p95 {p95:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Compare building provider clients per request with the shared singletons.
+
+Times HTTP clients and `EmbeddingService()` (and, with --llm,
+`LLMService()`) built per request against the shared instances from the
+factory functions, then times calls to a local keep-alive server with a
+fresh `httpx.Client` per call against the shared pool. No provider API
+calls are made.
+
+Usage:
+    python benchmarks/bench_client_construction.py --requests 200
+    python benchmarks/bench_client_construction.py --model all-MiniLM-L6-v2 --requests 20
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import get_settings  # noqa: E402
+
+settings = get_settings()
+
+
+def per_request_ms(func, requests: int) -> float:
+    """Mean wall time of `func` in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(requests):
+        func()
+    return (time.perf_counter() - start) / requests * 1000
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Minimal HTTP/1.1 handler that keeps connections open."""
+
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment so delayed ACKs do not skew timings.
+    wbufsize = 65536
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_http(requests: int) -> dict[str, float]:
+    """Time calls to a local server with and without the shared pool."""
+    from app.core.http_client import get_http_client
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    def fresh():
+        with httpx.Client() as client:
+            client.get(url)
+
+    shared = get_http_client()
+    try:
+        return {
+            "fresh_client_ms": per_request_ms(fresh, requests),
+            "shared_pool_ms": per_request_ms(lambda: shared.get(url), requests),
+        }
+    finally:
+        server.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default=settings.openai_embedding_model)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--llm", action="store_true", help="also time LLMService")
+    args = parser.parse_args()
+
+    # Construction never calls the API, but the clients require a key.
+    settings.openai_api_key = settings.openai_api_key or "sk-bench"
+    settings.embedding_cache_path = os.path.join(tempfile.mkdtemp(), "embedding_cache.db")
+
+    from app.core.http_client import get_async_http_client, get_http_client
+    from app.services.embedding_service import EmbeddingService, get_embedding_service
+
+    start = time.perf_counter()
+    get_embedding_service(args.model)
+    first_ms = (time.perf_counter() - start) * 1000
+
+    rows = [
+        (
+            "httpx Client + AsyncClient",
+            per_request_ms(lambda: (httpx.Client(), httpx.AsyncClient()), args.requests),
+            per_request_ms(lambda: (get_http_client(), get_async_http_client()), args.requests),
+        ),
+        (
+            f"EmbeddingService({args.model})",
+            per_request_ms(lambda: EmbeddingService(args.model), args.requests),
+            per_request_ms(lambda: get_embedding_service(args.model), args.requests),
+        ),
+    ]
+    if args.llm:
+        from app.services.llm_service import LLMService, get_llm_service
+
+        get_llm_service()
+        rows.append(
+            (
+                "LLMService()",
+                per_request_ms(LLMService, args.requests),
+                per_request_ms(get_llm_service, args.requests),
+            )
+        )
+
+    print(f"first get_embedding_service(): {first_ms:.2f} ms (paid once at warm-up)")
+    print(f"{'service':<48}{'per request':>14}{'singleton':>14}")
+    for name, fresh, shared in rows:
+        print(f"{name:<48}{fresh:>11.3f} ms{shared:>11.4f} ms")
+
+    http = bench_http(args.requests)
+    print(f"{'HTTP GET, new client per call':<48}{http['fresh_client_ms']:>11.3f} ms")
+    print(f"{'HTTP GET, shared keep-alive pool':<48}{http['shared_pool_ms']:>11.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
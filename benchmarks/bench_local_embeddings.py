@@ -0,0 +1,122 @@
+"""
+Compare CPU embedding throughput of sentence-transformers and ONNX Runtime.
+
+Embeds a synthetic corpus of chunks of varied length with the current
+HuggingFace backend and with the ONNX engine (fp32 and, if present or
+requested with --quantize, int8), and reports chunks/sec. Also reports
+how many padded tokens length bucketing saves over batching in input
+order.
+
+The model directory must hold an exported sentence-transformers model
+(`model.onnx` and `tokenizer.json`), e.g. from
+`optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 DIR`.
+
+Usage:
+    python benchmarks/bench_local_embeddings.py --model-dir ./models/all-MiniLM-L6-v2
+    python benchmarks/bench_local_embeddings.py --model-dir DIR --quantize --chunks 5000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import get_settings  # noqa: E402
+from app.services.local_embeddings import (  # noqa: E402
+    QUANTIZED_MODEL_FILE,
+    OnnxEmbeddings,
+    length_batches,
+    quantize_model,
+)
+
+settings = get_settings()
+
+WORDS = (
+    "contract invoice policy employee quarterly revenue forecast compliance audit "
+    "retention schedule vendor onboarding security incident report summary appendix"
+).split()
+
+
+def make_corpus(chunks: int, seed: int = 0) -> list[str]:
+    """Chunks of 5 to 200 words, like a chunker's output over mixed documents."""
+    rng = np.random.default_rng(seed)
+    return [" ".join(rng.choice(WORDS, size=rng.integers(5, 200))) for _ in range(chunks)]
+
+
+def throughput(embed, corpus: list[str]) -> float:
+    """Chunks embedded per second."""
+    embed(corpus[:8])  # warm up
+    start = time.perf_counter()
+    embed(corpus)
+    return len(corpus) / (time.perf_counter() - start)
+
+
+def padded_tokens(lengths: list[int], batches: list[list[int]]) -> int:
+    """Tokens processed when each batch is padded to its longest input."""
+    return sum(max(lengths[i] for i in batch) * len(batch) for batch in batches)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model-dir", required=True)
+    parser.add_argument("--hf-model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=settings.local_embedding_batch_size)
+    parser.add_argument("--workers", type=int, default=settings.local_embedding_workers)
+    parser.add_argument("--quantize", action="store_true", help="write model_quantized.onnx")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.chunks)
+    results = {}
+
+    try:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        current = HuggingFaceEmbeddings(
+            model_name=args.hf_model,
+            model_kwargs={"device": "cpu"},
+            encode_kwargs={"normalize_embeddings": True},
+        )
+        results["sentence-transformers (current)"] = throughput(current.embed_documents, corpus)
+    except ImportError as e:
+        print(f"skipping sentence-transformers: {e}")
+
+    if args.quantize and not os.path.exists(os.path.join(args.model_dir, QUANTIZED_MODEL_FILE)):
+        quantize_model(args.model_dir)
+
+    for quantized in (False, True):
+        name = "onnx int8" if quantized else "onnx fp32"
+        if quantized and not os.path.exists(os.path.join(args.model_dir, QUANTIZED_MODEL_FILE)):
+            continue
+        engine = OnnxEmbeddings(
+            args.model_dir, quantized=quantized, batch_size=args.batch_size, workers=args.workers
+        )
+        results[name] = throughput(engine.embed_documents, corpus)
+        results[f"{name} (async)"] = throughput(
+            lambda texts: asyncio.run(engine.aembed_documents(texts)), corpus
+        )
+
+        lengths = [len(encoding.ids) for encoding in engine.tokenizer.encode_batch(corpus)]
+        in_order = [
+            list(range(start, min(start + args.batch_size, len(corpus))))
+            for start in range(0, len(corpus), args.batch_size)
+        ]
+        bucketed = padded_tokens(lengths, length_batches(lengths, args.batch_size))
+        unsorted = padded_tokens(lengths, in_order)
+
+    print(f"{'backend':<36}{'chunks/sec':>12}")
+    for name, rate in results.items():
+        print(f"{name:<36}{rate:>12.1f}")
+    print(
+        f"padded tokens: {unsorted} in input order, {bucketed} length-bucketed "
+        f"({1 - bucketed / unsorted:.0%} fewer)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Measure per-worker memory when several processes search the same store.
+
+Builds one checkpointed store, then starts 1 and N worker processes that
+each open it (heap-loaded or memory-mapped) and run a few searches. Each
+worker reports its RSS and PSS from /proc/self/smaps_rollup; PSS splits
+shared pages between the processes mapping them, so it shows what a worker
+really costs once the index lives in the shared page cache.
+
+Usage:
+    python benchmarks/bench_mmap_workers.py --vectors 200000 --workers 8
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import get_settings  # noqa: E402
+
+settings = get_settings()
+
+USER_ID = "bench"
+
+
+def read_memory() -> dict[str, int]:
+    """Read RSS and PSS of the current process in KiB."""
+    memory = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                memory[key.lower()] = int(value.split()[0])
+    return memory
+
+
+def build_store(vectors: int, dimension: int) -> None:
+    """Write a checkpointed store for the workers to open."""
+    from app.services.vector_service import VectorStore
+
+    store = VectorStore(USER_ID, dimension)
+    rng = np.random.default_rng(0)
+    batch = 10000
+    for start in range(0, vectors, batch):
+        count = min(batch, vectors - start)
+        store.add_vectors(
+            vectors=rng.random((count, dimension), dtype=np.float32).tolist(),
+            documents=[f"chunk {start + i}" for i in range(count)],
+            document_ids=[f"doc-{(start + i) // 100}" for i in range(count)],
+        )
+    store.merge()
+    store.close()
+
+
+def worker(directory: str, dimension: int, read_only: bool, ready, release, results) -> None:
+    """Open the store, search it, report memory and wait for the others."""
+    settings.faiss_index_path = directory
+    from app.services.vector_service import VectorStore
+
+    store = VectorStore(USER_ID, dimension, read_only=read_only)
+    rng = np.random.default_rng(os.getpid())
+    for _ in range(20):
+        store.search(rng.random(dimension, dtype=np.float32).tolist(), k=10)
+
+    # Measure while every worker still has the index mapped.
+    ready.wait()
+    results.put(read_memory())
+    release.wait()
+
+
+def run(directory: str, workers: int, dimension: int, read_only: bool) -> dict[str, float]:
+    """Run a group of workers and average their memory."""
+    ready = mp.Barrier(workers)
+    release = mp.Barrier(workers + 1)
+    results = mp.Queue()
+    processes = [
+        mp.Process(
+            target=worker,
+            args=(directory, dimension, read_only, ready, release, results),
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    samples = [results.get() for _ in range(workers)]
+    release.wait()
+    for process in processes:
+        process.join()
+
+    return {
+        "rss_mib": sum(s["rss"] for s in samples) / workers / 1024,
+        "pss_mib": sum(s["pss"] for s in samples) / workers / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.faiss_index_path = directory
+        build_store(args.vectors, args.dimension)
+        with open(os.path.join(directory, USER_ID, "checkpoint.json")) as f:
+            index_file = json.load(f)["index_file"]
+        index_mib = os.path.getsize(os.path.join(directory, USER_ID, index_file)) / 2**20
+        print(f"index: {args.vectors} x {args.dimension}, {index_mib:.1f} MiB on disk")
+        print(f"{'mode':<8} {'workers':>7} {'RSS/worker MiB':>15} {'PSS/worker MiB':>15}")
+
+        for read_only in (False, True):
+            for workers in (1, args.workers):
+                memory = run(directory, workers, args.dimension, read_only)
+                mode = "mmap" if read_only else "heap"
+                print(
+                    f"{mode:<8} {workers:>7} "
+                    f"{memory['rss_mib']:>15.1f} {memory['pss_mib']:>15.1f}"
+                )
+
+
+if __name__ == "__main__":
+    # Fresh interpreters, like separate API workers, share nothing but the page cache.
+    mp.set_start_method("spawn")
+    main()
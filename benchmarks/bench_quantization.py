@@ -0,0 +1,111 @@
+"""
+Compare memory, recall and latency of compressed vector store indexes.
+
+Builds one store per index type from the same clustered synthetic
+embeddings and reports index memory, recall@k against exact search and
+per-query latency, with and without exact re-ranking from the sidecar.
+
+Usage:
+    python benchmarks/bench_quantization.py --vectors 100000 --dimension 768
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import get_settings  # noqa: E402
+
+settings = get_settings()
+
+VARIANTS = [
+    ("flat", 0),
+    ("sq8", 0),
+    ("sq8", 4),
+    ("pq", 0),
+    ("pq", 4),
+    ("ivf_sq8", 0),
+    ("ivf_sq8", 4),
+    ("ivf_pq", 0),
+    ("ivf_pq", 4),
+]
+
+
+def make_embeddings(count: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """Generate clustered vectors, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, count // 500), dimension)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size=count)
+    noise = rng.normal(scale=0.3, size=(count, dimension)).astype(np.float32)
+    return centers[labels] + noise
+
+
+def build_store(user_id: str, config, vectors: np.ndarray):
+    """Create a store and load the vectors in batches."""
+    from app.services.vector_service import VectorStore
+
+    store = VectorStore(user_id, vectors.shape[1], config)
+    for start in range(0, len(vectors), 10000):
+        batch = vectors[start:start + 10000]
+        store.add_vectors(
+            vectors=batch.tolist(),
+            documents=[f"chunk {start + i}" for i in range(len(batch))],
+            document_ids=["doc"] * len(batch),
+        )
+    return store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--pq-m", type=int, default=96)
+    args = parser.parse_args()
+
+    from app.utils.faiss_index import IndexConfig
+
+    vectors = make_embeddings(args.vectors, args.dimension)
+    queries = make_embeddings(args.queries, args.dimension, seed=1)
+    _, truth = faiss.knn(queries, vectors, args.k)
+
+    print(f"{args.vectors} x {args.dimension}, {args.queries} queries, k={args.k}")
+    print(f"{'index':<10} {'rerank':>6} {'memory MiB':>11} {'recall@k':>9} {'ms/query':>9}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.faiss_index_path = directory
+        for index_type, rerank_factor in VARIANTS:
+            config = IndexConfig(
+                index_type=index_type,
+                promotion_threshold=1,
+                pq_m=args.pq_m,
+                nprobe=32,
+                rerank_factor=rerank_factor,
+            )
+            store = build_store(f"{index_type}-{rerank_factor}", config, vectors)
+
+            hits = 0
+            start = time.perf_counter()
+            for query, expected in zip(queries, truth):
+                results = store.search(query.tolist(), k=args.k)
+                ids = {int(r["vector_id"].split("_")[1]) for r in results}
+                hits += len(ids & set(expected.tolist()))
+            elapsed = (time.perf_counter() - start) / args.queries * 1000
+
+            print(
+                f"{index_type:<10} {rerank_factor or '-':>6} "
+                f"{store.memory_bytes() / 2**20:>11.1f} "
+                f"{hits / (args.queries * args.k):>9.3f} {elapsed:>9.2f}"
+            )
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
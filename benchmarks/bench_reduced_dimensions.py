@@ -0,0 +1,113 @@
+"""
+Compare recall and footprint of reduced-dimension vector stores.
+
+Builds a full-dimension store and one store per reduction (Matryoshka
+truncation and PCA at each target dimension) from the same embeddings,
+and reports sidecar size, index memory, recall@k against exact cosine
+search on the full vectors, and per-query latency.
+
+Synthetic embeddings front-load their variance like Matryoshka-trained
+models; pass --embeddings with real vectors (an .npy of chunk embeddings
+followed by query embeddings) to pick dimensions for a tenant.
+
+Usage:
+    python benchmarks/bench_reduced_dimensions.py --vectors 100000 --dimension 1536
+    python benchmarks/bench_reduced_dimensions.py --embeddings tenant.npy --queries 500
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import get_settings  # noqa: E402
+
+settings = get_settings()
+
+
+def make_embeddings(count: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors whose variance decays over the dimensions."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, count // 500), dimension)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size=count)
+    noise = rng.normal(scale=0.3, size=(count, dimension)).astype(np.float32)
+    vectors = (centers[labels] + noise) / np.sqrt(1 + np.arange(dimension, dtype=np.float32))
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def build_store(name: str, vectors: np.ndarray, dimension: int, method: str):
+    """Create a cosine store, load the vectors and reduce it if asked."""
+    from app.services.vector_service import VectorStore
+    from app.utils.faiss_index import IndexConfig
+
+    store = VectorStore(name, vectors.shape[1], IndexConfig(metric="cosine"))
+    for start in range(0, len(vectors), 10000):
+        batch = vectors[start:start + 10000]
+        store.add_vectors(
+            vectors=batch,
+            documents=[f"chunk {start + i}" for i in range(len(batch))],
+            document_ids=["doc"] * len(batch),
+        )
+    if method != "full":
+        store.reduce_dimension(dimension, method)
+    return store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--embeddings", help=".npy of stored vectors followed by queries")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--targets", type=int, nargs="+", default=[256, 512])
+    args = parser.parse_args()
+
+    if args.embeddings:
+        embeddings = np.load(args.embeddings).astype(np.float32)
+        faiss.normalize_L2(embeddings)
+        vectors, queries = embeddings[:-args.queries], embeddings[-args.queries:]
+    else:
+        vectors = make_embeddings(args.vectors, args.dimension)
+        queries = make_embeddings(args.queries, args.dimension, seed=1)
+    _, truth = faiss.knn(queries, vectors, args.k, metric=faiss.METRIC_INNER_PRODUCT)
+
+    variants = [("full", vectors.shape[1])]
+    variants += [(method, target) for target in args.targets for method in ("truncate", "pca")]
+
+    print(f"{len(vectors)} x {vectors.shape[1]}, {len(queries)} queries, k={args.k}")
+    print(
+        f"{'reduction':<10} {'dims':>5} {'sidecar MiB':>12} {'memory MiB':>11} "
+        f"{'recall@k':>9} {'ms/query':>9}"
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.faiss_index_path = directory
+        for method, dimension in variants:
+            store = build_store(f"{method}-{dimension}", vectors, dimension, method)
+
+            hits = 0
+            start = time.perf_counter()
+            for query, expected in zip(queries, truth):
+                results = store.search(query, k=args.k)
+                ids = {int(r["vector_id"].split("_")[1]) for r in results}
+                hits += len(ids & set(expected.tolist()))
+            elapsed = (time.perf_counter() - start) / len(queries) * 1000
+
+            print(
+                f"{method:<10} {dimension:>5} {store.vector_file.nbytes / 2**20:>12.1f} "
+                f"{store.memory_bytes() / 2**20:>11.1f} "
+                f"{hits / (len(queries) * args.k):>9.3f} {elapsed:>9.2f}"
+            )
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compare n single-query searches with one batched search.
+
+Usage:
+    python benchmarks/bench_search_batch.py --vectors 100000 --queries 64
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import get_settings  # noqa: E402
+
+settings = get_settings()
+
+
+def timed(func, repeat: int) -> float:
+    """Best wall time of `repeat` runs in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.services.vector_service import VectorStore
+    from app.utils.faiss_index import IndexConfig
+
+    rng = np.random.default_rng(0)
+    vectors = rng.random((args.vectors, args.dimension), dtype=np.float32)
+    queries = rng.random((args.queries, args.dimension), dtype=np.float32)
+
+    print(f"{args.vectors} x {args.dimension}, {args.queries} queries, k={args.k}")
+    print(f"{'index':<8} {'single ms':>10} {'batch ms':>10} {'speedup':>8}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.faiss_index_path = directory
+        for index_type in ("flat", "ivf_flat", "hnsw"):
+            config = IndexConfig(index_type=index_type, promotion_threshold=1)
+            store = VectorStore(index_type, args.dimension, config)
+            for start in range(0, args.vectors, 10000):
+                batch = vectors[start:start + 10000]
+                store.add_vectors(
+                    vectors=batch.tolist(),
+                    documents=[f"chunk {start + i}" for i in range(len(batch))],
+                    document_ids=[f"doc-{(start + i) // 50}" for i in range(len(batch))],
+                )
+
+            single = timed(lambda: [store.search(q, k=args.k) for q in queries], args.repeat)
+            batched = timed(lambda: store.search_batch(queries, k=args.k), args.repeat)
+            print(f"{index_type:<8} {single:>10.1f} {batched:>10.1f} {single / batched:>7.1f}x")
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
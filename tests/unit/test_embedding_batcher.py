@@ -0,0 +1,74 @@
+"""Unit tests for query micro-batching."""
+
+import asyncio
+
+from app.services.embedding_batcher import QueryBatcher
+
+
+class RecordingEmbedder:
+    """Embedding function stub that records each batch."""
+
+    def __init__(self, fail: bool = False):
+        self.batches: list[list[str]] = []
+        self.fail = fail
+
+    async def __call__(self, texts: list[str]) -> list[list[float]]:
+        self.batches.append(texts)
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return [[float(len(text))] for text in texts]
+
+
+class TestQueryBatcher:
+    """Tests for the query batcher."""
+
+    async def test_concurrent_queries_share_one_call(self):
+        """Test queries arriving together are embedded in one call."""
+        embed = RecordingEmbedder()
+        batcher = QueryBatcher(embed, max_size=32, max_wait_ms=5)
+
+        vectors = await asyncio.gather(*(batcher.submit(q) for q in ["a", "bb", "a", "ccc"]))
+
+        assert embed.batches == [["a", "bb", "ccc"]]
+        assert vectors == [[1.0], [2.0], [1.0], [3.0]]
+
+    async def test_full_batch_is_sent_without_waiting(self):
+        """Test a batch is flushed as soon as it reaches its maximum size."""
+        embed = RecordingEmbedder()
+        batcher = QueryBatcher(embed, max_size=2, max_wait_ms=10_000)
+
+        vectors = await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(q) for q in ["a", "b", "c", "d"])),
+            timeout=1,
+        )
+
+        assert embed.batches == [["a", "b"], ["c", "d"]]
+        assert len(vectors) == 4
+
+    async def test_lone_query_waits_at_most_max_wait(self):
+        """Test a query is sent after the wait time even if no others arrive."""
+        embed = RecordingEmbedder()
+        batcher = QueryBatcher(embed, max_size=8, max_wait_ms=1)
+
+        assert await asyncio.wait_for(batcher.submit("abc"), timeout=1) == [3.0]
+        assert embed.batches == [["abc"]]
+
+    async def test_failure_reaches_every_caller(self):
+        """Test a failed call fails each query of its batch."""
+        batcher = QueryBatcher(RecordingEmbedder(fail=True), max_size=8, max_wait_ms=1)
+
+        results = await asyncio.gather(
+            batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    def test_batches_are_kept_per_event_loop(self):
+        """Test the batcher keeps working when callers use different loops."""
+        embed = RecordingEmbedder()
+        batcher = QueryBatcher(embed, max_size=8, max_wait_ms=1)
+
+        assert asyncio.run(batcher.submit("a")) == [1.0]
+        assert asyncio.run(batcher.submit("bb")) == [2.0]
+        assert embed.batches == [["a"], ["bb"]]
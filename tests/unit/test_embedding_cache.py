@@ -0,0 +1,165 @@
+"""Unit tests for the embedding cache."""
+
+import hashlib
+
+import pytest
+
+from app.services import embedding_cache
+from app.services.embedding_cache import (
+    DiskEmbeddingCache,
+    QueryEmbeddingCache,
+    RedisEmbeddingCache,
+    query_digest,
+)
+from app.services.embedding_service import EmbeddingService
+
+
+class CountingEmbeddings:
+    """Embedding model stub that records the texts it is asked to embed."""
+
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(texts)
+        return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return self.embed_query(text)
+
+
+class FakeCacheService:
+    """In-memory stand-in for `CacheService`."""
+
+    def __init__(self):
+        self.values: dict = {}
+
+    async def get(self, key: str):
+        return self.values.get(key)
+
+    async def set(self, key: str, value, expire=None) -> bool:
+        self.values[key] = value
+        return True
+
+    async def get_many(self, keys: list[str]) -> dict:
+        return {key: self.values[key] for key in keys if key in self.values}
+
+    async def set_many(self, values: dict, expire=None) -> bool:
+        self.values.update(values)
+        return True
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    """Embedding service with a stub model and a fresh disk cache."""
+    monkeypatch.setattr(embedding_cache.settings, "embedding_cache_path", str(tmp_path / "e.db"))
+    monkeypatch.setattr(embedding_cache, "_caches", {})
+    monkeypatch.setattr(embedding_cache, "_query_cache", QueryEmbeddingCache(8, FakeCacheService()))
+    monkeypatch.setattr(
+        EmbeddingService,
+        "_initialize_embeddings",
+        lambda self: CountingEmbeddings(),
+    )
+    return EmbeddingService("text-embedding-3-small")
+
+
+class TestEmbeddingCache:
+    """Tests for cached document embedding."""
+
+    def test_only_misses_reach_the_provider(self, service):
+        """Test cached and duplicate texts are not embedded again."""
+        first = service.embed_documents(["alpha", "beta", "alpha"])
+        second = service.embed_documents(["beta", "gamma"])
+
+        assert service.embeddings.calls == [["alpha", "beta"], ["gamma"]]
+        assert first[0] == first[2] == [5.0, 1.0, 0.5]
+        assert second[0] == first[1]
+
+    async def test_async_path_shares_the_cache(self, service):
+        """Test async ingestion reuses embeddings cached by the sync path."""
+        service.embed_documents(["alpha"])
+
+        vectors = await service.embed_documents_async(["alpha", "delta"])
+
+        assert service.embeddings.calls == [["alpha"], ["delta"]]
+        assert vectors[1] == [5.0, 1.0, 0.5]
+
+    def test_key_depends_on_model_and_dimensions(self, tmp_path):
+        """Test embeddings of different models never collide."""
+        small = DiskEmbeddingCache("model-a", 256, str(tmp_path / "e.db"))
+        large = DiskEmbeddingCache("model-a", 1536, str(tmp_path / "e.db"))
+        small.set_many({small.key("text"): [1.0, 2.0]})
+
+        assert large.get_many([large.key("text")]) == {}
+        assert small.get_many([small.key("text")]) == {small.key("text"): [1.0, 2.0]}
+
+    def test_disk_cache_expires_and_caps_rows(self, tmp_path, monkeypatch):
+        """Test pruning drops expired rows, then the oldest beyond the row limit."""
+        monkeypatch.setattr(embedding_cache.settings, "embedding_cache_max_rows", 2)
+        cache = DiskEmbeddingCache("model-a", path=str(tmp_path / "e.db"))
+        clock = iter([1000.0, 2000.0, 3000.0, 4000.0, 5000.0])
+        monkeypatch.setattr(embedding_cache.time, "time", lambda: next(clock))
+        for text in ("old", "a", "b", "c"):
+            cache.set_many({cache.key(text): [1.0]})
+
+        monkeypatch.setattr(
+            embedding_cache.settings, "embedding_cache_ttl_seconds", 5000.0 - 1500.0
+        )
+        assert cache.prune() == 2
+
+        keys = [cache.key(text) for text in ("old", "a", "b", "c")]
+        assert sorted(cache.get_many(keys)) == sorted(keys[2:])
+
+    async def test_redis_backend_round_trip(self):
+        """Test vectors survive the Redis encoding."""
+        cache = RedisEmbeddingCache("model-a", None, FakeCacheService())
+        key = cache.key("text")
+
+        await cache.set_many_async({key: [0.25, -1.5]})
+
+        assert await cache.get_many_async([key, cache.key("other")]) == {key: [0.25, -1.5]}
+
+
+class TestQueryEmbeddingCache:
+    """Tests for cached query embedding."""
+
+    def test_digest_is_stable_and_normalized(self):
+        """Test the digest ignores casing and spacing but not the scope."""
+        assert query_digest("What is RAG?") == query_digest("  what   is rag? ")
+        assert query_digest("What is RAG?") == hashlib.sha256(b"what is rag?").hexdigest()
+        assert query_digest("q", "doc-1") != query_digest("q", "doc-2")
+
+    def test_repeated_queries_skip_the_provider(self, service):
+        """Test normalized repeats are answered from memory."""
+        first = service.embed_query("What is RAG?")
+        second = service.embed_query("what is  rag?")
+
+        assert service.embeddings.calls == [["What is RAG?"]]
+        assert first == second
+
+    async def test_redis_tier_is_shared_between_workers(self, service):
+        """Test a query embedded by one worker is reused by another."""
+        await service.embed_query_async("alpha")
+        other = QueryEmbeddingCache(8, service.query_cache.cache_service)
+        key = other.key(service.model_name, service.dimensions, "alpha")
+
+        assert await other.get_async(key) == [5.0, 1.0, 0.5]
+        assert other.get(key) == [5.0, 1.0, 0.5]
+
+    def test_lru_evicts_least_recently_used(self):
+        """Test the in-process tier stays bounded."""
+        cache = QueryEmbeddingCache(2)
+        cache.set("a", [1.0])
+        cache.set("b", [2.0])
+        cache.get("a")
+        cache.set("c", [3.0])
+
+        assert cache.get("b") is None
+        assert cache.get("a") == [1.0]
+        assert cache.get("c") == [3.0]
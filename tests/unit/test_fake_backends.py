@@ -0,0 +1,81 @@
+"""Unit tests for the offline fake backends."""
+
+import time
+
+import numpy as np
+from langchain_core.messages import HumanMessage
+
+from app.services import embedding_cache, embedding_service, llm_service
+from app.services.embedding_service import EmbeddingService
+from app.services.fake_backends import FakeChatModel, FakeEmbeddings, fake_vector
+
+
+class TestFakeEmbeddings:
+    """Tests for the fake embedding model."""
+
+    def test_vectors_are_deterministic_and_normalized(self):
+        """Test the same text always maps to the same unit vector."""
+        model = FakeEmbeddings(dimension=64, latency_ms=0)
+
+        first, second = model.embed_documents(["alpha", "beta"])
+
+        assert first == model.embed_query("alpha") == fake_vector("alpha", 64)
+        assert first != second
+        assert len(first) == 64
+        assert np.isclose(np.linalg.norm(first), 1.0)
+
+    async def test_latency_is_simulated(self):
+        """Test each call takes the configured latency."""
+        model = FakeEmbeddings(dimension=8, latency_ms=20)
+
+        start = time.perf_counter()
+        await model.aembed_documents(["a", "b"])
+
+        assert time.perf_counter() - start >= 0.02
+
+    def test_selected_by_backend_setting(self, tmp_path, monkeypatch):
+        """Test the embedding service uses the fake and caches it apart."""
+        monkeypatch.setattr(embedding_service.settings, "embedding_backend", "fake")
+        monkeypatch.setattr(embedding_cache.settings, "embedding_cache_path", str(tmp_path / "db"))
+        monkeypatch.setattr(embedding_cache, "_caches", {})
+
+        service = EmbeddingService("text-embedding-3-small")
+
+        assert isinstance(service.embeddings, FakeEmbeddings)
+        assert service.cache_model == "fake:text-embedding-3-small"
+        assert len(service.embed_documents(["chunk"])[0]) == service.embeddings.dimension
+        assert service.output_dimension == service.embeddings.dimension
+
+
+class TestFakeChatModel:
+    """Tests for the fake chat model."""
+
+    async def test_streams_at_configured_pace(self):
+        """Test time to first token and token count follow the settings."""
+        model = FakeChatModel(first_token_ms=30, tokens_per_second=1000, response_tokens=10)
+
+        start = time.perf_counter()
+        chunks = [chunk.content async for chunk in model.astream([HumanMessage(content="hi")])]
+
+        assert len(chunks) == 10
+        assert time.perf_counter() - start >= 0.03
+
+    def test_answers_are_deterministic(self):
+        """Test the same prompt yields the same answer."""
+        model = FakeChatModel(first_token_ms=0, tokens_per_second=0, response_tokens=5)
+        messages = [HumanMessage(content="what is in the quarterly report")]
+
+        assert model.invoke(messages).content == model.invoke(messages).content
+        assert len(model.invoke(messages).content.split()) == 5
+
+    async def test_selected_by_backend_setting(self, monkeypatch):
+        """Test the LLM service streams from the fake."""
+        monkeypatch.setattr(llm_service.settings, "llm_backend", "fake")
+        monkeypatch.setattr(llm_service.settings, "fake_llm_first_token_ms", 0)
+        monkeypatch.setattr(llm_service.settings, "fake_llm_tokens_per_second", 0)
+
+        service = llm_service.LLMService(max_tokens=20)
+        chunks = [chunk async for chunk in service.generate_stream("question?", "context")]
+
+        assert isinstance(service.llm, FakeChatModel)
+        assert len(chunks) == 20
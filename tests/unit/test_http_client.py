@@ -0,0 +1,105 @@
+"""Unit tests for shared HTTP clients and service singletons."""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.core import http_client
+from app.core.http_client import LoopLocalTransport
+from app.services import embedding_cache, embedding_service, llm_service
+from app.services.embedding_service import EmbeddingService, get_embedding_service
+from app.services.llm_service import LLMService
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients(monkeypatch):
+    """Start every test without shared clients or services."""
+    monkeypatch.setattr(http_client, "_client", None)
+    monkeypatch.setattr(http_client, "_async_client", None)
+    monkeypatch.setattr(embedding_service, "_services", {})
+
+
+class TestHTTPClient:
+    """Tests for the shared connection pools."""
+
+    def test_clients_are_shared(self):
+        """Test every caller gets the same pooled clients."""
+        assert http_client.get_http_client() is http_client.get_http_client()
+        assert http_client.get_async_http_client() is http_client.get_async_http_client()
+
+    def test_pool_per_event_loop(self):
+        """Test a pool is reused within a loop but never across loops."""
+        transport = LoopLocalTransport(httpx.Limits())
+
+        async def pools():
+            return transport._transport(), transport._transport()
+
+        first, again = asyncio.run(pools())
+        second, _ = asyncio.run(pools())
+
+        assert first is again
+        assert first is not second
+
+    async def test_close_resets_clients(self):
+        """Test shutdown closes the clients and later calls get new ones."""
+        client = http_client.get_http_client()
+        http_client.get_async_http_client()
+
+        await http_client.close_http_clients()
+
+        assert client.is_closed
+        assert http_client.get_http_client() is not client
+
+
+class TestOpenAIClients:
+    """Tests for handing the shared pools to the OpenAI clients."""
+
+    @pytest.fixture(autouse=True)
+    def openai_backend(self, tmp_path, monkeypatch):
+        """Use the OpenAI backends with a dummy key and a temporary cache."""
+        monkeypatch.setattr(embedding_service.settings, "embedding_backend", "openai")
+        monkeypatch.setattr(embedding_service.settings, "openai_api_key", "test-key")
+        monkeypatch.setattr(llm_service.settings, "llm_backend", "openai")
+        monkeypatch.setattr(embedding_cache.settings, "embedding_cache_path", str(tmp_path / "db"))
+        monkeypatch.setattr(embedding_cache, "_caches", {})
+
+    def test_embeddings_use_sync_and_async_pools(self):
+        """Test sync calls use the sync pool and async calls the async pool."""
+        embeddings = EmbeddingService("text-embedding-3-small").embeddings
+
+        assert embeddings.model_kwargs == {}
+        assert embeddings.client._client._client is http_client.get_http_client()
+        assert embeddings.async_client._client._client is http_client.get_async_http_client()
+
+    def test_chat_model_uses_sync_and_async_pools(self):
+        """Test the chat model gets the same pools as embeddings."""
+        llm = LLMService().llm
+
+        assert llm.model_kwargs == {}
+        assert llm.client._client._client is http_client.get_http_client()
+        assert llm.async_client._client._client is http_client.get_async_http_client()
+
+
+class TestServiceSingletons:
+    """Tests for the shared embedding service."""
+
+    def test_embedding_service_built_once_per_model(self, tmp_path, monkeypatch):
+        """Test the model is initialized once however many requests ask for it."""
+        built = []
+        monkeypatch.setattr(embedding_cache.settings, "embedding_cache_path", str(tmp_path / "db"))
+        monkeypatch.setattr(embedding_cache, "_caches", {})
+        monkeypatch.setattr(
+            EmbeddingService,
+            "_initialize_embeddings",
+            lambda self: built.append(self) or SimpleNamespace(aembed_documents=None),
+        )
+
+        first = get_embedding_service()
+        second = get_embedding_service()
+        other = get_embedding_service("all-MiniLM-L6-v2")
+
+        assert first is second
+        assert other is not first
+        assert len(built) == 2
@@ -0,0 +1,105 @@
+"""Unit tests for concurrent, retried document embedding."""
+
+import asyncio
+
+import pytest
+
+from app.services import ingestion
+from app.services.ingestion import embed_and_store
+
+
+class RecordingStore:
+    """Vector store stub that hands out `vec_N` IDs and records deletes."""
+
+    def __init__(self):
+        self.next_id = 0
+        self.documents: list[str] = []
+        self.deleted: list[str] = []
+
+    async def add_vectors_async(self, vectors, documents, document_ids):
+        ids = [f"vec_{self.next_id + i}" for i in range(len(vectors))]
+        self.next_id += len(vectors)
+        self.documents.extend(documents)
+        return ids
+
+    async def delete_vectors_async(self, document_id):
+        self.deleted.append(document_id)
+        return True
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    """Two chunks per batch, two batches in flight, no retry backoff."""
+    monkeypatch.setattr(ingestion.settings, "embedding_batch_size", 2)
+    monkeypatch.setattr(ingestion.settings, "embedding_concurrency", 2)
+    monkeypatch.setattr(ingestion.settings, "embedding_max_attempts", 3)
+    monkeypatch.setattr(ingestion.settings, "embedding_retry_backoff_seconds", 0)
+
+
+class TestEmbedAndStore:
+    """Tests for `embed_and_store`."""
+
+    async def test_ids_follow_chunk_order(self):
+        """Test IDs come back in chunk order even when batches finish out of order."""
+        store = RecordingStore()
+        chunks = [f"chunk {i}" for i in range(5)]
+
+        async def embed(batch):
+            # Earlier batches finish last.
+            await asyncio.sleep(0.01 * (5 - int(batch[0].split()[1])))
+            return [[float(chunk.split()[1])] for chunk in batch]
+
+        ids = await embed_and_store("doc-1", chunks, embed, store)
+
+        by_id = dict(zip([f"vec_{i}" for i in range(5)], store.documents))
+        assert [by_id[vector_id] for vector_id in ids] == chunks
+
+    async def test_failed_batch_is_retried(self):
+        """Test a transient provider error is retried without losing chunks."""
+        store = RecordingStore()
+        failures = {"chunk 2": 1}
+
+        async def embed(batch):
+            if failures.get(batch[0]):
+                failures[batch[0]] -= 1
+                raise ConnectionError("rate limited")
+            return [[0.0] for _ in batch]
+
+        ids = await embed_and_store("doc-1", [f"chunk {i}" for i in range(4)], embed, store)
+
+        assert len(ids) == 4
+        assert store.deleted == []
+
+    async def test_persistent_failure_rolls_back(self):
+        """Test a batch failing every attempt removes the document's added vectors."""
+        store = RecordingStore()
+        attempts = []
+
+        async def embed(batch):
+            attempts.append(batch[0])
+            if batch[0] == "chunk 2":
+                raise ConnectionError("provider down")
+            return [[0.0] for _ in batch]
+
+        with pytest.raises(ConnectionError):
+            await embed_and_store("doc-1", [f"chunk {i}" for i in range(4)], embed, store)
+
+        assert attempts.count("chunk 2") == 3
+        assert store.deleted == ["doc-1"]
+
+    async def test_failed_rollback_keeps_original_error(self):
+        """Test the batch failure is raised even if removing added vectors fails."""
+        store = RecordingStore()
+
+        async def delete_vectors_async(document_id):
+            raise OSError("disk full")
+
+        store.delete_vectors_async = delete_vectors_async
+
+        async def embed(batch):
+            if batch[0] == "chunk 2":
+                raise ConnectionError("provider down")
+            return [[0.0] for _ in batch]
+
+        with pytest.raises(ConnectionError):
+            await embed_and_store("doc-1", [f"chunk {i}" for i in range(4)], embed, store)
@@ -0,0 +1,50 @@
+"""Unit tests for the local embedding engine helpers."""
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.local_embeddings import OnnxEmbeddings, length_batches, mean_pool
+
+
+def engine_with_output(shape: list) -> OnnxEmbeddings:
+    """ONNX engine whose session reports one output of the given shape."""
+    engine = OnnxEmbeddings.__new__(OnnxEmbeddings)
+    output = SimpleNamespace(shape=shape)
+    engine.session = SimpleNamespace(get_outputs=lambda: [output])
+    return engine
+
+
+class TestLocalEmbeddings:
+    """Tests for batching and pooling of the ONNX engine."""
+
+    def test_length_batches_group_similar_lengths(self):
+        """Test every input lands in one batch, ordered by length."""
+        lengths = [50, 3, 40, 4, 45, 5]
+
+        batches = length_batches(lengths, batch_size=2)
+
+        assert batches == [[1, 3], [5, 2], [4, 0]]
+        assert sorted(i for batch in batches for i in batch) == list(range(6))
+
+    def test_mean_pool_ignores_padding(self):
+        """Test padded positions do not change the embedding."""
+        hidden = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+        mask = np.array([[1, 1, 0]])
+
+        pooled = mean_pool(hidden, mask)
+
+        np.testing.assert_allclose(pooled, [[1.0, 0.0]])
+
+    def test_dimension_read_from_model_output(self):
+        """Test a fixed output width is taken from the graph."""
+        engine = engine_with_output(["batch", "tokens", 384])
+
+        assert engine._output_dimension() == 384
+
+    def test_symbolic_dimension_is_probed(self, monkeypatch):
+        """Test a symbolic output width is measured on a probe input."""
+        engine = engine_with_output(["batch", "tokens", "hidden"])
+        monkeypatch.setattr(engine, "embed_query", lambda text: [0.0] * 768, raising=False)
+
+        assert engine._output_dimension() == 768
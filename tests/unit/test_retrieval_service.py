@@ -0,0 +1,43 @@
+"""Unit tests for the retrieval service."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services import vector_service
+from app.services.retrieval_service import RetrievalService
+from app.services.vector_service import VectorStore
+
+DIMENSION = 16
+
+
+@pytest.fixture(autouse=True)
+def index_path(tmp_path, monkeypatch):
+    """Point vector stores at a temporary directory."""
+    monkeypatch.setattr(vector_service.settings, "faiss_index_path", str(tmp_path))
+    return tmp_path
+
+
+class TestRetrievalService:
+    """Tests for building LLM context from the vector store."""
+
+    async def test_document_filter_is_applied_in_the_search(self):
+        """Test filtered context comes from the selected document even if others rank higher."""
+        rng = np.random.default_rng(0)
+        query = rng.random(DIMENSION, dtype=np.float32)
+        store = VectorStore("user-1", DIMENSION)
+        near = query + rng.normal(scale=0.01, size=(20, DIMENSION)).astype(np.float32)
+        store.add_vectors(near, [f"near {i}" for i in range(20)], ["doc-1"] * 20)
+        store.add_vectors(-query[None], ["far"], ["doc-2"])
+
+        async def embed_query_async(text):
+            return query.tolist()
+
+        embeddings = SimpleNamespace(embed_query_async=embed_query_async)
+        service = RetrievalService("user-1", embedding_service=embeddings, vector_store=store)
+
+        context, sources = await service.get_context_async("q", k=4, document_ids=["doc-2"])
+
+        assert [source["document_id"] for source in sources] == ["doc-2"]
+        assert "far" in context and "near" not in context
@@ -0,0 +1,142 @@
+"""Unit tests for the vector service and its client."""
+
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from app.core.exceptions import ServiceUnavailableError
+from app.services import embedding_service, vector_rpc, vector_service
+from app.services.vector_rpc import (
+    RemoteVectorStore,
+    VectorRPCClient,
+    VectorRPCError,
+    VectorRPCServer,
+    parse_address,
+    read_frame,
+    write_frame,
+)
+from app.services.vector_service import VectorStoreManager, get_vector_store
+
+DIMENSION = 16
+
+
+@pytest.fixture(autouse=True)
+def index_path(tmp_path, monkeypatch):
+    """Point vector stores at a temporary directory."""
+    monkeypatch.setattr(vector_service.settings, "faiss_index_path", str(tmp_path / "faiss"))
+    return tmp_path
+
+
+@pytest.fixture
+def address(tmp_path):
+    """Run a vector service on a Unix socket for the duration of a test."""
+    address = f"unix://{tmp_path}/vector.sock"
+    server = VectorRPCServer(address, VectorStoreManager(max_bytes=10**9))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield address
+    server.shutdown()
+    thread.join()
+
+
+def remote_store(address: str, user_id: str = "user-1", read_only: bool = False):
+    """Open a user's store through the vector service."""
+    return RemoteVectorStore(user_id, DIMENSION, read_only, VectorRPCClient(address, timeout=5))
+
+
+def random_vectors(count: int, seed: int = 0) -> list[list[float]]:
+    """Generate deterministic random vectors."""
+    rng = np.random.default_rng(seed)
+    return rng.random((count, DIMENSION), dtype=np.float32).tolist()
+
+
+class TestVectorRPC:
+    """Tests for calls made through the vector service."""
+
+    def test_parse_address(self):
+        """Test Unix and TCP addresses are recognized."""
+        assert parse_address("unix:///run/vector.sock")[1] == "/run/vector.sock"
+        assert parse_address("tcp://127.0.0.1:7070")[1] == ("127.0.0.1", 7070)
+        assert parse_address("tcp://localhost:7070")[1] == ("localhost", 7070)
+        with pytest.raises(ValueError):
+            parse_address("http://localhost")
+
+    @pytest.mark.parametrize("host", ["0.0.0.0", "10.0.0.5", "vector.internal"])
+    def test_non_loopback_tcp_is_rejected(self, host):
+        """Test the unauthenticated service cannot be exposed to the network."""
+        with pytest.raises(ValueError, match="loopback"):
+            parse_address(f"tcp://{host}:7070")
+
+    def test_round_trip(self, address):
+        """Test add, search, batch search and delete behave like a local store."""
+        store = remote_store(address)
+        vectors = random_vectors(10)
+
+        ids = store.add_vectors(vectors, [f"chunk {i}" for i in range(10)], ["doc-1"] * 10)
+        results = store.search(vectors[3], k=2)
+        batch = store.search_batch(vectors[:3], k=1)
+
+        assert len(ids) == 10
+        assert results[0]["text"] == "chunk 3"
+        assert store.metric == "l2"
+        assert [r[0]["text"] for r in batch] == ["chunk 0", "chunk 1", "chunk 2"]
+        assert store.total_vectors == 10
+        assert store.get_stats()["documents"] == 1
+        assert store.delete_vectors("doc-1") is True
+        assert store.search(vectors[3], k=2) == []
+
+    async def test_async_variants(self, address):
+        """Test the async methods go through the vector executor."""
+        store = remote_store(address)
+        vectors = random_vectors(4)
+
+        await store.add_vectors_async(vectors, ["a", "b", "c", "d"], ["doc-1"] * 4)
+
+        assert (await store.search_async(vectors[1], k=1))[0]["text"] == "b"
+
+    def test_remote_errors_are_raised(self, address):
+        """Test a failing call raises without breaking the connection."""
+        store = remote_store(address)
+        reader = remote_store(address, read_only=True)
+        store.add_vectors(random_vectors(1), ["a"], ["doc-1"])
+
+        with pytest.raises(VectorRPCError, match="RuntimeError"):
+            reader.add_vectors(random_vectors(1), ["b"], ["doc-2"])
+        assert reader.total_vectors == 1
+
+    def test_numpy_vectors_are_accepted(self, address):
+        """Test numpy input is sent like lists, including an empty batch."""
+        store = remote_store(address)
+
+        assert store.add_vectors(np.empty((0, DIMENSION), dtype=np.float32), [], []) == []
+        assert len(store.add_vectors(np.array(random_vectors(2)), ["a", "b"], ["doc-1"] * 2)) == 2
+
+    def test_oversized_frame_is_rejected(self, monkeypatch):
+        """Test a frame declaring more than the limit is refused before allocation."""
+        monkeypatch.setattr(vector_rpc.settings, "vector_rpc_max_frame_bytes", 1024)
+        sender, receiver = socket.socketpair()
+        write_frame(sender, {"method": "info"}, b"x" * 2048)
+
+        with pytest.raises(ConnectionError):
+            read_frame(receiver)
+        sender.close()
+        receiver.close()
+
+    def test_unreachable_service(self, tmp_path):
+        """Test a missing service surfaces as unavailable."""
+        store = remote_store(f"unix://{tmp_path}/missing.sock")
+
+        with pytest.raises(ServiceUnavailableError):
+            store.search(random_vectors(1)[0])
+
+    def test_factory_returns_remote_store(self, address, monkeypatch):
+        """Test `get_vector_store` goes through the service once configured."""
+        monkeypatch.setattr(vector_service.settings, "vector_rpc_address", address)
+        monkeypatch.setattr(embedding_service, "get_embedding_dimension", lambda: DIMENSION)
+
+        store = get_vector_store("user-1")
+
+        assert isinstance(store, RemoteVectorStore)
+        assert store.dimension == DIMENSION
@@ -0,0 +1,970 @@
+"""Unit tests for the FAISS vector store."""
+
+import json
+import multiprocessing
+import threading
+
+import faiss
+import numpy as np
+import pytest
+
+from app.services import vector_service
+from app.services.vector_service import (
+    TenantVectorStore,
+    VectorStore,
+    VectorStoreManager,
+    shard_for_user,
+)
+from app.utils.chunk_store import ChunkStore
+from app.utils.dimension_reduction import DimensionReducer
+from app.utils.faiss_index import IndexConfig, get_index_type
+from app.utils.rwlock import ReadWriteLock
+
+DIMENSION = 16
+
+
+@pytest.fixture(autouse=True)
+def index_path(tmp_path, monkeypatch):
+    """Point vector stores at a temporary directory."""
+    monkeypatch.setattr(vector_service.settings, "faiss_index_path", str(tmp_path))
+    return tmp_path
+
+
+def random_vectors(count: int, seed: int = 0) -> list[list[float]]:
+    """Generate deterministic random vectors."""
+    rng = np.random.default_rng(seed)
+    return rng.random((count, DIMENSION), dtype=np.float32).tolist()
+
+
+def add_document(store: VectorStore, document_id: str, vectors: list[list[float]]) -> list[str]:
+    """Add one document's chunks to a store."""
+    return store.add_vectors(
+        vectors=vectors,
+        documents=[f"{document_id} chunk {i}" for i in range(len(vectors))],
+        document_ids=[document_id] * len(vectors),
+    )
+
+
+def snapshot_path(index_path, user_id: str = "user-1"):
+    """Path of the index snapshot named by a store's manifest."""
+    manifest = json.loads((index_path / user_id / "checkpoint.json").read_text())
+    return index_path / user_id / manifest["index_file"]
+
+
+class TestVectorStore:
+    """Tests for VectorStore class."""
+
+    def test_add_and_search(self):
+        """Test the nearest vector is returned first."""
+        store = VectorStore("user-1", DIMENSION)
+        vectors = random_vectors(10)
+        add_document(store, "doc-1", vectors)
+
+        results = store.search(vectors[3], k=1)
+
+        assert results[0]["text"] == "doc-1 chunk 3"
+        assert results[0]["score"] == pytest.approx(0.0, abs=1e-5)
+
+    def test_flat_index_stays_flat(self):
+        """Test flat stores are never promoted."""
+        store = VectorStore("user-1", DIMENSION, IndexConfig(promotion_threshold=10))
+        add_document(store, "doc-1", random_vectors(100))
+
+        assert get_index_type(store.index) == "flat"
+
+    @pytest.mark.parametrize("index_type", ["ivf_flat", "ivf_pq", "hnsw"])
+    def test_promotion_after_threshold(self, index_type):
+        """Test the index is promoted once it crosses the threshold."""
+        config = IndexConfig(index_type=index_type, promotion_threshold=300, pq_m=4, pq_nbits=4)
+        store = VectorStore("user-1", DIMENSION, config)
+        add_document(store, "doc-1", random_vectors(200, seed=1))
+        assert get_index_type(store.index) == "flat"
+
+        vectors = random_vectors(200, seed=2)
+        add_document(store, "doc-2", vectors)
+
+        assert get_index_type(store.index) == index_type
+        assert store.index.ntotal == 400
+        results = store.search(vectors[0], k=4, nprobe=64, ef_search=128)
+        assert results[0]["document_id"] == "doc-2"
+
+    @pytest.mark.parametrize("index_type", ["sq8", "pq", "ivf_sq8"])
+    def test_compressed_index_uses_less_memory(self, index_type):
+        """Test compressed indexes shrink the index and re-rank to exact scores."""
+        config = IndexConfig(
+            index_type=index_type,
+            promotion_threshold=300,
+            pq_m=4,
+            pq_nbits=4,
+            nprobe=64,
+            rerank_factor=4,
+        )
+        store = VectorStore("user-1", DIMENSION, config)
+        vectors = random_vectors(400)
+        add_document(store, "doc-1", vectors)
+        flat = VectorStore("user-2", DIMENSION)
+        add_document(flat, "doc-1", vectors)
+
+        results = store.search(vectors[10], k=3)
+
+        assert get_index_type(store.index) == index_type
+        assert store.memory_bytes() < flat.memory_bytes()
+        assert results[0]["text"] == "doc-1 chunk 10"
+        assert results[0]["score"] == pytest.approx(0.0, abs=1e-5)
+        assert results == flat.search(vectors[10], k=3)
+
+    def test_promoted_index_is_reloaded(self):
+        """Test a promoted index survives a reload."""
+        config = IndexConfig(index_type="hnsw", promotion_threshold=50)
+        store = VectorStore("user-1", DIMENSION, config)
+        add_document(store, "doc-1", random_vectors(60))
+
+        reloaded = VectorStore("user-1", DIMENSION, config)
+
+        assert get_index_type(reloaded.index) == "hnsw"
+        assert reloaded.get_stats()["total_vectors"] == 60
+
+    @pytest.mark.parametrize("index_type", ["flat", "sq8", "ivf_flat", "hnsw"])
+    def test_delete_vectors_by_id(self, index_type):
+        """Test deleting a document removes only its chunks."""
+        config = IndexConfig(index_type=index_type, promotion_threshold=100)
+        store = VectorStore("user-1", DIMENSION, config)
+        kept = random_vectors(80, seed=1)
+        add_document(store, "doc-1", kept)
+        add_document(store, "doc-2", random_vectors(80, seed=2))
+
+        assert store.delete_vectors("doc-2") is True
+
+        assert store.total_vectors == 80
+        assert store.get_stats()["documents"] == 1
+        results = store.search(kept[5], k=1, nprobe=64)
+        assert results[0]["text"] == "doc-1 chunk 5"
+
+    def test_hnsw_delete_leaves_tombstones_until_compaction(self):
+        """Test HNSW deletes skip deleted chunks without rebuilding the graph."""
+        config = IndexConfig(index_type="hnsw", promotion_threshold=10)
+        store = VectorStore("user-1", DIMENSION, config)
+        add_document(store, "doc-1", random_vectors(50, seed=1))
+        deleted = random_vectors(50, seed=2)
+        add_document(store, "doc-2", deleted)
+        graph = store.index
+
+        store.delete_vectors("doc-2")
+        store.merge()
+
+        assert store.index is graph
+        assert store.total_vectors == 50
+        results = store.search(deleted[3], k=10)
+        assert {r["document_id"] for r in results} == {"doc-1"}
+
+        reloaded = VectorStore("user-1", DIMENSION, config)
+        assert reloaded.total_vectors == 50
+        assert {r["document_id"] for r in reloaded.search(deleted[3], k=10)} == {"doc-1"}
+
+        reloaded.compact()
+        assert reloaded.index.ntotal == 50
+        assert not reloaded.deleted_ids
+
+    @pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw"])
+    @pytest.mark.parametrize("exact_filter_max", [0, 10000])
+    def test_filtered_search_returns_k_results(self, index_type, exact_filter_max):
+        """Test a document filter is applied before the top-k cut."""
+        config = IndexConfig(
+            index_type=index_type,
+            promotion_threshold=100,
+            nprobe=1,
+            exact_filter_max=exact_filter_max,
+        )
+        store = VectorStore("user-1", DIMENSION, config)
+        near = random_vectors(200, seed=1)
+        add_document(store, "doc-1", near)
+        far = (np.array(random_vectors(5, seed=2)) + 10).tolist()
+        add_document(store, "doc-2", far)
+
+        results = store.search(near[0], k=4, document_ids=["doc-2"])
+
+        assert len(results) == 4
+        assert {r["document_id"] for r in results} == {"doc-2"}
+        assert [r["score"] for r in results] == sorted(r["score"] for r in results)
+
+    def test_filtered_search_without_matching_chunks(self):
+        """Test filtering on unknown documents returns nothing."""
+        store = VectorStore("user-1", DIMENSION)
+        add_document(store, "doc-1", random_vectors(5))
+
+        assert store.search(random_vectors(1)[0], k=4, document_ids=["doc-9"]) == []
+
+    @pytest.mark.parametrize("index_type", ["flat", "sq8", "hnsw"])
+    def test_search_batch_matches_single_searches(self, index_type):
+        """Test a batched search returns the same results as one search per query."""
+        config = IndexConfig(index_type=index_type, promotion_threshold=100, rerank_factor=4)
+        store = VectorStore("user-1", DIMENSION, config)
+        add_document(store, "doc-1", random_vectors(150))
+        add_document(store, "doc-2", random_vectors(50, seed=1))
+        queries = random_vectors(6, seed=2)
+
+        batch = store.search_batch(queries, k=5)
+        filtered = store.search_batch(np.array(queries), k=5, document_ids=["doc-2"])
+
+        assert batch == [store.search(query, k=5) for query in queries]
+        assert filtered == [store.search(query, k=5, document_ids=["doc-2"]) for query in queries]
+        assert store.search_batch([], k=5) == []
+
+    @pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw", "sq8"])
+    def test_cosine_metric(self, index_type):
+        """Test cosine stores score by similarity regardless of vector length."""
+        config = IndexConfig(
+            index_type=index_type,
+            metric="cosine",
+            promotion_threshold=100,
+            nprobe=64,
+            rerank_factor=4,
+        )
+        store = VectorStore("user-1", DIMENSION, config)
+        vectors = np.array(random_vectors(200)) * np.arange(1, 201)[:, None]
+        add_document(store, "doc-1", vectors.tolist())
+
+        results = store.search((vectors[7] * 0.5).tolist(), k=5)
+
+        assert results[0]["text"] == "doc-1 chunk 7"
+        assert results[0]["score"] == pytest.approx(1.0, abs=1e-3)
+        scores = [r["score"] for r in results]
+        assert scores == sorted(scores, reverse=True)
+        assert all(-1.0 <= score <= 1.0 + 1e-5 for score in scores)
+
+    def test_score_threshold(self):
+        """Test hits beyond the threshold are dropped."""
+        store = VectorStore("user-1", DIMENSION, IndexConfig(metric="cosine"))
+        vectors = random_vectors(20)
+        add_document(store, "doc-1", vectors)
+
+        results = store.search(vectors[0], k=20, score_threshold=0.9)
+
+        assert 0 < len(results) < 20
+        assert all(r["score"] >= 0.9 for r in results)
+
+    def test_metric_change_rebuilds_index(self):
+        """Test reopening a store with a new metric rebuilds it from the sidecar."""
+        store = VectorStore("user-1", DIMENSION)
+        vectors = random_vectors(10)
+        add_document(store, "doc-1", vectors)
+        store.merge()
+
+        reloaded = VectorStore("user-1", DIMENSION, IndexConfig(metric="ip"))
+
+        assert reloaded.index.metric_type == faiss.METRIC_INNER_PRODUCT
+        assert reloaded.get_stats()["metric"] == "ip"
+        assert VectorStore("user-1", DIMENSION, IndexConfig(metric="ip")).metric == "ip"
+
+    def test_vector_ids_are_not_reused(self):
+        """Test IDs stay unique after deletions."""
+        store = VectorStore("user-1", DIMENSION)
+        first = add_document(store, "doc-1", random_vectors(3))
+        store.delete_vectors("doc-1")
+
+        second = add_document(store, "doc-2", random_vectors(3))
+
+        assert not set(first) & set(second)
+
+    def test_rejected_add_leaves_store_intact(self):
+        """Test a batch of the wrong width or length writes nothing."""
+        store = VectorStore("user-1", DIMENSION)
+        vectors = random_vectors(3)
+        add_document(store, "doc-1", vectors)
+
+        narrow = np.ones((2, DIMENSION // 2), dtype=np.float32)
+        with pytest.raises(ValueError):
+            store.add_vectors(narrow, ["a", "b"], ["doc-2", "doc-2"])
+        with pytest.raises(ValueError):
+            store.add_vectors(random_vectors(2), ["a"], ["doc-2", "doc-2"])
+        store.close()
+
+        reopened = VectorStore("user-1", DIMENSION)
+        assert reopened.total_vectors == 3
+        assert len(reopened.vector_file) == 3
+        assert add_document(reopened, "doc-2", random_vectors(1, seed=1)) == ["vec_3"]
+        assert reopened.search(vectors[2], k=1)[0]["text"] == "doc-1 chunk 2"
+        assert reopened.search(random_vectors(1, seed=1)[0], k=1)[0]["text"] == "doc-2 chunk 0"
+
+    def test_store_of_another_dimension_is_rejected(self):
+        """Test a store is not opened for embeddings of another width."""
+        add_document(VectorStore("user-1", DIMENSION), "doc-1", random_vectors(3))
+
+        with pytest.raises(ValueError, match=f"{DIMENSION}-dimension"):
+            VectorStore("user-1", DIMENSION * 2)
+
+    def test_legacy_positional_store_is_migrated(self, index_path):
+        """Test stores written with list metadata are upgraded in place."""
+        vectors = np.array(random_vectors(5), dtype=np.float32)
+        legacy = faiss.IndexFlatL2(DIMENSION)
+        legacy.add(vectors)
+        (index_path / "user-1").mkdir()
+        faiss.write_index(legacy, str(index_path / "user-1" / "index.faiss"))
+        chunks = [{"id": f"vec_{i}", "text": f"chunk {i}", "document_id": "doc-1"} for i in range(5)]
+        (index_path / "user-1" / "metadata.json").write_text(json.dumps(chunks))
+
+        store = VectorStore("user-1", DIMENSION)
+
+        assert store.search(vectors[2].tolist(), k=1)[0]["vector_id"] == "vec_2"
+        assert add_document(store, "doc-2", random_vectors(1)) == ["vec_5"]
+
+    def test_reindex_reads_vector_file(self):
+        """Test changing index type reuses stored vectors."""
+        store = VectorStore("user-1", DIMENSION)
+        vectors = random_vectors(100)
+        add_document(store, "doc-1", vectors)
+
+        store.reindex(IndexConfig(index_type="hnsw", promotion_threshold=10))
+
+        assert get_index_type(store.index) == "hnsw"
+        assert store.search(vectors[7], k=1)[0]["text"] == "doc-1 chunk 7"
+
+    def test_corrupt_index_is_rebuilt_from_vector_file(self, index_path):
+        """Test an unreadable index is recovered instead of discarded."""
+        store = VectorStore("user-1", DIMENSION)
+        vectors = random_vectors(20)
+        add_document(store, "doc-1", vectors)
+        store.merge()
+        add_document(store, "doc-2", random_vectors(5, seed=1))
+        snapshot_path(index_path).write_bytes(b"corrupt")
+
+        reloaded = VectorStore("user-1", DIMENSION)
+
+        assert reloaded.index.ntotal == 25
+        assert reloaded.search(vectors[3], k=1)[0]["text"] == "doc-1 chunk 3"
+
+    def test_checksum_mismatch_falls_back_to_previous_snapshot(self, index_path):
+        """Test a damaged snapshot is replaced from the last good one and the log."""
+        store = VectorStore("user-1", DIMENSION)
+        vectors = random_vectors(10)
+        add_document(store, "doc-1", vectors)
+        store.merge()
+        first = snapshot_path(index_path)
+        add_document(store, "doc-2", random_vectors(5, seed=1))
+        store.merge()
+        current = snapshot_path(index_path)
+        damaged = bytearray(current.read_bytes())
+        damaged[len(damaged) // 2] ^= 0xFF
+        current.write_bytes(bytes(damaged))
+
+        reloaded = VectorStore("user-1", DIMENSION)
+
+        assert first.exists() and current != first
+        assert reloaded.index.ntotal == 15
+        assert reloaded.search(vectors[6], k=1)[0]["text"] == "doc-1 chunk 6"
+        manifest = json.loads((index_path / "user-1" / "checkpoint.json").read_text())
+        assert manifest["previous"]["index_file"] == first.name
+        assert VectorStore("user-1", DIMENSION)._bad_snapshots == set()
+
+    def test_snapshots_are_pruned(self, index_path):
+        """Test only the current and previous snapshots are kept."""
+        store = VectorStore("user-1", DIMENSION)
+        for i in range(4):
+            add_document(store, f"doc-{i}", random_vectors(2, seed=i))
+            store.merge()
+
+        assert len(list((index_path / "user-1").glob("index-*.faiss"))) == 2
+        assert not list((index_path / "user-1").glob("*.tmp"))
+
+    def test_unrecoverable_checkpoint_is_kept(self, index_path):
+        """Test a store that cannot be restored moves its files aside instead of deleting them."""
+        store = VectorStore("user-1", DIMENSION)
+        add_document(store, "doc-1", random_vectors(5))
+        store.merge()
+        snapshot = snapshot_path(index_path)
+        snapshot.write_bytes(b"corrupt")
+        for name in ("vectors.bin", "vector_ids.bin"):
+            (index_path / "user-1" / name).unlink()
+
+        reloaded = VectorStore("user-1", DIMENSION)
+
+        assert reloaded.index.ntotal == 0
+        assert snapshot.exists()
+        assert len(list((index_path / "user-1").glob("checkpoint.json.corrupt-*"))) == 1
+
+    def test_float16_vector_file(self, monkeypatch):
+        """Test half-precision sidecars round-trip within tolerance."""
+        monkeypatch.setattr(vector_service.settings, "faiss_vector_dtype", "float16")
+        store = VectorStore("user-1", DIMENSION)
+        vectors = random_vectors(5)
+        add_document(store, "doc-1", vectors)
+
+        stored, ids = store.vector_file.read()
+
+        assert stored.dtype == np.float32
+        assert ids.tolist() == [0, 1, 2, 3, 4]
+        np.testing.assert_allclose(stored, vectors, atol=1e-3)
+
+    def test_add_appends_to_wal_without_checkpoint(self, index_path):
+        """Test adds are persisted by the log alone and replayed on load."""
+        store = VectorStore("user-1", DIMENSION)
+        vectors = random_vectors(10)
+        add_document(store, "doc-1", vectors)
+        add_document(store, "doc-2", random_vectors(10, seed=1))
+        store.delete_vectors("doc-2")
+
+        assert not (index_path / "user-1" / "checkpoint.json").exists()
+
+        reloaded = VectorStore("user-1", DIMENSION)
+        assert reloaded.index.ntotal == 10
+        assert reloaded.search(vectors[4], k=1)[0]["text"] == "doc-1 chunk 4"
+        assert add_document(reloaded, "doc-3", random_vectors(1)) == ["vec_20"]
+
+    def test_merge_writes_checkpoint_and_truncates_wal(self, index_path):
+        """Test merging folds the log into a checkpoint."""
+        store = VectorStore("user-1", DIMENSION)
+        add_document(store, "doc-1", random_vectors(10))
+
+        store.merge()
+        add_document(store, "doc-2", random_vectors(3, seed=1))
+
+        assert snapshot_path(index_path).exists()
+        assert store.get_stats()["wal_bytes"] < 3000
+        reloaded = VectorStore("user-1", DIMENSION)
+        assert reloaded.index.ntotal == 13
+        assert reloaded.get_stats()["documents"] == 2
+
+    def test_background_merge_after_threshold(self, index_path, monkeypatch):
+        """Test a merge starts once the log passes the size threshold."""
+        monkeypatch.setattr(vector_service.settings, "faiss_wal_merge_bytes", 1)
+        store = VectorStore("user-1", DIMENSION)
+        add_document(store, "doc-1", random_vectors(10))
+
+        store._merge_thread.join()
+
+        assert store.checkpoint_seq == 1
+        assert snapshot_path(index_path).exists()
+
+    def test_metadata_lives_in_chunk_store(self, index_path):
+        """Test chunk text is kept in SQLite rather than loaded into memory."""
+        store = VectorStore("user-1", DIMENSION)
+        add_document(store, "doc-1", random_vectors(4))
+        add_document(store, "doc-2", random_vectors(2, seed=1))
+        store.merge()
+        store.close()
+
+        reloaded = VectorStore("user-1", DIMENSION)
+
+        assert not (index_path / "user-1" / "metadata.json").exists()
+        assert reloaded.get_stats()["documents"] == 2
+        assert reloaded.get_stats()["chunks"] == 6
+        assert reloaded.chunks.get_many([1])[1]["text"] == "doc-1 chunk 1"
+
+
+class TestCompaction:
+    """Tests for reclaiming the space of deleted chunks."""
+
+    def test_compact_drops_deleted_rows(self):
+        """Test compaction shrinks the store and keeps IDs and results stable."""
+        store = VectorStore("user-1", DIMENSION)
+        vectors = random_vectors(20)
+        add_document(store, "doc-1", vectors)
+        add_document(store, "doc-2", random_vectors(200, seed=1))
+        add_document(store, "doc-3", random_vectors(5, seed=2))
+        store.delete_vectors("doc-2")
+        store.delete_vectors("doc-3")
+
+        assert store.needs_compaction()
+        report = store.compact()
+
+        assert report["rows_dropped"] == 204
+        assert report["bytes_reclaimed"] > 0
+        assert report["vectors"] == 20
+        assert len(store.vector_file) == 21
+        assert not store.needs_compaction()
+        assert store.search(vectors[7], k=1)[0]["text"] == "doc-1 chunk 7"
+        assert add_document(store, "doc-4", random_vectors(1)) == ["vec_225"]
+
+        reloaded = VectorStore("user-1", DIMENSION)
+        assert reloaded.index.ntotal == 21
+        assert reloaded._recover_from_vector_file()
+        assert reloaded.next_id == 226
+
+    def test_other_process_sees_compacted_sidecar(self):
+        """Test a cached store remaps the rewritten sidecar."""
+        cached = VectorStore("user-1", DIMENSION, IndexConfig(exact_filter_max=100))
+        vectors = random_vectors(10)
+        add_document(cached, "doc-1", vectors)
+        add_document(cached, "doc-2", random_vectors(10, seed=1))
+        cached.delete_vectors("doc-1")
+
+        VectorStore("user-1", DIMENSION).compact()
+        results = cached.search(random_vectors(1, seed=1)[0], k=1, document_ids=["doc-2"])
+
+        assert results[0]["text"] == "doc-2 chunk 0"
+
+    def test_interrupted_rewrite_is_completed(self, index_path):
+        """Test staged sidecar files left by a crash are swapped in on open."""
+        store = VectorStore("user-1", DIMENSION)
+        add_document(store, "doc-1", random_vectors(4))
+        directory = index_path / "user-1"
+        vectors, ids = store.vector_file.read(np.array([1, 3]))
+        store.vector_file.rewrite(ids, vectors)
+        (directory / "vectors.bin").rename(directory / "vectors.bin.new")
+        (directory / "vector_ids.bin").rename(directory / "vector_ids.bin.new")
+        store.vector_file.append(np.array([0]), np.zeros((1, DIMENSION), dtype=np.float32))
+
+        reopened = vector_service.VectorFile(str(directory), DIMENSION)
+
+        assert reopened.read()[1].tolist() == [1, 3]
+        assert not list(directory.glob("*.new"))
+
+    def test_interrupted_append_is_truncated(self, index_path):
+        """Test a vector row written without its ID is dropped on open."""
+        directory = index_path / "user-1"
+        directory.mkdir()
+        vector_file = vector_service.VectorFile(str(directory), 4)
+        vector_file.append(np.array([0, 1]), np.ones((2, 4), dtype=np.float32))
+        with open(directory / "vectors.bin", "ab") as f:
+            f.write(np.full(4, 9, dtype=np.float32).tobytes())
+        with open(directory / "vector_ids.bin", "ab") as f:
+            f.write(b"\x02\x00")
+
+        reopened = vector_service.VectorFile(str(directory), 4)
+        reopened.append(np.array([2]), np.full((1, 4), 2, dtype=np.float32))
+
+        vectors, ids = reopened.read(np.array([2]))
+        assert ids.tolist() == [2]
+        assert vectors.tolist() == [[2.0, 2.0, 2.0, 2.0]]
+        assert len(reopened) == 3
+
+    def test_short_header_is_no_sidecar(self, index_path):
+        """Test a vector file cut short inside its header reads as not written yet."""
+        directory = index_path / "user-1"
+        directory.mkdir()
+        (directory / "vectors.bin").write_bytes(b"LXVEC")
+
+        vector_file = vector_service.VectorFile(str(directory), 4)
+        vector_file.append(np.array([0]), np.ones((1, 4), dtype=np.float32))
+
+        assert vector_service.VectorFile.stored_dimension(str(directory)) == 4
+        assert vector_file.read()[1].tolist() == [0]
+
+    def test_compact_stores(self, monkeypatch):
+        """Test the periodic job loads and compacts only stores with enough dead rows."""
+        busy = VectorStore("user-1", DIMENSION)
+        add_document(busy, "doc-1", random_vectors(10))
+        busy.delete_vectors("doc-1")
+        add_document(VectorStore("user-2", DIMENSION), "doc-2", random_vectors(10))
+        loaded = []
+
+        class RecordingStore(VectorStore):
+            def __init__(self, user_id, *args, **kwargs):
+                loaded.append(user_id)
+                super().__init__(user_id, *args, **kwargs)
+
+        monkeypatch.setattr(vector_service, "VectorStore", RecordingStore)
+        reports = vector_service.compact_stores()
+
+        assert [report["user_id"] for report in reports] == ["user-1"]
+        assert loaded == ["user-1"]
+
+
+class TestDimensionReduction:
+    """Tests for stores keeping reduced-dimension vectors."""
+
+    def test_new_store_truncates_from_config(self):
+        """Test a configured store keeps the leading components, renormalized."""
+        store = VectorStore("user-1", DIMENSION, IndexConfig(reduced_dimension=8))
+        vectors = random_vectors(10)
+        add_document(store, "doc-1", vectors)
+
+        stored, _ = store.vector_file.read()
+        assert store.vector_file.dimension == 8
+        np.testing.assert_allclose(np.linalg.norm(stored, axis=1), 1.0, rtol=1e-5)
+        assert store.search(vectors[3], k=1)[0]["text"] == "doc-1 chunk 3"
+
+        reopened = VectorStore("user-1", DIMENSION)
+        assert reopened.reducer.method == "truncate"
+        assert reopened.get_stats()["dimension"] == 8
+
+    def test_pca_migration_keeps_ids_and_results(self):
+        """Test migrating an existing store keeps chunk IDs and finds the same chunks."""
+        store = VectorStore("user-1", DIMENSION)
+        vectors = random_vectors(100)
+        add_document(store, "doc-1", vectors)
+        store.close()
+
+        report = vector_service.reduce_store_dimension("user-1", 8, "pca")
+        migrated = VectorStore("user-1", DIMENSION)
+
+        assert report["dimension"] == 8
+        assert report["memory_after"] < report["memory_before"]
+        assert migrated.index.d == 8
+        assert migrated.search(vectors[42], k=1)[0]["text"] == "doc-1 chunk 42"
+        assert add_document(migrated, "doc-2", random_vectors(1)) == ["vec_100"]
+        with pytest.raises(ValueError):
+            migrated.reduce_dimension(4)
+
+    def test_cached_store_picks_up_reduction(self):
+        """Test a store opened before the migration reloads at the new dimension."""
+        cached = VectorStore("user-1", DIMENSION)
+        vectors = random_vectors(10)
+        add_document(cached, "doc-1", vectors)
+
+        VectorStore("user-1", DIMENSION).reduce_dimension(8)
+
+        assert cached.refresh()
+        assert cached.search(vectors[5], k=1)[0]["text"] == "doc-1 chunk 5"
+        assert cached.dimension == 8
+
+    def test_interrupted_reduction_is_ignored(self, index_path):
+        """Test a reducer saved without its rewritten sidecar is not applied."""
+        store = VectorStore("user-1", DIMENSION)
+        add_document(store, "doc-1", random_vectors(10))
+        DimensionReducer("truncate", DIMENSION, 8).save(str(index_path / "user-1"))
+
+        reopened = VectorStore("user-1", DIMENSION)
+
+        assert reopened.reducer is None
+        assert reopened.index.d == DIMENSION
+
+
+class TestVectorStoreManager:
+    """Tests for VectorStoreManager class."""
+
+    def test_cache_hits_and_misses(self):
+        """Test repeated lookups reuse the cached store."""
+        manager = VectorStoreManager(max_bytes=10**9)
+
+        first = manager.get_store("user-1", DIMENSION)
+        second = manager.get_store("user-1", DIMENSION)
+
+        assert first is second
+        assert manager.get_stats()["hits"] == 1
+        assert manager.get_stats()["misses"] == 1
+
+    def test_lru_eviction_over_budget(self):
+        """Test the least recently used store is evicted and reloaded lazily."""
+        manager = VectorStoreManager(max_bytes=15000)
+        vectors = random_vectors(100)
+        add_document(manager.get_store("user-1", DIMENSION), "doc-1", vectors)
+        add_document(manager.get_store("user-2", DIMENSION), "doc-2", random_vectors(100))
+
+        manager.get_store("user-2", DIMENSION)
+
+        stats = manager.get_stats()
+        assert stats["evictions"] == 1
+        assert stats["stores"] == 1
+        assert stats["memory_bytes"] <= 15000
+
+        reloaded = manager.get_store("user-1", DIMENSION)
+        assert reloaded.search(vectors[0], k=1)[0]["document_id"] == "doc-1"
+        assert manager.get_stats()["misses"] == 3
+
+    def test_evicted_store_is_closed_but_still_usable(self):
+        """Test eviction closes the store and in-flight holders can still query it."""
+        manager = VectorStoreManager(max_bytes=15000)
+        vectors = random_vectors(100)
+        evicted = manager.get_store("user-1", DIMENSION)
+        add_document(evicted, "doc-1", vectors)
+        add_document(manager.get_store("user-2", DIMENSION), "doc-2", random_vectors(100))
+
+        manager.get_store("user-2", DIMENSION)
+
+        assert evicted.chunks._connection is None
+        assert evicted.search(vectors[0], k=1)[0]["document_id"] == "doc-1"
+
+    def test_cold_load_does_not_block_other_stores(self, monkeypatch):
+        """Test a slow load only makes callers of the same store wait, once."""
+        manager = VectorStoreManager(max_bytes=10**9)
+        manager.get_store("user-1", DIMENSION)
+        started, release = threading.Event(), threading.Event()
+        loads = []
+
+        class SlowStore(VectorStore):
+            def __init__(self, *args, **kwargs):
+                loads.append(args[0])
+                started.set()
+                release.wait(5)
+                super().__init__(*args, **kwargs)
+
+        monkeypatch.setattr(vector_service, "VectorStore", SlowStore)
+        results = []
+        loaders = [
+            threading.Thread(target=lambda: results.append(manager.get_store("user-2", DIMENSION)))
+            for _ in range(2)
+        ]
+        for loader in loaders:
+            loader.start()
+        started.wait(5)
+
+        hit = threading.Thread(target=manager.get_store, args=("user-1", DIMENSION))
+        hit.start()
+        hit.join(1)
+        assert not hit.is_alive()
+        release.set()
+        for loader in loaders:
+            loader.join()
+
+        assert loads == ["user-2"]
+        assert results[0] is results[1]
+
+
+class TestReadOnlyVectorStore:
+    """Tests for memory-mapped read-only stores."""
+
+    def test_read_only_store_sees_checkpoint_and_wal(self):
+        """Test checkpointed and logged operations are both searchable."""
+        writer = VectorStore("user-1", DIMENSION)
+        base = random_vectors(20)
+        add_document(writer, "doc-1", base)
+        add_document(writer, "doc-2", random_vectors(5, seed=1))
+        writer.merge()
+        delta = random_vectors(5, seed=2)
+        add_document(writer, "doc-3", delta)
+        writer.delete_vectors("doc-2")
+
+        reader = VectorStore("user-1", DIMENSION, read_only=True)
+
+        assert reader.total_vectors == 25
+        assert reader.search(base[3], k=1)[0]["text"] == "doc-1 chunk 3"
+        assert reader.search(delta[1], k=1)[0]["text"] == "doc-3 chunk 1"
+        results = reader.search(base[0], k=25)
+        assert "doc-2" not in {r["document_id"] for r in results}
+        assert len(results) == 25
+
+    def test_read_only_delta_merge_follows_metric(self):
+        """Test checkpoint and delta hits are merged best-first for similarities."""
+        config = IndexConfig(metric="cosine")
+        writer = VectorStore("user-1", DIMENSION, config)
+        vectors = random_vectors(20)
+        add_document(writer, "doc-1", vectors[:10])
+        writer.merge()
+        add_document(writer, "doc-2", vectors[10:])
+
+        reader = VectorStore("user-1", DIMENSION, config, read_only=True)
+        results = reader.search(vectors[15], k=6)
+
+        assert results[0]["text"] == "doc-2 chunk 5"
+        scores = [r["score"] for r in results]
+        assert scores == sorted(scores, reverse=True)
+
+    def test_read_only_store_rejects_writes(self):
+        """Test writes fail on a read-only store."""
+        reader = VectorStore("user-1", DIMENSION, read_only=True)
+
+        with pytest.raises(RuntimeError):
+            add_document(reader, "doc-1", random_vectors(1))
+
+
+def ingest_documents(worker: int, count: int) -> None:
+    """Add documents from a separate process."""
+    store = VectorStore("user-1", DIMENSION)
+    for i in range(count):
+        add_document(store, f"doc-{worker}-{i}", random_vectors(3, seed=worker * 100 + i))
+
+
+class TestCrossProcessFreshness:
+    """Tests for stores opened by several processes."""
+
+    def test_cached_store_replays_new_log_records(self):
+        """Test a cached store sees chunks another writer added and deleted."""
+        cached = VectorStore("user-1", DIMENSION)
+        writer = VectorStore("user-1", DIMENSION)
+        vectors = random_vectors(5)
+        add_document(writer, "doc-1", vectors)
+        add_document(writer, "doc-2", random_vectors(5, seed=1))
+        writer.delete_vectors("doc-2")
+
+        assert cached.refresh() is True
+        assert cached.refresh() is False
+        assert cached.index.ntotal == 5
+        assert cached.get_stats()["documents"] == 1
+        assert cached.search(vectors[2], k=1)[0]["text"] == "doc-1 chunk 2"
+
+    def test_read_only_store_remaps_newer_checkpoint(self):
+        """Test a read-only store reloads once another process checkpoints."""
+        writer = VectorStore("user-1", DIMENSION)
+        add_document(writer, "doc-1", random_vectors(5))
+        reader = VectorStore("user-1", DIMENSION, read_only=True)
+        add_document(writer, "doc-2", random_vectors(5, seed=1))
+        writer.merge()
+
+        reader.refresh()
+
+        assert reader.checkpoint_seq == writer.checkpoint_seq
+        assert reader.delta_index.ntotal == 0
+        assert reader.total_vectors == 10
+
+    def test_writers_catch_up_before_writing(self):
+        """Test interleaved writers never reuse chunk IDs or sequence numbers."""
+        first = VectorStore("user-1", DIMENSION)
+        second = VectorStore("user-1", DIMENSION)
+
+        ids = add_document(first, "doc-1", random_vectors(3))
+        ids += add_document(second, "doc-2", random_vectors(3, seed=1))
+        ids += add_document(first, "doc-3", random_vectors(3, seed=2))
+        second.merge()
+
+        assert len(set(ids)) == 9
+        reloaded = VectorStore("user-1", DIMENSION)
+        assert reloaded.index.ntotal == 9
+        assert reloaded.get_stats()["documents"] == 3
+
+    def test_concurrent_ingestion_processes(self):
+        """Test processes ingesting into one store concurrently lose no chunks."""
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=ingest_documents, args=(w, 10)) for w in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        store = VectorStore("user-1", DIMENSION)
+
+        assert all(worker.exitcode == 0 for worker in workers)
+        assert store.index.ntotal == 90
+        assert store.get_stats()["documents"] == 30
+
+    def test_manager_refreshes_cached_store(self):
+        """Test cache hits pick up writes made outside the cached store."""
+        manager = VectorStoreManager(max_bytes=10**9)
+        cached = manager.get_store("user-1", DIMENSION)
+        add_document(VectorStore("user-1", DIMENSION), "doc-1", random_vectors(4))
+
+        assert manager.get_store("user-1", DIMENSION) is cached
+        assert cached.total_vectors == 4
+
+
+class TestShardedVectorStore:
+    """Tests for users sharing hash-partitioned shards."""
+
+    @pytest.fixture(autouse=True)
+    def sharded(self, monkeypatch):
+        """Put every user in a single shard."""
+        monkeypatch.setattr(vector_service.settings, "faiss_shard_count", 1)
+
+    def test_delete_store_drops_the_users_shard(self):
+        """Test deleting a user's store resolves the shard it is cached under."""
+        manager = VectorStoreManager(max_bytes=10**9)
+        manager.get_store("user-1", DIMENSION)
+
+        assert manager.delete_store("user-1") is True
+        assert manager.get_stats()["stores"] == 0
+
+    def test_users_share_shard_but_not_results(self):
+        """Test searches only return the calling user's chunks."""
+        manager = VectorStoreManager(max_bytes=10**9)
+        alice = manager.get_store("alice", DIMENSION)
+        bob = manager.get_store("bob", DIMENSION)
+        vectors = random_vectors(5)
+        add_document(alice, "doc-a", vectors)
+        add_document(bob, "doc-b", vectors)
+
+        results = bob.search(vectors[2], k=10)
+
+        assert isinstance(alice, TenantVectorStore)
+        assert alice.store is bob.store
+        assert alice.store.user_id == shard_for_user("alice") == "shard-000"
+        assert [r["document_id"] for r in results] == ["doc-b"] * 5
+        assert results[0]["text"] == "doc-b chunk 2"
+        assert alice.total_vectors == 5
+        assert alice.store.total_vectors == 10
+
+    def test_tenant_filter_combines_with_document_filter(self):
+        """Test another user's document IDs never match."""
+        manager = VectorStoreManager(max_bytes=10**9)
+        alice = manager.get_store("alice", DIMENSION)
+        bob = manager.get_store("bob", DIMENSION)
+        add_document(alice, "doc-a", random_vectors(3))
+
+        assert bob.search(random_vectors(1)[0], k=3, document_ids=["doc-a"]) == []
+        assert bob.delete_vectors("doc-a") is False
+        assert alice.get_stats()["documents"] == 1
+        assert alice.delete_vectors("doc-a") is True
+        assert alice.total_vectors == 0
+
+    def test_chunk_store_gains_tenant_column(self, tmp_path):
+        """Test databases created before sharding are migrated in place."""
+        import sqlite3
+
+        conn = sqlite3.connect(tmp_path / "chunks.db")
+        conn.execute(
+            "CREATE TABLE chunks (faiss_id INTEGER PRIMARY KEY, vector_id TEXT NOT NULL, "
+            "document_id TEXT NOT NULL, text TEXT NOT NULL)"
+        )
+        conn.execute("INSERT INTO chunks VALUES (1, 'vec_1', 'doc-1', 'text')")
+        conn.commit()
+        conn.close()
+
+        chunks = ChunkStore(str(tmp_path))
+        chunks.add([
+            {"faiss_id": 2, "id": "vec_2", "document_id": "doc-2", "text": "t", "tenant_id": "u"},
+        ])
+
+        assert chunks.ids_for_tenant("u").tolist() == [2]
+        assert chunks.ids_for_documents(["doc-1"]).tolist() == [1]
+        chunks.close()
+
+
+class TestConcurrentAccess:
+    """Tests for searches and writes running side by side."""
+
+    def test_read_write_lock(self):
+        """Test readers share the lock and a writer waits for them."""
+        lock = ReadWriteLock()
+        written = threading.Event()
+
+        def write():
+            with lock.write():
+                written.set()
+
+        with lock.read(), lock.read():
+            writer = threading.Thread(target=write)
+            writer.start()
+            assert not written.wait(0.1)
+        assert written.wait(5)
+        writer.join()
+
+        with lock.write(), lock.read(), lock.write():
+            pass
+
+    def test_search_runs_while_add_writes_to_disk(self):
+        """Test a search is not blocked by the disk I/O of an in-flight add."""
+        store = VectorStore("user-1", DIMENSION)
+        vectors = random_vectors(5)
+        add_document(store, "doc-1", vectors)
+
+        appending = threading.Event()
+        release = threading.Event()
+        append = store.vector_file.append
+
+        def slow_append(ids, array):
+            appending.set()
+            release.wait(5)
+            append(ids, array)
+
+        store.vector_file.append = slow_append
+        writer = threading.Thread(
+            target=add_document,
+            args=(store, "doc-2", random_vectors(5, seed=1)),
+        )
+        writer.start()
+        assert appending.wait(5)
+
+        results = store.search(vectors[1], k=1)
+        release.set()
+        writer.join()
+
+        assert results[0]["text"] == "doc-1 chunk 1"
+        assert store.total_vectors == 10
+
+    async def test_async_variants_match_sync(self):
+        """Test the executor-backed methods behave like the blocking ones."""
+        store = VectorStore("user-1", DIMENSION)
+        vectors = random_vectors(10)
+
+        ids = await store.add_vectors_async(
+            vectors=vectors,
+            documents=[f"chunk {i}" for i in range(10)],
+            document_ids=["doc-1"] * 10,
+        )
+
+        assert len(ids) == 10
+        assert await store.search_async(vectors[4], k=3) == store.search(vectors[4], k=3)
+        assert await store.search_batch_async(vectors[:2], k=2) == store.search_batch(
+            vectors[:2], k=2
+        )
+        assert await store.delete_vectors_async("doc-1") is True
+        assert store.total_vectors == 0